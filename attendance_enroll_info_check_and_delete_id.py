@@ -3,16 +3,21 @@ from tkinter import ttk, messagebox
 import json
 import os
 import shutil
+from export_engine import ExportEngine
+from config_service import get_config_service
+from jobs import get_job_runner, DONE, CANCELLED
+from face_archive import archive_path
 
 class EnrollmentManager:
     def __init__(self, root):
         self.root = root
-        self.root.title("Enrollment Management")
-        self.root.geometry("700x500")
+        # Window settings only apply when run standalone; main.py embeds this in a tab frame
+        if isinstance(root, (tk.Tk, tk.Toplevel)):
+            self.root.title("Enrollment Management")
+            self.root.geometry("700x500")
         
         # Load configuration
-        with open('config/config.json', 'r') as f:
-            self.config = json.load(f)
+        self.config = get_config_service()
             
         self.setup_ui()
         self.load_enrollments()
@@ -180,7 +185,10 @@ class EnrollmentManager:
                 with open(self.config["db_path"], 'w') as f:
                     json.dump(enrollments, f, indent=4)
                     
-                # Remove dataset folder if it exists
+                # Remove the packed face archive, then the dataset folder if it exists
+                archive = archive_path(self.config["dataset_path"], f"{person_name}_{person_id}")
+                if os.path.exists(archive):
+                    os.remove(archive)
                 if dataset_path != "N/A" and os.path.exists(dataset_path):
                     shutil.rmtree(dataset_path)
                     self.status_var.set(f"Deleted {person_name} and dataset folder")
@@ -200,29 +208,29 @@ class EnrollmentManager:
                 messagebox.showerror("Error", f"Failed to delete: {str(e)}")
                 
     def export_list(self):
-        try:
-            # Create output directory
-            output_dir = "output/exports"
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Export to CSV
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            csv_file = os.path.join(output_dir, f"enrollments_export_{timestamp}.csv")
-            
-            with open(csv_file, 'w', encoding='utf-8') as f:
-                f.write("ID,Name,Class,Enrollment Date,Face Count,Dataset Path\n")
-                
-                # Get all items from tree
-                for item in self.tree.get_children():
-                    values = self.tree.item(item)['values']
-                    f.write(','.join(f'"{str(v)}"' for v in values) + '\n')
-                    
-            messagebox.showinfo("Success", f"Enrollments exported to:\n{csv_file}")
-            self.status_var.set(f"Exported to {os.path.basename(csv_file)}")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Export failed: {str(e)}")
+        # Stream straight from the enrollment database as a background job
+        engine = ExportEngine(self.config)
+        self.status_var.set("Exporting enrollments...")
+
+        def run(job):
+            def progress(fraction, rows):
+                job.report(fraction, f"{rows} rows")
+                self.root.after(0, lambda: self.status_var.set(
+                    f"Exporting enrollments... {int(fraction * 100)}% ({rows} rows)"))
+            return engine.export("enrollments", "csv", progress=progress, cancel_event=job.cancel_event)
+
+        def finish(job):
+            if job.status == DONE:
+                csv_file, rows = job.result
+                messagebox.showinfo("Success", f"Exported {rows} enrollments to:\n{csv_file}")
+                self.status_var.set(f"Exported to {os.path.basename(csv_file)}")
+            elif job.status == CANCELLED:
+                self.status_var.set("Export cancelled")
+            else:
+                messagebox.showerror("Error", f"Export failed: {str(job.error)}")
+
+        get_job_runner().submit("export", run, resources=("enrollment_export",), name="Export enrollments",
+                                on_done=lambda job: self.root.after(0, finish, job))
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+from attendance_retention import AttendanceArchive, iter_attendance_days
+from export_engine import load_class_map, validate_date
+
+MAX_PAGE_SIZE = 500
+
+class AttendanceIndex:
+    # In-memory view of attendance and enrollment data, indexed by date and
+    # by person. The recognizer pushes every attendance change here, so
+    # queries never read attendance.json; the files are only re-read when
+    # something outside this process changed them (stat on query). The first
+    # load reads every archived month, so it runs on a background thread;
+    # queries are answered with 503 until it is done.
+    def __init__(self, config):
+        self.config = config
+        self.attendance_path = config["attendance_path"]
+        self.archive_index_path = AttendanceArchive(config).index_path
+        self.db_path = config["db_path"]
+        self.lock = threading.RLock()
+        self.by_date = {}
+        self.by_person = {}
+        self.class_map = {}
+        self.version = 0
+        self.attendance_mtime = None
+        self.archive_mtime = None
+        self.db_mtime = None
+        self.ready = threading.Event()
+        # Attendance pushed while the first load runs, laid over its result
+        self.pending = []
+
+    def start_loading(self):
+        thread = threading.Thread(target=self.load, name="attendance-index")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def load(self):
+        try:
+            self.reload()
+        except Exception as e:
+            # Mtimes stay unset, so the next query retries the load
+            print(f"[ERROR] Failed to load attendance index: {e}")
+        finally:
+            self.ready.set()
+
+    def file_mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self):
+        by_date, by_person = {}, {}
+        mtime = self.file_mtime(self.attendance_path)
+        archive_mtime = self.file_mtime(self.archive_index_path)
+        # Archived months are included, so history queries span every retained day
+        for date, people in iter_attendance_days(self.config):
+            by_date[date] = dict(people)
+            for name, record in people.items():
+                by_person.setdefault(name, {})[date] = record
+        with self.lock:
+            self.by_date, self.by_person = by_date, by_person
+            for date, name, record in self.pending:
+                by_date.setdefault(date, {})[name] = record
+                by_person.setdefault(name, {})[date] = record
+            self.pending = []
+            self.ready.set()
+            self.attendance_mtime = mtime
+            self.archive_mtime = archive_mtime
+            self.reload_classes()
+            self.version += 1
+        print(f"[INFO] Attendance index loaded: {len(by_date)} days, {len(by_person)} people")
+
+    def reload_classes(self):
+        self.db_mtime = self.file_mtime(self.db_path)
+        self.class_map = load_class_map(self.db_path) if self.db_mtime is not None else {}
+
+    def refresh_if_changed(self):
+        if (self.file_mtime(self.attendance_path) != self.attendance_mtime
+                or self.file_mtime(self.archive_index_path) != self.archive_mtime):
+            self.reload()
+        elif self.file_mtime(self.db_path) != self.db_mtime:
+            with self.lock:
+                self.reload_classes()
+                self.version += 1
+
+    def on_attendance(self, date, name, record, is_new=False):
+        # Recognizer listener, called after the attendance file was written
+        with self.lock:
+            record = dict(record)
+            if not self.ready.is_set():
+                self.pending.append((date, name, record))
+            self.by_date.setdefault(date, {})[name] = record
+            self.by_person.setdefault(name, {})[date] = record
+            self.attendance_mtime = self.file_mtime(self.attendance_path)
+            self.version += 1
+
+    def etag(self):
+        return f'W/"{self.version}"'
+
+    def present(self, date, class_filter=None):
+        with self.lock:
+            people = self.by_date.get(date, {})
+            rows = [self.row(date, name, record) for name, record in sorted(people.items())]
+        if class_filter:
+            rows = [r for r in rows if r["class"] == class_filter]
+        return rows
+
+    def history(self, name, start_date=None, end_date=None):
+        with self.lock:
+            days = self.by_person.get(name, {})
+            rows = [self.row(date, name, record) for date, record in sorted(days.items())
+                    if (not start_date or date >= start_date) and (not end_date or date <= end_date)]
+        return rows
+
+    def headcount(self, class_filter=None, start_date=None, end_date=None):
+        with self.lock:
+            dates = sorted(d for d in self.by_date
+                           if (not start_date or d >= start_date) and (not end_date or d <= end_date))
+            rows = []
+            for date in dates:
+                names = [n for n in self.by_date[date]
+                         if not class_filter or self.class_map.get(n, "") == class_filter]
+                rows.append({"date": date, "class": class_filter or "", "present": len(names)})
+        return rows
+
+    def row(self, date, name, record):
+        return {
+            "date": date,
+            "name": name,
+            "class": self.class_map.get(name, ""),
+            "first_seen": record.get("first_seen", ""),
+            "last_seen": record.get("last_seen", ""),
+            "count": record.get("count", 0)
+        }
+
+def paginate(rows, params):
+    offset = max(0, int(params.get("offset", 0)))
+    limit = min(MAX_PAGE_SIZE, max(1, int(params.get("limit", 100))))
+    page = rows[offset:offset + limit]
+    return {
+        "items": page,
+        "total": len(rows),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if offset + limit < len(rows) else None
+    }
+
+class AttendanceQueryHandler(BaseHTTPRequestHandler):
+    # GET /present?date=&class=         who is present on a day (default today)
+    # GET /people/<name>/history?start=&end=
+    # GET /headcount?class=&start=&end=
+    # All list responses take offset/limit and carry an ETag; If-None-Match
+    # with the current ETag returns 304 without a body.
+    index = None
+
+    def do_GET(self):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        index = self.index
+
+        if not index.ready.is_set():
+            self.send_json(503, {"error": "Attendance index is still loading"})
+            return
+
+        try:
+            index.refresh_if_changed()
+            etag = index.etag()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            if parts == ["present"]:
+                date = validate_date(params.get("date")) or datetime.now().strftime("%Y-%m-%d")
+                body = paginate(index.present(date, params.get("class")), params)
+                body["date"] = date
+            elif len(parts) == 3 and parts[0] == "people" and parts[2] == "history":
+                rows = index.history(parts[1], validate_date(params.get("start")), validate_date(params.get("end")))
+                body = paginate(rows, params)
+                body["name"] = parts[1]
+            elif parts == ["headcount"]:
+                rows = index.headcount(params.get("class"), validate_date(params.get("start")),
+                                       validate_date(params.get("end")))
+                body = paginate(rows, params)
+            else:
+                self.send_json(404, {"error": "Unknown endpoint"})
+                return
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        body["query_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.send_json(200, body, etag)
+
+    def send_json(self, status, body, etag=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+_index = None
+_server = None
+_lock = threading.Lock()
+
+def get_attendance_index(config):
+    global _index
+    with _lock:
+        if _index is None:
+            _index = AttendanceIndex(config)
+            _index.start_loading()
+        return _index
+
+def start_attendance_api(config):
+    # Local only by default; port from config
+    global _server
+    if not config.get("attendance_api_enabled", True):
+        return None
+    index = get_attendance_index(config)
+    with _lock:
+        if _server is None:
+            host = config.get("attendance_api_host", "127.0.0.1")
+            port = config.get("attendance_api_port", 9111)
+            handler = type("Handler", (AttendanceQueryHandler,), {"index": index})
+            try:
+                _server = ThreadingHTTPServer((host, port), handler)
+            except OSError as e:
+                print(f"[ERROR] Failed to start attendance API on {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            thread = threading.Thread(target=_server.serve_forever, name="attendance-api")
+            thread.daemon = True
+            thread.start()
+            print(f"[INFO] Attendance API available at http://{host}:{port}/present")
+        return _server
+
+if __name__ == "__main__":
+    from config_service import get_config_service
+    config = get_config_service()
+    if start_attendance_api(config) is None:
+        raise SystemExit(1)
+    print("[INFO] Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,272 @@
+import argparse
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+try:
+    import msvcrt
+except ImportError:
+    import fcntl
+    msvcrt = None
+
+class AttendanceArchive:
+    # Completed days older than the hot window are moved out of
+    # attendance.json into one gzipped JSON file per month, listed in
+    # index.json. A day's people are written with replace semantics, so
+    # rolling the same records twice (e.g. a recognizer saving a stale copy
+    # after a manual roll) never double counts.
+    def __init__(self, config):
+        self.attendance_path = config["attendance_path"]
+        self.archive_dir = config.get("attendance_archive_dir",
+                                      os.path.join(os.path.dirname(self.attendance_path) or "output",
+                                                   "attendance_archive"))
+        self.hot_days = config.get("attendance_hot_days", 31)
+        self.budget_bytes = int(config.get("attendance_disk_budget_mb", 0) * 1024 * 1024)
+        self.index_path = os.path.join(self.archive_dir, "index.json")
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            return {"months": {}, "dropped": []}
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+
+    def write_atomic(self, path, payload, compress=False):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with (gzip.open(tmp_path, "wb", compresslevel=9) if compress else open(tmp_path, "wb")) as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def save_index(self, index):
+        self.write_atomic(self.index_path, json.dumps(index, indent=4).encode("utf-8"))
+
+    def month_path(self, month):
+        return os.path.join(self.archive_dir, f"attendance_{month}.json.gz")
+
+    def read_month(self, month):
+        path = self.month_path(month)
+        if not os.path.exists(path):
+            return {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_day(self, date):
+        # Archived records for one day, or None when the day is not archived
+        if date[:7] not in self.load_index()["months"]:
+            return None
+        return self.read_month(date[:7]).get(date)
+
+    def cutoff(self, today=None):
+        today = today or datetime.now().date()
+        return (today - timedelta(days=self.hot_days)).strftime("%Y-%m-%d")
+
+    def roll(self, records, today=None):
+        # Moves days before the cutoff from records (the live dict, changed
+        # in place) into the monthly archives; returns the rolled dates
+        cutoff = self.cutoff(today)
+        cold = sorted(d for d in records if d < cutoff)
+        if not cold:
+            return []
+        with self.lock:
+            index = self.load_index()
+            by_month = {}
+            for date in cold:
+                by_month.setdefault(date[:7], []).append(date)
+            for month, dates in by_month.items():
+                days = self.read_month(month)
+                for date in dates:
+                    days.setdefault(date, {}).update(records[date])
+                self.write_atomic(self.month_path(month),
+                                  json.dumps(days, separators=(",", ":")).encode("utf-8"), compress=True)
+                index["months"][month] = {
+                    "file": os.path.basename(self.month_path(month)),
+                    "days": len(days),
+                    "rows": sum(len(people) for people in days.values()),
+                    "bytes": os.path.getsize(self.month_path(month))
+                }
+            self.enforce_budget(index)
+            self.save_index(index)
+        for date in cold:
+            del records[date]
+        print(f"[INFO] Archived {len(cold)} attendance days ({cold[0]} to {cold[-1]})")
+        return cold
+
+    def enforce_budget(self, index):
+        # Oldest months go first once archives plus the live file pass the budget
+        if not self.budget_bytes:
+            return []
+        live = os.path.getsize(self.attendance_path) if os.path.exists(self.attendance_path) else 0
+        dropped = []
+        for month in sorted(index["months"]):
+            if live + sum(m["bytes"] for m in index["months"].values()) <= self.budget_bytes:
+                break
+            info = index["months"].pop(month)
+            path = self.month_path(month)
+            if os.path.exists(path):
+                os.remove(path)
+            index["dropped"].append({"month": month, "rows": info["rows"],
+                                     "dropped": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+            dropped.append(month)
+            print(f"[WARNING] Attendance archive over budget: deleted {month} ({info['rows']} records)")
+        return dropped
+
+    def stats(self):
+        index = self.load_index()
+        return {
+            "months": len(index["months"]),
+            "rows": sum(m["rows"] for m in index["months"].values()),
+            "archive_bytes": sum(m["bytes"] for m in index["months"].values()),
+            "live_bytes": os.path.getsize(self.attendance_path) if os.path.exists(self.attendance_path) else 0,
+            "dropped_months": [d["month"] for d in index["dropped"]]
+        }
+
+class AttendanceWriterLock:
+    # Held by the process whose recognizer owns attendance.json. That
+    # recognizer keeps the records in memory and rewrites the whole file on
+    # every mark, so offline tools that edit the file must not run next to
+    # it. This is an OS file lock, so it goes away when its process exits
+    # or crashes.
+    def __init__(self, config):
+        self.path = config["attendance_path"] + ".lock"
+        self.file = None
+
+    def acquire(self):
+        if self.file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            if msvcrt:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self.file = f
+        return True
+
+    def release(self):
+        if self.file is None:
+            return
+        if msvcrt:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+
+_writer_lock = None
+_writer_lock_guard = threading.Lock()
+
+def hold_attendance_lock(config):
+    # Taken once by a recognizer that persists attendance and kept until the process exits
+    global _writer_lock
+    with _writer_lock_guard:
+        if _writer_lock is None:
+            lock = AttendanceWriterLock(config)
+            if not lock.acquire():
+                print(f"[WARNING] Another process is editing {config['attendance_path']}; "
+                      f"attendance marks may overwrite its changes")
+                return False
+            _writer_lock = lock
+        return True
+
+class AttendanceHistory:
+    # Read side over the live file and the archives together. Days come out
+    # in date order; a day present in both has the live records laid over
+    # the archived ones. Archive months outside the date range are skipped
+    # without being opened.
+    def __init__(self, config, start_date=None, end_date=None):
+        self.archive = AttendanceArchive(config)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.sources_total = 1
+        self.sources_read = 0
+
+    def in_range(self, date):
+        return (not self.start_date or date >= self.start_date) and (not self.end_date or date <= self.end_date)
+
+    def progress(self):
+        return min(1.0, self.sources_read / self.sources_total)
+
+    def __iter__(self):
+        live = {}
+        if os.path.exists(self.archive.attendance_path):
+            with open(self.archive.attendance_path, "r") as f:
+                live = json.load(f)
+        self.sources_read = 1
+        live_dates = sorted(d for d in live if self.in_range(d))
+        months = [m for m in sorted(self.archive.load_index()["months"])
+                  if (not self.start_date or m >= self.start_date[:7])
+                  and (not self.end_date or m <= self.end_date[:7])]
+        self.sources_total = 1 + len(months)
+
+        position = 0
+        for month in months:
+            days = self.archive.read_month(month)
+            self.sources_read += 1
+            for date in sorted(days):
+                if not self.in_range(date):
+                    continue
+                while position < len(live_dates) and live_dates[position] < date:
+                    yield live_dates[position], live[live_dates[position]]
+                    position += 1
+                if position < len(live_dates) and live_dates[position] == date:
+                    yield date, {**days[date], **live[date]}
+                    position += 1
+                else:
+                    yield date, days[date]
+        for date in live_dates[position:]:
+            yield date, live[date]
+
+def iter_attendance_days(config, start_date=None, end_date=None):
+    return iter(AttendanceHistory(config, start_date, end_date))
+
+def roll_attendance_file(config, today=None):
+    # Offline roll of attendance.json; a running recognizer rolls its own copy
+    # daily and would put the rolled days back on its next save, so this
+    # refuses to run while the app holds the writer lock
+    attendance_path = config["attendance_path"]
+    if not os.path.exists(attendance_path):
+        return []
+    lock = AttendanceWriterLock(config)
+    if not lock.acquire():
+        raise RuntimeError(f"{attendance_path} is in use by the running attendance app; close it and roll again")
+    try:
+        with open(attendance_path, "r") as f:
+            records = json.load(f)
+        rolled = AttendanceArchive(config).roll(records, today)
+        if rolled:
+            tmp_path = attendance_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(records, f, indent=4)
+            os.replace(tmp_path, attendance_path)
+    finally:
+        lock.release()
+    return rolled
+
+if __name__ == "__main__":
+    from config_service import get_config_service
+    parser = argparse.ArgumentParser(description="Archive old attendance days")
+    parser.add_argument("command", choices=["roll", "stats"])
+    parser.add_argument("--hot-days", type=int, help="Override attendance_hot_days")
+    args = parser.parse_args()
+
+    config = get_config_service().snapshot()
+    if args.hot_days is not None:
+        config["attendance_hot_days"] = args.hot_days
+    if args.command == "roll":
+        try:
+            rolled = roll_attendance_file(config)
+        except RuntimeError as e:
+            print(f"[ERROR] {e}")
+            raise SystemExit(1)
+        print(f"[SUCCESS] {len(rolled)} days archived" if rolled else "[INFO] Nothing to archive")
+    stats = AttendanceArchive(config).stats()
+    print(f"[INFO] Live file {stats['live_bytes'] / 1024:.1f} KB, {stats['months']} archived months "
+          f"({stats['rows']} records, {stats['archive_bytes'] / 1024:.1f} KB)")
+    if stats["dropped_months"]:
+        print(f"[WARNING] Deleted by the disk budget: {', '.join(stats['dropped_months'])}")
@@ -0,0 +1,376 @@
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import socket
+import time
+from datetime import datetime, timedelta
+import cv2
+from attendance_retention import AttendanceArchive, AttendanceWriterLock
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Camera exports usually carry the start time in the file name, e.g. cam1_20240115_083000.mp4
+FILENAME_TIME = re.compile(r"(\d{8})[_-]?(\d{6})")
+
+class WorkQueue:
+    # File-based task queue. Tasks move pending -> claimed -> done by
+    # os.rename, which is atomic on a single filesystem, so any number of
+    # processes on any number of machines sharing the directory can pull
+    # from it without a broker. A claimed task whose file has not been
+    # touched for lease_seconds is assumed dead and goes back to pending.
+    def __init__(self, root, lease_seconds=600):
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.dirs = {name: os.path.join(root, name) for name in ("pending", "claimed", "done", "failed")}
+        for path in self.dirs.values():
+            os.makedirs(path, exist_ok=True)
+
+    def path(self, state, task_id):
+        return os.path.join(self.dirs[state], task_id + ".json")
+
+    def write_json(self, path, payload):
+        tmp_path = f"{path}.{socket.gethostname()}-{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, indent=4)
+        os.replace(tmp_path, path)
+
+    def add(self, task):
+        for state in ("pending", "claimed", "done"):
+            if os.path.exists(self.path(state, task["task_id"])):
+                return False
+        self.write_json(self.path("pending", task["task_id"]), task)
+        return True
+
+    def task_ids(self, state):
+        return sorted(os.path.basename(p)[:-5] for p in glob.glob(os.path.join(self.dirs[state], "*.json")))
+
+    def requeue_expired(self):
+        now = time.time()
+        requeued = 0
+        for task_id in self.task_ids("claimed"):
+            path = self.path("claimed", task_id)
+            try:
+                if now - os.path.getmtime(path) > self.lease_seconds:
+                    os.rename(path, self.path("pending", task_id))
+                    print(f"[BACKFILL] Lease expired, requeued {task_id}")
+                    requeued += 1
+            except OSError:
+                # Finished or requeued by someone else in the meantime
+                continue
+        return requeued
+
+    def claim(self):
+        self.requeue_expired()
+        for task_id in self.task_ids("pending"):
+            claimed_path = self.path("claimed", task_id)
+            try:
+                os.rename(self.path("pending", task_id), claimed_path)
+            except OSError:
+                # Another worker won the race for this task
+                continue
+            os.utime(claimed_path)
+            with open(claimed_path, "r") as f:
+                return json.load(f)
+        return None
+
+    def heartbeat(self, task_id):
+        try:
+            os.utime(self.path("claimed", task_id))
+        except OSError:
+            pass
+
+    def complete(self, task_id, result):
+        self.write_json(self.path("done", task_id), result)
+        try:
+            os.remove(self.path("claimed", task_id))
+        except OSError:
+            pass
+
+    def fail(self, task, error):
+        self.write_json(self.path("failed", task["task_id"]), dict(task, error=error))
+        try:
+            os.remove(self.path("claimed", task["task_id"]))
+        except OSError:
+            pass
+
+    def counts(self):
+        return {state: len(self.task_ids(state)) for state in self.dirs}
+
+def video_start_time(path, frame_count, fps, start=None):
+    if start:
+        return datetime.strptime(start, TIME_FORMAT)
+    match = FILENAME_TIME.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1) + match.group(2), "%Y%m%d%H%M%S")
+    # Fall back to the file modification time, taken as the end of recording
+    return datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=frame_count / fps)
+
+def plan_tasks(videos, segment_seconds=300, start=None):
+    tasks = []
+    for video in videos:
+        video = os.path.abspath(video)
+        cap = cv2.VideoCapture(video)
+        if not cap.isOpened():
+            print(f"[WARNING] Cannot open {video}, skipping")
+            continue
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        video_start = video_start_time(video, frame_count, fps, start)
+        segment_frames = max(1, int(segment_seconds * fps))
+        stem = re.sub(r"[^A-Za-z0-9_-]", "_", os.path.splitext(os.path.basename(video))[0])
+        # Cameras often reuse file names across folders, so the full path is part of the id
+        stem += "_" + hashlib.sha1(video.encode("utf-8")).hexdigest()[:8]
+        for index, first in enumerate(range(0, frame_count, segment_frames)):
+            tasks.append({
+                "task_id": f"{stem}_{index:05d}",
+                "video": video,
+                "segment": index,
+                "start_frame": first,
+                "end_frame": min(frame_count, first + segment_frames),
+                "fps": fps,
+                "video_start": video_start.strftime(TIME_FORMAT)
+            })
+    return tasks
+
+def process_segment(recognizer, task, sample_fps, heartbeat):
+    # Sightings are keyed by date and name so segments that cross midnight
+    # split correctly; first/last are absolute timestamps from frame position
+    fps = task["fps"]
+    video_start = datetime.strptime(task["video_start"], TIME_FORMAT)
+    step = max(1, int(round(fps / sample_fps)))
+    cap = cv2.VideoCapture(task["video"])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, task["start_frame"])
+    recognizer.motion_gate.reset()
+
+    sightings = {}
+    sampled = 0
+    analysed = 0
+    last_beat = time.monotonic()
+    for index in range(task["start_frame"], task["end_frame"]):
+        if (index - task["start_frame"]) % step:
+            # Skip unsampled frames without decoding them
+            if not cap.grab():
+                break
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        sampled += 1
+        if time.monotonic() - last_beat > 10:
+            heartbeat()
+            last_beat = time.monotonic()
+
+        # Static footage is skipped before any detection work
+        if not recognizer.motion_gate.check(frame):
+            continue
+        analysed += 1
+        boxes, encodings, _ = recognizer.detect_and_encode(frame)
+        seen_at = video_start + timedelta(seconds=index / fps)
+        for encoding in encodings:
+            name, proba = recognizer.identify(encoding)
+            if proba < recognizer.confidence_threshold:
+                continue
+            day = sightings.setdefault(seen_at.strftime("%Y-%m-%d"), {})
+            clock = seen_at.strftime("%H:%M:%S")
+            if name not in day:
+                day[name] = {"first_seen": clock, "last_seen": clock, "count": 0}
+            day[name]["last_seen"] = clock
+            day[name]["count"] += 1
+    cap.release()
+    return sightings, sampled, analysed
+
+def worker_main(queue_dir, lease_seconds, sample_fps, wait):
+    # One process per core; keep OpenCV single-threaded so workers scale
+    # instead of competing for the same cores
+    cv2.setNumThreads(1)
+    from recognition import FaceRecognizer
+    recognizer = FaceRecognizer(persist_attendance=False)
+    if recognizer.model is None:
+        print("[ERROR] Model not loaded. Please train the model first.")
+        return
+    # Fixed settings: every sampled frame gets the full pipeline
+    recognizer.controller.enabled = False
+    recognizer.controller.reset()
+    recognizer.controller.skip = 1
+    # Segments are already spread over processes; no nested encoder pools
+    recognizer.parallel_encoder = None
+
+    queue = WorkQueue(queue_dir, lease_seconds)
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    while True:
+        task = queue.claim()
+        if task is None:
+            if wait and queue.task_ids("claimed"):
+                # Others may still die and have their leases expire
+                time.sleep(min(30, lease_seconds / 4))
+                continue
+            return
+
+        started = time.perf_counter()
+        try:
+            sightings, sampled, analysed = process_segment(
+                recognizer, task, sample_fps, lambda: queue.heartbeat(task["task_id"]))
+        except Exception as e:
+            print(f"[ERROR] {worker} failed {task['task_id']}: {e}")
+            queue.fail(task, str(e))
+            continue
+        elapsed = time.perf_counter() - started
+        queue.complete(task["task_id"], {
+            "task_id": task["task_id"],
+            "video": task["video"],
+            "segment": task["segment"],
+            "worker": worker,
+            "model_version": recognizer.model_version,
+            "frames_sampled": sampled,
+            "frames_analysed": analysed,
+            "seconds": elapsed,
+            "video_seconds": (task["end_frame"] - task["start_frame"]) / task["fps"],
+            "sightings": sightings
+        })
+        print(f"[BACKFILL] {worker} finished {task['task_id']} in {elapsed:.1f}s "
+              f"({analysed}/{sampled} frames analysed)")
+
+def run_workers(queue_dir, workers=None, lease_seconds=600, sample_fps=2.0, wait=False):
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    processes = [multiprocessing.Process(target=worker_main, args=(queue_dir, lease_seconds, sample_fps, wait))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return time.perf_counter() - started
+
+def merge_results(queue_dir):
+    # Segments are independent, so first_seen is the earliest sighting over
+    # all segments of the day and last_seen the latest; counts add up
+    records = {}
+    summary = {"segments": 0, "video_seconds": 0.0, "cpu_seconds": 0.0, "models": set()}
+    for path in sorted(glob.glob(os.path.join(queue_dir, "done", "*.json"))):
+        with open(path, "r") as f:
+            result = json.load(f)
+        summary["segments"] += 1
+        summary["video_seconds"] += result["video_seconds"]
+        summary["cpu_seconds"] += result["seconds"]
+        summary["models"].add(result.get("model_version"))
+        for day, people in result["sightings"].items():
+            merge_day(records.setdefault(day, {}), people)
+    summary["models"] = sorted(str(m) for m in summary["models"])
+    return records, summary
+
+def merge_day(target, people):
+    for name, record in people.items():
+        if name not in target:
+            target[name] = dict(record)
+            continue
+        current = target[name]
+        current["first_seen"] = min(current["first_seen"], record["first_seen"])
+        current["last_seen"] = max(current["last_seen"], record["last_seen"])
+        current["count"] += record["count"]
+
+def apply_to_attendance(records, config):
+    attendance_path = config["attendance_path"]
+    archive = AttendanceArchive(config)
+    attendance = {}
+    if os.path.exists(attendance_path):
+        with open(attendance_path, "r") as f:
+            attendance = json.load(f)
+    for day, people in records.items():
+        # Days already archived are merged from their archived records and rolled straight back
+        if day not in attendance:
+            attendance[day] = archive.load_day(day) or {}
+        merge_day(attendance[day], people)
+    archive.roll(attendance)
+    os.makedirs(os.path.dirname(attendance_path) or ".", exist_ok=True)
+    tmp_path = attendance_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(attendance, f, indent=4)
+    os.replace(tmp_path, attendance_path)
+
+def merge_command(queue_dir, apply=False, force=False):
+    queue = WorkQueue(queue_dir)
+    counts = queue.counts()
+    if counts["pending"] or counts["claimed"]:
+        print(f"[WARNING] {counts['pending']} pending and {counts['claimed']} claimed segments not finished yet")
+    if counts["failed"]:
+        print(f"[WARNING] {counts['failed']} segments failed, see {queue.dirs['failed']}")
+
+    records, summary = merge_results(queue_dir)
+    merged_path = os.path.join(queue_dir, "attendance.json")
+    queue.write_json(merged_path, records)
+    people = sum(len(p) for p in records.values())
+    speedup = summary["video_seconds"] / summary["cpu_seconds"] if summary["cpu_seconds"] else 0.0
+    print(f"[SUCCESS] Merged {summary['segments']} segments into {people} attendance records "
+          f"over {len(records)} days -> {merged_path}")
+    print(f"[INFO] {summary['video_seconds'] / 3600:.1f} h of footage, {speedup:.1f}x real time per worker, "
+          f"model versions: {', '.join(summary['models'])}")
+
+    if apply:
+        marker = os.path.join(queue_dir, "applied.json")
+        if os.path.exists(marker) and not force:
+            print("[WARNING] Results were already applied to attendance; use --force to apply again")
+            return records
+        from config_service import get_config_service
+        config = get_config_service()
+        attendance_path = config["attendance_path"]
+        # A running recognizer would overwrite the file with its own copy on its next mark
+        lock = AttendanceWriterLock(config)
+        if not lock.acquire():
+            print(f"[ERROR] {attendance_path} is in use by the running attendance app; "
+                  f"close it and run merge --apply again")
+            return records
+        try:
+            apply_to_attendance(records, config)
+        finally:
+            lock.release()
+        queue.write_json(marker, {"applied": datetime.now().strftime(TIME_FORMAT), "segments": summary["segments"]})
+        print(f"[SUCCESS] Backfilled attendance written to {attendance_path}")
+    return records
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill attendance from archived footage")
+    parser.add_argument("--queue", default=os.path.join("output", "backfill"),
+                        help="Queue directory (share it between machines to spread the work)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = sub.add_parser("plan", help="Split videos into segments and queue them")
+    run_parser = sub.add_parser("run", help="Plan, work and merge in one go on this machine")
+    for p in (plan_parser, run_parser):
+        p.add_argument("videos", nargs="+")
+        p.add_argument("--segment-seconds", type=int, default=300)
+        p.add_argument("--start", help=f"Recording start time ({TIME_FORMAT}) if not in the file name")
+
+    work_parser = sub.add_parser("work", help="Process queued segments")
+    for p in (work_parser, run_parser):
+        p.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+        p.add_argument("--lease", type=int, default=600, help="Seconds before a silent worker's segment is requeued")
+        p.add_argument("--sample-fps", type=float, default=2.0, help="Frames analysed per second of footage")
+    work_parser.add_argument("--wait", action="store_true",
+                             help="Keep running until segments claimed by other machines finish")
+
+    merge_parser = sub.add_parser("merge", help="Merge finished segments into attendance records")
+    for p in (merge_parser, run_parser):
+        p.add_argument("--apply", action="store_true", help="Merge the results into the attendance file")
+        p.add_argument("--force", action="store_true", help="Apply even if already applied once")
+
+    sub.add_parser("status", help="Show queue counts")
+    args = parser.parse_args()
+
+    if args.command in ("plan", "run"):
+        queue = WorkQueue(args.queue)
+        tasks = plan_tasks(args.videos, args.segment_seconds, args.start)
+        added = sum(queue.add(task) for task in tasks)
+        print(f"[INFO] Queued {added} of {len(tasks)} segments in {args.queue}")
+    if args.command in ("work", "run"):
+        elapsed = run_workers(args.queue, args.workers, args.lease, args.sample_fps,
+                              getattr(args, "wait", False))
+        print(f"[INFO] Workers finished in {elapsed:.1f}s")
+    if args.command in ("merge", "run"):
+        merge_command(args.queue, args.apply, args.force)
+    if args.command == "status":
+        print(json.dumps(WorkQueue(args.queue).counts(), indent=4))
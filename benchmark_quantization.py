@@ -0,0 +1,91 @@
+import argparse
+import json
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+from benchmark_training import synthetic_encodings
+from quantized_gallery import QuantizedGallery, GalleryClassifier, GALLERY_DTYPES, load_encodings
+
+def compare_accuracy(X, y, training_size, tolerance, k):
+    # Same split for every dtype; float64 is the reference
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=(1 - training_size), random_state=42, stratify=y)
+    results = []
+    reference = None
+    for dtype in GALLERY_DTYPES:
+        model = GalleryClassifier(dtype=dtype, k=k, tolerance=tolerance).fit(X_train, y_train)
+        start = time.perf_counter()
+        proba = model.predict_proba(X_test)
+        seconds = time.perf_counter() - start
+        predicted = np.where(proba.max(axis=1) > 0, model.classes_[np.argmax(proba, axis=1)], -1)
+        distances, indices = model.gallery_.nearest(X_test, 1)
+        if reference is None:
+            reference = (predicted, distances[:, 0], indices[:, 0])
+        results.append({
+            "dtype": dtype,
+            "accuracy": float(np.mean(predicted == y_test)),
+            "agreement_with_float64": float(np.mean(predicted == reference[0])),
+            "same_nearest_sample": float(np.mean(indices[:, 0] == reference[2])),
+            "max_distance_error": float(np.max(np.abs(distances[:, 0] - reference[1]))),
+            "memory_bytes": model.gallery_.nbytes(),
+            "ms_per_face": seconds / len(X_test) * 1000
+        })
+    return results
+
+def large_gallery(n_samples, n_queries, seed=42):
+    # Footprint and match time for a gallery the size of a whole campus
+    X, _ = synthetic_encodings(n_samples // 20, 20, seed)
+    queries = X[np.random.default_rng(seed).choice(len(X), n_queries, replace=False)]
+    results = []
+    for dtype in GALLERY_DTYPES:
+        start = time.perf_counter()
+        gallery = QuantizedGallery(X, dtype)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        gallery.nearest(queries, 3)
+        seconds = time.perf_counter() - start
+        results.append({"dtype": dtype, "samples": len(X), "memory_mb": gallery.nbytes() / (1024 * 1024),
+                        "build_seconds": build, "ms_per_face": seconds / n_queries * 1000})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare float64, float16 and int8 galleries")
+    parser.add_argument("--encodings", help="Use a real encodings.pickle instead of synthetic data")
+    parser.add_argument("--classes", type=int, default=100, help="Synthetic classes")
+    parser.add_argument("--samples", type=int, default=30, help="Synthetic samples per class")
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--gallery-size", type=int, default=100000, help="Samples for the footprint test")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    with open('config/config.json', 'r') as f:
+        training_size = json.load(f)["training_size"]
+
+    if args.encodings:
+        X, names = load_encodings(args.encodings)
+        y = LabelEncoder().fit_transform(names)
+        source = args.encodings
+    else:
+        X, y = synthetic_encodings(args.classes, args.samples)
+        source = f"synthetic {args.classes}x{args.samples}"
+
+    print(f"[INFO] Accuracy on {source} ({len(X)} encodings)")
+    print(f"{'dtype':>8} {'accuracy':>9} {'agree':>7} {'same NN':>8} {'max dist err':>13} {'memory KB':>10} {'ms/face':>8}")
+    accuracy = compare_accuracy(X, y, training_size, args.tolerance, args.k)
+    for r in accuracy:
+        print(f"{r['dtype']:>8} {r['accuracy']:>9.4f} {r['agreement_with_float64']:>7.4f} "
+              f"{r['same_nearest_sample']:>8.4f} {r['max_distance_error']:>13.5f} "
+              f"{r['memory_bytes'] / 1024:>10.1f} {r['ms_per_face']:>8.3f}")
+
+    print(f"\n[INFO] Footprint for {args.gallery_size} samples")
+    print(f"{'dtype':>8} {'memory MB':>10} {'build (s)':>10} {'ms/face':>8}")
+    footprint = large_gallery(args.gallery_size, 200)
+    for r in footprint:
+        print(f"{r['dtype']:>8} {r['memory_mb']:>10.1f} {r['build_seconds']:>10.2f} {r['ms_per_face']:>8.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"source": source, "accuracy": accuracy, "footprint": footprint}, f, indent=4)
+        print(f"[INFO] Results saved to: {args.output}")
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import pickle
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import LabelEncoder
+from train import build_model, TRAINING_BACKENDS
+
+def synthetic_encodings(n_classes, samples_per_class, seed=42):
+    # Roughly matches dlib embeddings: same-person pairs ~0.55 apart, different people ~0.95
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 0.06, size=(n_classes, 128))
+    X = np.repeat(centers, samples_per_class, axis=0) + rng.normal(0, 0.035, size=(n_classes * samples_per_class, 128))
+    y = np.repeat(np.arange(n_classes), samples_per_class)
+    return X, y
+
+def real_encodings(encodings_path, n_classes, seed=42):
+    with open(encodings_path, "rb") as f:
+        data = pickle.loads(f.read())
+    names = np.array(data["names"])
+    X = np.array(data["encodings"])
+    classes = np.unique(names)
+    if n_classes > len(classes):
+        return None, None
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(classes, size=n_classes, replace=False)
+    mask = np.isin(names, chosen)
+    return X[mask], LabelEncoder().fit_transform(names[mask])
+
+def benchmark(X, y, method, training_size):
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=(1 - training_size), random_state=42, stratify=y)
+    model = build_model(method)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    infer_seconds = time.perf_counter() - start
+    accuracy = accuracy_score(y_test, np.argmax(proba, axis=1))
+    return train_seconds, accuracy, infer_seconds / len(X_test)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare training backends by class count")
+    parser.add_argument("--classes", default="10,50,100,200", help="Comma-separated class counts")
+    parser.add_argument("--samples", type=int, default=30, help="Samples per class for synthetic data")
+    parser.add_argument("--backends", default=",".join(TRAINING_BACKENDS))
+    parser.add_argument("--encodings", help="Use a real encodings.pickle instead of synthetic data")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    with open('config/config.json', 'r') as f:
+        training_size = json.load(f)["training_size"]
+
+    results = []
+    print(f"{'classes':>8} {'backend':>18} {'train (s)':>10} {'accuracy':>9} {'infer (ms/face)':>16}")
+    for n_classes in [int(c) for c in args.classes.split(",")]:
+        if args.encodings:
+            X, y = real_encodings(args.encodings, n_classes)
+            if X is None:
+                print(f"[WARNING] Only fewer than {n_classes} people in {args.encodings}, skipping")
+                continue
+        else:
+            X, y = synthetic_encodings(n_classes, args.samples)
+
+        for method in args.backends.split(","):
+            train_seconds, accuracy, infer_seconds = benchmark(X, y, method, training_size)
+            print(f"{n_classes:>8} {method:>18} {train_seconds:>10.2f} {accuracy * 100:>8.1f}% {infer_seconds * 1000:>16.3f}")
+            results.append({"classes": n_classes, "backend": method, "train_seconds": train_seconds,
+                            "accuracy": accuracy, "infer_ms_per_face": infer_seconds * 1000})
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"[INFO] Results saved to: {args.output}")
@@ -0,0 +1,214 @@
+import cv2
+import threading
+import time
+from collections import namedtuple
+from metrics import get_metrics
+
+FramePacket = namedtuple("FramePacket", ["seq", "timestamp", "image"])
+
+class CameraSubscription:
+    # Mirrors the read()/release() pair of cv2.VideoCapture so existing
+    # capture loops can switch over without restructuring. Frames handed
+    # out are shared with every other subscriber and marked read-only;
+    # copy before drawing on them.
+    def __init__(self, service, name):
+        self.service = service
+        self.name = name
+        self.last_seq = 0
+        self.frames = 0
+        self.missed = 0
+        self.latency_avg = 0.0
+        self.latency_max = 0.0
+        # Capture time (time.monotonic) of the frame last returned by read()
+        self.timestamp = None
+        self.closed = False
+
+    def read(self, timeout=None):
+        packet = self.service.wait_for_frame(self.last_seq, timeout)
+        if packet is None or self.closed:
+            return False, None
+        if self.last_seq and packet.seq > self.last_seq + 1:
+            self.missed += packet.seq - self.last_seq - 1
+        self.last_seq = packet.seq
+        self.timestamp = packet.timestamp
+
+        latency = time.monotonic() - packet.timestamp
+        self.frames += 1
+        # Exponential moving average keeps the number readable while live
+        self.latency_avg = latency if self.frames == 1 else 0.9 * self.latency_avg + 0.1 * latency
+        self.latency_max = max(self.latency_max, latency)
+        return True, packet.image
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "frames": self.frames,
+            "missed": self.missed,
+            "latency_avg_ms": self.latency_avg * 1000,
+            "latency_max_ms": self.latency_max * 1000
+        }
+
+    def release(self):
+        if not self.closed:
+            self.closed = True
+            self.service.unsubscribe(self)
+
+    close = release
+
+class CameraService:
+    def __init__(self, camera_index, width, height, ring_size=4, read_timeout=5.0):
+        self.camera_index = camera_index
+        self.width = width
+        self.height = height
+        self.ring = [None] * ring_size
+        self.read_timeout = read_timeout
+        self.seq = 0
+        self.dropped = 0
+        self.failed = False
+        self.cond = threading.Condition()
+        self.subscribers = []
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.capturing = False
+        self.generation = 0
+        self.cap = None
+
+    def subscribe(self, name):
+        subscription = CameraSubscription(self, name)
+        with self.cond:
+            self.subscribers.append(subscription)
+            # Start at the current frame so a new consumer never sees stale ones
+            subscription.last_seq = self.seq
+            if not self.capturing:
+                # No loop running, or the old thread already left it and is
+                # releasing the device; a fresh thread takes over once it is done
+                self.failed = False
+                self.stop_event.clear()
+                self.capturing = True
+                self.generation += 1
+                self.thread = threading.Thread(target=self._capture_loop, args=(self.generation, self.thread))
+                self.thread.daemon = True
+                self.thread.start()
+            else:
+                # The capture thread was asked to stop but is still in its loop; keep it running
+                self.stop_event.clear()
+        print(f"[CAMERA] {name} subscribed to camera {self.camera_index}")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.cond:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+            if not self.subscribers:
+                self.stop_event.set()
+            self.cond.notify_all()
+        stats = subscription.stats()
+        print(f"[CAMERA] {subscription.name} unsubscribed: {stats['frames']} frames, "
+              f"avg latency {stats['latency_avg_ms']:.1f} ms")
+
+    def wait_for_frame(self, last_seq, timeout=None):
+        # Always returns the newest frame; anything older is simply skipped
+        deadline = time.monotonic() + (timeout or self.read_timeout)
+        with self.cond:
+            while self.seq <= last_seq and not self.failed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.stop_event.is_set():
+                    return None
+                self.cond.wait(remaining)
+            if self.seq <= last_seq:
+                return None
+            return self.ring[self.seq % len(self.ring)]
+
+    def latest(self):
+        with self.cond:
+            if self.seq == 0:
+                return None
+            return self.ring[self.seq % len(self.ring)]
+
+    def stats(self):
+        with self.cond:
+            return {
+                "camera_index": self.camera_index,
+                "frames": self.seq,
+                "dropped": self.dropped,
+                "running": self.thread is not None and self.thread.is_alive(),
+                "subscribers": [s.stats() for s in self.subscribers]
+            }
+
+    def _capture_loop(self, generation, previous=None):
+        if previous is not None:
+            previous.join()
+        cap = cv2.VideoCapture(self.camera_index)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        # Keep the driver queue short so reads return the freshest frame
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.cap = cap
+        failures = 0
+        try:
+            while True:
+                if self.stop_event.is_set():
+                    with self.cond:
+                        # Re-checked under the lock: a subscriber that arrived meanwhile keeps the loop alive
+                        if self.stop_event.is_set():
+                            self.capturing = False
+                            break
+                ret, frame = cap.read()
+                if not ret:
+                    failures += 1
+                    if failures >= 10:
+                        print(f"[ERROR] Camera {self.camera_index} stopped delivering frames")
+                        with self.cond:
+                            self.capturing = False
+                        break
+                    time.sleep(0.05)
+                    continue
+                failures = 0
+                frame.flags.writeable = False
+                with self.cond:
+                    # Frames nobody picked up before being overwritten count as dropped
+                    if self.subscribers and all(s.last_seq < self.seq for s in self.subscribers):
+                        self.dropped += 1
+                    self.seq += 1
+                    self.ring[self.seq % len(self.ring)] = FramePacket(self.seq, time.monotonic(), frame)
+                    self.cond.notify_all()
+        finally:
+            cap.release()
+            with self.cond:
+                # A newer capture thread owns the device state now
+                if generation == self.generation:
+                    self.capturing = False
+                    self.cap = None
+                    self.failed = True
+                self.cond.notify_all()
+
+_services = {}
+_services_lock = threading.Lock()
+
+def camera_samples(field):
+    samples = {}
+    for service in list(_services.values()):
+        stats = service.stats()
+        if field == "missed":
+            for sub in stats["subscribers"]:
+                samples[(service.camera_index, sub["name"])] = sub["missed"]
+        else:
+            samples[(service.camera_index,)] = stats[field]
+    return samples
+
+metrics = get_metrics()
+metrics.counter("camera_frames_total", "Frames captured", ("camera",)).set_function(
+    lambda: camera_samples("frames"))
+metrics.counter("camera_frames_dropped_total", "Frames overwritten before any subscriber read them",
+                ("camera",)).set_function(lambda: camera_samples("dropped"))
+metrics.counter("camera_subscriber_missed_total", "Frames a subscriber skipped",
+                ("camera", "subscriber")).set_function(lambda: camera_samples("missed"))
+
+def get_camera(camera_index, width=640, height=480):
+    # One service per device, shared by every tab that needs frames
+    with _services_lock:
+        service = _services.get(camera_index)
+        if service is None:
+            service = CameraService(camera_index, width, height)
+            _services[camera_index] = service
+        return service
@@ -0,0 +1,199 @@
+import os
+import queue
+import threading
+import time
+import cv2
+from unknown_clusters import crop_face
+from metrics import get_metrics
+
+FSYNC_POLICIES = ("none", "batch", "each")
+
+def encode_jpeg(image, quality=90):
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+class CaptureBuffer:
+    # Holds captured faces as JPEG-compressed, padded crops instead of raw
+    # frames. add() refuses new crops once max_bytes is reached, so memory
+    # stays bounded however long a capture runs.
+    def __init__(self, max_bytes=8 * 1024 * 1024, quality=90, margin=0.4):
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.margin = margin
+        self.items = []
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def add(self, frame, box=None):
+        image = crop_face(frame, box, self.margin) if box is not None else frame
+        if image.size == 0:
+            return False
+        jpeg = encode_jpeg(image, self.quality)
+        with self.lock:
+            if self.nbytes + len(jpeg) > self.max_bytes:
+                return False
+            self.items.append(jpeg)
+            self.nbytes += len(jpeg)
+        return True
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.items)
+
+    def clear(self):
+        with self.lock:
+            self.items = []
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self.items)
+
+class ImageWriterPool:
+    # Background threads that persist encoded images so capture loops never
+    # wait on the disk. Pending writes are picked up in batches; each file
+    # is written to a temp name and renamed so readers never see a partial
+    # JPEG. fsync policy: "each" syncs every file before its rename, "batch"
+    # syncs all files of a batch together and then their directories once,
+    # "none" leaves it to the OS. Failures are collected, never raised on
+    # the capture thread.
+    def __init__(self, workers=2, batch_size=8, fsync="batch", max_pending=256):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.errors = []
+        self.written = 0
+        self.bytes_written = 0
+        self.batches = 0
+        self.write_time = 0.0
+        self.lock = threading.Lock()
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"image-writer-{i}")
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, path, data):
+        # Blocks only if the disk is max_pending images behind
+        self.pending.put((path, data))
+
+    def _worker(self):
+        while True:
+            batch = [self.pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+
+    def _write_batch(self, batch):
+        started = time.perf_counter()
+        opened = []
+        for path, data in batch:
+            tmp_path = path + ".tmp"
+            f = None
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                f = open(tmp_path, "wb")
+                f.write(data)
+                f.flush()
+                if self.fsync == "each":
+                    os.fsync(f.fileno())
+                opened.append((path, tmp_path, f, len(data)))
+            except OSError as e:
+                if f:
+                    f.close()
+                self._record_error(path, e)
+
+        written = []
+        for path, tmp_path, f, size in opened:
+            try:
+                if self.fsync == "batch":
+                    os.fsync(f.fileno())
+                f.close()
+                os.replace(tmp_path, path)
+                written.append((path, size))
+            except OSError as e:
+                f.close()
+                self._record_error(path, e)
+
+        if self.fsync != "none":
+            for directory in {os.path.dirname(path) or "." for path, _ in written}:
+                self._fsync_dir(directory)
+
+        with self.lock:
+            self.written += len(written)
+            self.bytes_written += sum(size for _, size in written)
+            self.batches += 1
+            self.write_time += time.perf_counter() - started
+
+    def _fsync_dir(self, directory):
+        # Makes the renames durable; directories cannot be opened on Windows
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _record_error(self, path, error):
+        print(f"[ERROR] Failed to write {path}: {error}")
+        with self.lock:
+            self.errors.append((path, str(error)))
+
+    def flush(self):
+        # Waits until everything submitted so far is on disk
+        self.pending.join()
+
+    def take_errors(self, prefix=None):
+        # Each screen collects only the failures under its own folder; the
+        # trailing separator keeps dataset/Bob_1 from matching dataset/Bob_10
+        folder = os.path.join(prefix, "") if prefix is not None else None
+        with self.lock:
+            errors = [e for e in self.errors if folder is None or e[0].startswith(folder)]
+            self.errors = [e for e in self.errors if e not in errors]
+        return errors
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending": self.pending.qsize(),
+                "written": self.written,
+                "bytes_written": self.bytes_written,
+                "batches": self.batches,
+                "avg_batch_ms": self.write_time / self.batches * 1000 if self.batches else 0.0,
+                "errors": len(self.errors),
+                "fsync": self.fsync
+            }
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_image_writer(config=None):
+    # One pool shared by every enrollment screen
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            config = config or {}
+            _writer = ImageWriterPool(workers=config.get("image_writer_workers", 2),
+                                      fsync=config.get("image_writer_fsync", "batch"))
+            writer = _writer
+            metrics = get_metrics()
+            metrics.gauge("image_writer_queue_depth", "Images waiting to be written").set_function(
+                lambda: writer.pending.qsize())
+            metrics.counter("image_writer_written_total", "Images written by the background writer").set_function(
+                lambda: writer.written)
+        return _writer
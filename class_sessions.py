@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import pickle
+import re
+import threading
+from datetime import datetime
+from json_stream import iter_json_array
+from export_engine import person_key
+from model_store import ModelStore
+
+def class_file_name(class_name):
+    # Class names come from user input; keep them safe as file names
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", class_name) or "_"
+
+def load_rosters(db_path):
+    # class -> set of the labels encode_face gives that class's people
+    rosters = {}
+    for enroll in iter_json_array(db_path):
+        folder = enroll.get("folder") or f"{enroll.get('name', '')}_{enroll.get('id', '')}"
+        rosters.setdefault(enroll.get("class", ""), set()).add(person_key(folder))
+    return rosters
+
+def build_class_models(config, progress=None, cancel_event=None):
+    # One small model per class, fitted only on that roster's encodings.
+    # The gallery backend needs no training, so rebuilding every class
+    # after an encoding run takes seconds even for large schools.
+    # numpy and sklearn are only needed here, not for running sessions
+    import numpy as np
+    from sklearn.preprocessing import LabelEncoder
+    from train import build_model
+    models_dir = config.get("class_models_dir", "output/class_models")
+    method = config.get("session_model_method", "gallery")
+    encodings_path = config["encodings_path"]
+
+    with open(encodings_path, "rb") as f:
+        data = pickle.loads(f.read())
+    encodings = np.array(data["encodings"])
+    names = np.array(data["names"])
+    rosters = load_rosters(config["db_path"])
+    base_version = ModelStore(config).active_version()
+
+    os.makedirs(models_dir, exist_ok=True)
+    index = {"built": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+             "encodings_mtime": os.path.getmtime(encodings_path), "classes": {}}
+    for i, (class_name, roster) in enumerate(sorted(rosters.items())):
+        if cancel_event is not None and cancel_event.is_set():
+            raise RuntimeError("Class model build cancelled")
+        if progress:
+            progress(i / len(rosters), f"Building model for class {class_name or '(none)'}...")
+
+        mask = np.isin(names, sorted(roster))
+        people = np.unique(names[mask])
+        if len(people) == 0:
+            print(f"[WARNING] Class {class_name or '(none)'} has no encoded faces, skipped")
+            continue
+
+        # Trained backends need two people; a one-person class always uses the gallery
+        class_method = method if len(people) >= 2 else "gallery"
+        le = LabelEncoder()
+        labels = le.fit_transform(names[mask])
+        model = build_model(class_method, n_jobs=1)
+        model.fit(encodings[mask], labels)
+
+        model_data = {
+            "model": model,
+            "le": le,
+            "classes": le.classes_.tolist(),
+            "method": class_method,
+            "session_class": class_name,
+            # Numeric base version keeps the model_version gauge and event fields comparable
+            "version": base_version
+        }
+        file_name = class_file_name(class_name) + ".pickle"
+        path = os.path.join(models_dir, file_name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pickle.dumps(model_data))
+        os.replace(tmp_path, path)
+        index["classes"][class_name] = {"file": file_name, "people": len(people),
+                                        "encodings": int(mask.sum()), "method": class_method}
+        print(f"[INFO] Class {class_name or '(none)'}: {len(people)} people, "
+              f"{int(mask.sum())} encodings ({class_method})")
+
+    index_path = os.path.join(models_dir, "index.json")
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f, indent=4)
+    os.replace(index_path + ".tmp", index_path)
+    print(f"[SUCCESS] Built {len(index['classes'])} class models in {models_dir}")
+    return index
+
+def load_global_model(config):
+    with open(config["recognizer_path"], "rb") as f:
+        return pickle.loads(f.read())
+
+def parse_time(value):
+    return datetime.strptime(value, "%H:%M").time()
+
+class ClassSessionManager:
+    # Tracks the active class session. Starting one hands the recognizer the
+    # class's precomputed model, so classification runs over that roster
+    # only; ending it hands back the global model. Every attendance mark
+    # made while a session is active is also recorded against the session.
+    def __init__(self, config):
+        self.config = config
+        self.models_dir = config.get("class_models_dir", "output/class_models")
+        self.sessions_path = config.get("session_attendance_path", "output/session_attendance.json")
+        self.lock = threading.Lock()
+        self.active = None
+        self.model_data = None
+
+    def load_index(self):
+        path = os.path.join(self.models_dir, "index.json")
+        if not os.path.exists(path):
+            return {"classes": {}}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def classes(self):
+        return sorted(self.load_index()["classes"])
+
+    def load_class_model(self, class_name):
+        index = self.load_index()
+        entry = index["classes"].get(class_name)
+        if entry is None:
+            raise ValueError(f"No model built for class '{class_name}'. Run Build Class Models first.")
+        encodings_path = self.config["encodings_path"]
+        if os.path.exists(encodings_path) and os.path.getmtime(encodings_path) > index.get("encodings_mtime", 0):
+            print(f"[WARNING] Class models are older than {encodings_path}; rebuild to include new faces")
+        with open(os.path.join(self.models_dir, entry["file"]), "rb") as f:
+            return pickle.loads(f.read())
+
+    def scheduled_class(self, now=None):
+        # The timetable is a list of {"class", "days", "start", "end"};
+        # days is optional and uses Mon..Sun
+        now = now or datetime.now()
+        for slot in self.config.get("timetable", []):
+            days = slot.get("days")
+            if days and now.strftime("%a") not in days:
+                continue
+            try:
+                if parse_time(slot["start"]) <= now.time() < parse_time(slot["end"]):
+                    return slot["class"]
+            except (KeyError, ValueError) as e:
+                print(f"[WARNING] Ignoring timetable entry {slot}: {e}")
+        return None
+
+    def active_class(self):
+        return self.active["class"] if self.active else None
+
+    def start(self, class_name, source="manual"):
+        model_data = self.load_class_model(class_name)
+        with self.lock:
+            if self.active:
+                self.close_session()
+            now = datetime.now()
+            self.active = {
+                "id": f"{now.strftime('%Y%m%d_%H%M%S')}_{class_file_name(class_name)}",
+                "class": class_name,
+                "source": source,
+                "started": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "ended": None,
+                "roster": len(model_data["classes"]),
+                "present": {}
+            }
+            self.model_data = model_data
+            self.save_session()
+        print(f"[INFO] Session started for class {class_name} ({len(model_data['classes'])} people)")
+        return model_data
+
+    def end(self):
+        with self.lock:
+            if not self.active:
+                return None
+            class_name = self.active["class"]
+            self.close_session()
+        print(f"[INFO] Session ended for class {class_name}")
+        return load_global_model(self.config)
+
+    def close_session(self):
+        self.active["ended"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.save_session()
+        self.active = None
+        self.model_data = None
+
+    def on_attendance(self, date, name, record, is_new=False):
+        # Recognizer listener; the daily record keeps its own first_seen, so
+        # the session keeps times from when the person was seen in this session
+        with self.lock:
+            if not self.active:
+                return
+            current_time = record.get("last_seen") or datetime.now().strftime("%H:%M:%S")
+            present = self.active["present"]
+            if name not in present:
+                present[name] = {"first_seen": current_time, "last_seen": current_time, "count": 1}
+            else:
+                present[name]["last_seen"] = current_time
+                present[name]["count"] += 1
+            self.save_session()
+
+    def load_sessions(self):
+        if not os.path.exists(self.sessions_path):
+            return {}
+        with open(self.sessions_path, "r") as f:
+            return json.load(f)
+
+    def save_session(self):
+        # Called with the lock held; same write-then-rename as attendance.json
+        sessions = self.load_sessions()
+        sessions[self.active["id"]] = self.active
+        os.makedirs(os.path.dirname(self.sessions_path) or ".", exist_ok=True)
+        tmp_path = self.sessions_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(sessions, f, indent=4)
+        os.replace(tmp_path, self.sessions_path)
+
+if __name__ == "__main__":
+    from config_service import get_config_service
+    parser = argparse.ArgumentParser(description="Build per-class recognition models")
+    parser.add_argument("--method", help="Override session_model_method")
+    args = parser.parse_args()
+
+    config = get_config_service().snapshot()
+    if args.method:
+        config["session_model_method"] = args.method
+    build_class_models(config)
@@ -0,0 +1,225 @@
+import json
+import os
+import threading
+
+CONFIG_PATH = 'config/config.json'
+
+# Settings that take effect at the next frame boundary without reloading the model.
+# Each entry is (type, minimum, maximum) or (type, allowed values).
+LIVE_SETTINGS = {
+    "detection_method": (str, ("hog", "cnn")),
+    "detection_scale": (float, 0.1, 1.0),
+    "detection_skip": (int, 1, 30),
+    "confidence_threshold": (float, 0.0, 1.0),
+    "display_fps": (float, 1.0, 60.0),
+    "motion_threshold": (int, 1, 255),
+    "motion_min_area": (float, 0.0, 1.0),
+    "idle_timeout": (float, 0.0, 3600.0),
+    "idle_poll_interval": (float, 0.05, 5.0),
+    "latency_budget_ms": (float, 10.0, 5000.0),
+    "min_detection_scale": (float, 0.1, 1.0),
+    "max_detection_skip": (int, 1, 30),
+    "min_faces_per_frame": (int, 1, 50),
+    "max_faces_per_frame": (int, 1, 100),
+    "crowd_threshold": (int, 2, 100),
+    "motion_gate_enabled": (bool, (True, False)),
+    "controller_enabled": (bool, (True, False))
+}
+
+# Structured settings that are also applied live but edited through their own UI
+LIVE_STRUCTURED = ("rois",)
+
+DEFAULTS = {
+    "detection_scale": 1.0,
+    "detection_skip": 1,
+    "display_fps": 15,
+    "motion_gate_enabled": True,
+    "motion_threshold": 25,
+    "motion_min_area": 0.002,
+    "idle_timeout": 30.0,
+    "idle_poll_interval": 0.5,
+    "rois": {},
+    "controller_enabled": True,
+    "latency_budget_ms": 150,
+    "min_detection_scale": 0.5,
+    "max_detection_skip": 4,
+    "min_faces_per_frame": 2,
+    "max_faces_per_frame": 20,
+    "crowd_threshold": 6,
+    "parallel_encoding_workers": 0,
+    "metrics_enabled": True,
+    "metrics_host": "127.0.0.1",
+    "metrics_port": 9110,
+    "attendance_api_enabled": True,
+    "attendance_api_host": "127.0.0.1",
+    "attendance_api_port": 9111,
+    "event_replay_size": 1000,
+    "events_file_enabled": True,
+    "events_path": "output/events.ndjson",
+    "events_socket_enabled": True,
+    "events_host": "127.0.0.1",
+    "events_port": 9112,
+    "unknown_event_interval": 60,
+    "last_seen_update_interval": 60,
+    "capture_buffer_mb": 8,
+    "image_writer_workers": 2,
+    "image_writer_fsync": "batch",
+    "class_models_dir": "output/class_models",
+    "session_model_method": "gallery",
+    "session_attendance_path": "output/session_attendance.json",
+    "timetable": [],
+    "auto_sessions": False,
+    "attendance_archive_dir": "output/attendance_archive",
+    "attendance_hot_days": 31,
+    "attendance_disk_budget_mb": 0
+}
+
+def validate_setting(key, value):
+    spec = LIVE_SETTINGS.get(key)
+    if spec is None:
+        return value
+    value_type = spec[0]
+    try:
+        if value_type is bool and isinstance(value, str):
+            # Text from the settings window; bool("False") would be True
+            value = {"true": True, "false": False}[value.strip().lower()]
+        value = value_type(value)
+    except (TypeError, ValueError, KeyError):
+        raise ValueError(f"{key} must be a {value_type.__name__}")
+    if len(spec) == 2:
+        if value not in spec[1]:
+            raise ValueError(f"{key} must be one of {', '.join(str(v) for v in spec[1])}")
+    elif not (spec[1] <= value <= spec[2]):
+        raise ValueError(f"{key} must be between {spec[1]} and {spec[2]}")
+    return value
+
+class ConfigService:
+    # Shared, dict-like view of config.json. Readers index it like the plain
+    # dict they used to load; writers go through update() and every change,
+    # including edits made to the file by hand, is pushed to subscribers.
+    def __init__(self, path=CONFIG_PATH, poll_interval=1.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lock = threading.RLock()
+        self.subscribers = []
+        self.watch_thread = None
+        self.stop_event = threading.Event()
+        self.mtime = None
+        self.config = {}
+        self.reload(notify=False)
+
+    def __getitem__(self, key):
+        return self.config[key]
+
+    def __contains__(self, key):
+        return key in self.config
+
+    def get(self, key, default=None):
+        return self.config.get(key, default)
+
+    def snapshot(self):
+        return dict(self.config)
+
+    def read_raw(self):
+        # Only the keys the file itself sets, without DEFAULTS
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def read_file(self):
+        config = dict(DEFAULTS)
+        config.update(self.read_raw())
+        return config
+
+    def reload(self, notify=True):
+        with self.lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+                config = self.read_file()
+                for key in LIVE_SETTINGS:
+                    if key in config:
+                        config[key] = validate_setting(key, config[key])
+            except Exception as e:
+                if not self.config:
+                    raise
+                # Keep running on the last good config while the file is mid-edit
+                print(f"[WARNING] Ignoring invalid config change: {e}")
+                return {}
+            changed = {k: v for k, v in config.items() if self.config.get(k) != v}
+            # Swap the whole dict so readers never see a half-applied update
+            self.config = config
+            self.mtime = mtime
+        if notify and changed:
+            self.notify(changed)
+        return changed
+
+    def update(self, changes, persist=True):
+        changes = {key: validate_setting(key, value) for key, value in changes.items()}
+        with self.lock:
+            config = dict(self.config)
+            config.update(changes)
+            changed = {k: v for k, v in changes.items() if self.config.get(k) != v}
+            if persist:
+                # Defaults stay out of the file so later changes to DEFAULTS still apply
+                saved = self.read_raw()
+                saved.update(changes)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(saved, f, indent=4)
+                os.replace(tmp_path, self.path)
+                self.mtime = os.path.getmtime(self.path)
+            self.config = config
+        if changed:
+            self.notify(changed)
+        return changed
+
+    def subscribe(self, callback):
+        # callback(changed, config) runs on the thread that made the change
+        with self.lock:
+            self.subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def notify(self, changed):
+        print(f"[CONFIG] Updated: {', '.join(f'{k}={v}' for k, v in changed.items())}")
+        with self.lock:
+            subscribers = list(self.subscribers)
+        config = self.snapshot()
+        for callback in subscribers:
+            try:
+                callback(changed, config)
+            except Exception as e:
+                print(f"[ERROR] Config subscriber failed: {e}")
+
+    def start_watching(self):
+        if self.watch_thread and self.watch_thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.watch_thread = threading.Thread(target=self._watch_loop)
+        self.watch_thread.daemon = True
+        self.watch_thread.start()
+
+    def stop_watching(self):
+        self.stop_event.set()
+
+    def _watch_loop(self):
+        while not self.stop_event.wait(self.poll_interval):
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                continue
+            if mtime != self.mtime:
+                self.reload()
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_config_service(path=CONFIG_PATH):
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ConfigService(path)
+        return _service
@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from json_stream import iter_json_array
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def scan_folder(path):
+    # Per-image mtimes are kept so encoded/unencoded counts can be
+    # recomputed against a new encodings file without rescanning
+    mtimes = []
+    total_bytes = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                st = entry.stat()
+                mtimes.append(st.st_mtime)
+                total_bytes += st.st_size
+    return {"images": len(mtimes), "bytes": total_bytes, "mtimes": mtimes}
+
+def scan_archive(path):
+    # A packed archive counts one image per chip, dated by its source image.
+    # face_archive pulls in cv2, so it is imported on the scan thread only.
+    from face_archive import FaceArchive
+    with FaceArchive(path) as archive:
+        mtimes = [entry["mtime"] for entry in archive.entries]
+    return {"images": len(mtimes), "bytes": os.path.getsize(path), "mtimes": mtimes}
+
+class DatasetStatsService:
+    def __init__(self, config, cache_path=None):
+        self.config = config
+        self.cache_path = cache_path or os.path.join(
+            os.path.dirname(config["encodings_path"]) or "output", "dataset_stats_cache.json")
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+        self.callbacks = []
+        self.refresh_requested = False
+        self.folders = {}
+        self.enroll_cache = None
+        self._snapshot = None
+        self.load_cache()
+
+    def load_cache(self):
+        # A persisted snapshot lets the Welcome tab show numbers before the first scan
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+            self.folders = cache.get("folders", {})
+            self.enroll_cache = cache.get("enrollments")
+            self._snapshot = cache.get("snapshot")
+        except Exception as e:
+            print(f"[WARNING] Ignoring dataset stats cache: {e}")
+
+    def save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"folders": self.folders, "enrollments": self.enroll_cache,
+                           "snapshot": self._snapshot}, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"[WARNING] Could not save dataset stats cache: {e}")
+
+    def snapshot(self):
+        with self.lock:
+            return self._snapshot
+
+    def count_enrollments(self):
+        db_path = self.config["db_path"]
+        mtime = _mtime(db_path)
+        if mtime is None:
+            return {"mtime": None, "count": None, "error": "missing"}
+        if self.enroll_cache and self.enroll_cache.get("mtime") == mtime:
+            return self.enroll_cache
+        try:
+            count = sum(1 for _ in iter_json_array(db_path))
+            return {"mtime": mtime, "count": count, "error": None}
+        except Exception:
+            return {"mtime": mtime, "count": None, "error": "corrupted"}
+
+    def scan_dataset(self):
+        from face_archive import ARCHIVE_EXTENSION
+        dataset_path = self.config["dataset_path"]
+        folders = {}
+        if not os.path.isdir(dataset_path):
+            return folders, 0
+        rescanned = 0
+        # Loose images directly under dataset/ are tracked under the "." key
+        for key, path in [(".", dataset_path)] + [
+                (entry.name, entry.path) for entry in os.scandir(dataset_path)
+                if entry.is_dir() or entry.name.endswith(ARCHIVE_EXTENSION)]:
+            mtime = _mtime(path)
+            cached = self.folders.get(key)
+            if cached and cached.get("mtime") == mtime:
+                folders[key] = cached
+                continue
+            stats = scan_archive(path) if key.endswith(ARCHIVE_EXTENSION) else scan_folder(path)
+            stats["mtime"] = mtime
+            folders[key] = stats
+            rescanned += 1
+        return folders, rescanned
+
+    def refresh(self):
+        from face_archive import ARCHIVE_EXTENSION
+        started = time.perf_counter()
+        folders, rescanned = self.scan_dataset()
+        enrollments = self.count_enrollments()
+
+        encodings_mtime = _mtime(self.config["encodings_path"])
+        model_mtime = _mtime(self.config["recognizer_path"])
+
+        images = 0
+        disk_bytes = 0
+        unencoded = 0
+        newest_image = None
+        for stats in folders.values():
+            images += stats["images"]
+            disk_bytes += stats["bytes"]
+            if stats["mtimes"]:
+                folder_newest = max(stats["mtimes"])
+                newest_image = folder_newest if newest_image is None else max(newest_image, folder_newest)
+            if encodings_mtime is None:
+                unencoded += stats["images"]
+            else:
+                unencoded += sum(1 for m in stats["mtimes"] if m > encodings_mtime)
+
+        # A person topped up after compaction has both an archive and a folder
+        people = len({key[:-len(ARCHIVE_EXTENSION)] if key.endswith(ARCHIVE_EXTENSION) else key
+                      for key, stats in folders.items() if key != "." and stats["images"] > 0})
+        encodings_stale = (encodings_mtime is not None and newest_image is not None
+                           and newest_image > encodings_mtime)
+        model_stale = (model_mtime is not None and encodings_mtime is not None
+                       and encodings_mtime > model_mtime)
+
+        snapshot = {
+            "people": people,
+            "images": images,
+            "disk_bytes": disk_bytes,
+            "encoded_images": images - unencoded,
+            "unencoded_images": unencoded,
+            "enrollments": enrollments["count"],
+            "enrollments_error": enrollments["error"],
+            "encodings_available": encodings_mtime is not None,
+            "encodings_stale": encodings_stale,
+            "model_available": model_mtime is not None,
+            "model_stale": model_stale,
+            "dataset_available": os.path.isdir(self.config["dataset_path"]),
+            "computed_at": time.time(),
+            "scan_seconds": time.perf_counter() - started,
+            "folders_rescanned": rescanned
+        }
+
+        with self.lock:
+            self.folders = folders
+            self.enroll_cache = enrollments
+            self._snapshot = snapshot
+        self.save_cache()
+        return snapshot
+
+    def refresh_async(self, callback=None):
+        # Concurrent requests share one scan; every caller gets the result
+        # of a scan that started after its request
+        with self.lock:
+            if callback:
+                self.callbacks.append(callback)
+            self.refresh_requested = True
+            if self.refresh_thread is not None:
+                return
+            self.refresh_thread = threading.Thread(target=self._refresh_worker)
+            self.refresh_thread.daemon = True
+            self.refresh_thread.start()
+
+    def _refresh_worker(self):
+        # Requests made during a scan are served by one more scan
+        while True:
+            with self.lock:
+                if not self.refresh_requested:
+                    self.refresh_thread = None
+                    return
+                callbacks, self.callbacks = self.callbacks, []
+                self.refresh_requested = False
+            try:
+                snapshot = self.refresh()
+            except Exception as e:
+                print(f"[ERROR] Dataset stats refresh failed: {e}")
+                snapshot = self.snapshot()
+            for callback in callbacks:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"[ERROR] Dataset stats callback failed: {e}")
+
+if __name__ == "__main__":
+    with open('config/config.json', 'r') as f:
+        config = json.load(f)
+    print(json.dumps(DatasetStatsService(config).refresh(), indent=4))
@@ -2,13 +2,12 @@ import face_recognition
 import pickle
 import cv2
 import os
-import json
-from imutils import paths
+from config_service import get_config_service
+from face_archive import dataset_inventory, iter_face_inputs
 
-def encode_faces():
+def encode_faces(progress=None, cancel_event=None):
     # Load configuration
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = get_config_service()
     
     dataset_path = config["dataset_path"]
     encodings_path = config["encodings_path"]
@@ -17,34 +16,36 @@ def encode_faces():
     # Create output directory if not exists
     os.makedirs(os.path.dirname(encodings_path), exist_ok=True)
     
-    # Get the paths to the images in dataset
-    image_paths = list(paths.list_images(dataset_path))
+    # Packed face archives plus any images not packed yet
+    archives, image_paths, chips = dataset_inventory(dataset_path)
+    total = chips + len(image_paths)
     
-    if len(image_paths) == 0:
+    if total == 0:
         print("[ERROR] No images found in dataset directory")
         return
     
     known_encodings = []
     known_names = []
     
-    # Loop over the image paths
-    for (i, image_path) in enumerate(image_paths):
-        print(f"[INFO] Processing image {i+1}/{len(image_paths)}")
+    # Loop over the archive chips and loose images
+    for (i, (name, image_path, image, boxes)) in enumerate(iter_face_inputs(archives, image_paths)):
+        print(f"[INFO] Processing image {i+1}/{total}")
+        if cancel_event is not None and cancel_event.is_set():
+            print("[INFO] Encoding cancelled; encodings file left unchanged")
+            return None
+        if progress:
+            progress(i / total, f"Image {i+1}/{total}")
         
-        # Extract the person name from the image path
-        name = image_path.split(os.path.sep)[-2].split('_')[0]
-        
-        # Load the input image and convert it from BGR to RGB
-        image = cv2.imread(image_path)
         if image is None:
             print(f"[WARNING] Could not load image: {image_path}")
             continue
             
         rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         
-        # Detect the (x, y)-coordinates of the bounding boxes
-        # corresponding to each face in the input image using HOG
-        boxes = face_recognition.face_locations(rgb, model=detection_method)
+        # Archive chips carry their face box; loose images are detected
+        # here (HOG or CNN) to get the (x, y)-coordinates of each face
+        if boxes is None:
+            boxes = face_recognition.face_locations(rgb, model=detection_method)
         
         if len(boxes) == 0:
             print(f"[WARNING] No faces detected in {image_path}")
@@ -62,11 +63,15 @@ def encode_faces():
     print("[INFO] Saving encodings...")
     data = {"encodings": known_encodings, "names": known_names}
     
-    with open(encodings_path, "wb") as f:
+    # Write to a temp file first so a failure never leaves a truncated pickle
+    tmp_path = encodings_path + ".tmp"
+    with open(tmp_path, "wb") as f:
         f.write(pickle.dumps(data))
+    os.replace(tmp_path, encodings_path)
     
     print(f"[SUCCESS] Encoding completed! Total faces encoded: {len(known_names)}")
     print(f"[INFO] Encodings saved to: {encodings_path}")
+    return len(known_names)
 
 if __name__ == "__main__":
     encode_faces()
\ No newline at end of file
@@ -0,0 +1,100 @@
+from roi import box_iou
+
+NEW, UNRESOLVED, MARKED = 0, 1, 2
+
+class FaceTrack:
+    def __init__(self, track_id, box, tick):
+        self.id = track_id
+        self.box = box
+        self.name = None
+        self.confidence = 0.0
+        self.first_tick = tick
+        self.last_seen_tick = tick
+        self.last_encoded_tick = None
+
+    def area(self):
+        top, right, bottom, left = self.box
+        return (bottom - top) * (right - left)
+
+class EncodingScheduler:
+    # Decides which detected faces get a (costly) encoding this frame.
+    # Boxes are tied to tracks across frames by IoU; each frame at most
+    # `budget` tracks are encoded, ranked by tier (never encoded, then
+    # encoded but not marked present, then already marked), then by how
+    # many frames they have waited, then by size. Deferred tracks keep
+    # their last label, and a marked face that waits max_wait frames is
+    # bumped up a tier so every face is refreshed eventually.
+    def __init__(self, iou_threshold=0.3, ttl=15, max_wait=30):
+        self.iou_threshold = iou_threshold
+        self.ttl = ttl
+        self.max_wait = max_wait
+        self.tracks = []
+        self.next_id = 1
+        self.tick = 0
+        self.encoded = 0
+        self.deferred = 0
+
+    def match(self, boxes):
+        # Greedy IoU association, best overlaps first
+        self.tick += 1
+        pairs = sorted(((box_iou(box, track.box), i, j) for i, box in enumerate(boxes)
+                        for j, track in enumerate(self.tracks)), reverse=True)
+        assigned = [None] * len(boxes)
+        used = set()
+        for iou, i, j in pairs:
+            if iou < self.iou_threshold:
+                break
+            if assigned[i] is None and j not in used:
+                assigned[i] = self.tracks[j]
+                used.add(j)
+
+        for i, box in enumerate(boxes):
+            if assigned[i] is None:
+                assigned[i] = FaceTrack(self.next_id, box, self.tick)
+                self.next_id += 1
+                self.tracks.append(assigned[i])
+            assigned[i].box = box
+            assigned[i].last_seen_tick = self.tick
+
+        self.tracks = [t for t in self.tracks if self.tick - t.last_seen_tick <= self.ttl]
+        return assigned
+
+    def tier(self, track, recognized_names):
+        if track.last_encoded_tick is None:
+            return NEW
+        if track.name is None or track.name not in recognized_names:
+            return UNRESOLVED
+        return UNRESOLVED if self.waited(track) >= self.max_wait else MARKED
+
+    def waited(self, track):
+        return self.tick - (track.last_encoded_tick if track.last_encoded_tick is not None else track.first_tick)
+
+    def select(self, tracks, budget, recognized_names):
+        # Indices into tracks of the faces to encode this frame
+        if len(tracks) <= budget:
+            chosen = list(range(len(tracks)))
+        else:
+            ranked = sorted(range(len(tracks)), key=lambda i: (self.tier(tracks[i], recognized_names),
+                                                               -self.waited(tracks[i]),
+                                                               -tracks[i].area()))
+            chosen = sorted(ranked[:budget])
+        self.encoded += len(chosen)
+        self.deferred += len(tracks) - len(chosen)
+        return chosen
+
+    def update(self, track, name, confidence):
+        track.name = name
+        track.confidence = confidence
+        track.last_encoded_tick = self.tick
+
+    def reset(self):
+        self.tracks = []
+        self.tick = 0
+
+    def stats(self):
+        return {
+            "tracks": len(self.tracks),
+            "encoded": self.encoded,
+            "deferred": self.deferred,
+            "pending": sum(1 for t in self.tracks if t.last_encoded_tick is None)
+        }
@@ -7,18 +7,24 @@ import threading
 import json
 import face_recognition
 from PIL import Image, ImageTk
+from config_service import get_config_service
+from camera_service import get_camera
+from capture_buffer import get_image_writer, encode_jpeg
 
 class FaceEnrollment:
     def __init__(self, root):
         self.root = root
-        self.root.title("Face Enrollment")
-        self.root.geometry("400x300")
-        self.root.resizable(False, False)
+        # Window settings only apply when run standalone; main.py embeds this in a tab frame
+        if isinstance(root, (tk.Tk, tk.Toplevel)):
+            self.root.title("Face Enrollment")
+            self.root.geometry("400x300")
+            self.root.resizable(False, False)
         
         # Load configuration
-        self.config_path = "config/config.json"
-        with open(self.config_path, 'r') as f:
-            self.config = json.load(f)
+        self.config = get_config_service()
+        
+        # Images are written in the background so capture never waits on the disk
+        self.writer = get_image_writer(self.config)
         
         self.stop_event = threading.Event()
         self.cap = None
@@ -134,9 +140,8 @@ class FaceEnrollment:
         
     def capture_faces(self, user_dir, person_name, person_id):
         try:
-            self.cap = cv2.VideoCapture(self.config["camera_index"])
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config["frame_width"])
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config["frame_height"])
+            self.cap = get_camera(self.config["camera_index"], self.config["frame_width"],
+                                  self.config["frame_height"]).subscribe("enrollment")
             
             total_faces = self.config["face_count"]
             detection_model = self.config["detection_method"]
@@ -153,9 +158,9 @@ class FaceEnrollment:
                     face_locations = face_recognition.face_locations(rgb_frame, model=detection_model)
                     
                     if len(face_locations) > 0:
-                        # Save image with face
+                        # Queue image with face for the background writer
                         img_path = os.path.join(user_dir, f"{person_name}_{self.face_count:02d}.jpg")
-                        cv2.imwrite(img_path, frame)
+                        self.writer.submit(img_path, encode_jpeg(frame))
                         self.face_count += 1
                         
                         # Update progress
@@ -171,6 +176,14 @@ class FaceEnrollment:
                     
             self.cap.release()
             
+            # Wait for queued images before recording the enrollment
+            self.status_var.set("Saving images...")
+            self.writer.flush()
+            errors = self.writer.take_errors(user_dir)
+            if errors:
+                self.face_count -= len(errors)
+                messagebox.showerror("Error", f"Failed to save {len(errors)} images:\n{errors[0][1]}")
+            
             if not self.stop_event.is_set():
                 # Update enrollment database
                 self.update_enrollment_db(person_id, person_name, user_dir)
@@ -0,0 +1,209 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections import deque
+from datetime import datetime
+from metrics import get_metrics
+
+FIRST_SEEN = "first_seen"
+LAST_SEEN_UPDATE = "last_seen_update"
+UNKNOWN_FACE = "unknown_face"
+
+class Subscription:
+    # Bounded per-consumer queue. When a consumer falls behind the oldest
+    # events are dropped (and counted) instead of blocking the publisher;
+    # the consumer can catch up from the bus replay buffer by sequence.
+    def __init__(self, bus, name, types=None, maxsize=1000):
+        self.bus = bus
+        self.name = name
+        self.types = set(types) if types else None
+        self.events = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+
+    def wants(self, event):
+        return self.types is None or event["type"] in self.types
+
+    def push(self, event):
+        with self.cond:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            self.cond.notify()
+
+    def get_batch(self, max_items=100, timeout=None):
+        # Waits for the first event, then takes whatever else is queued
+        with self.cond:
+            if not self.events and not self.closed:
+                self.cond.wait(timeout)
+            batch = []
+            while self.events and len(batch) < max_items:
+                batch.append(self.events.popleft())
+            self.delivered += len(batch)
+            return batch
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.bus.unsubscribe(self)
+
+    def stats(self):
+        return {"name": self.name, "queued": len(self.events), "delivered": self.delivered,
+                "dropped": self.dropped}
+
+class EventBus:
+    # In-process publish/subscribe for attendance events. publish() only
+    # appends to bounded deques, so the recognition thread never waits on
+    # a consumer. The last replay_size events are kept for consumers that
+    # reconnect and ask for everything after the last sequence they saw.
+    def __init__(self, replay_size=1000):
+        self.replay = deque(maxlen=replay_size)
+        self.subscribers = []
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        with self.lock:
+            self.seq += 1
+            event = {"seq": self.seq, "type": event_type,
+                     "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "data": data}
+            self.replay.append(event)
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            if subscription.wants(event):
+                subscription.push(event)
+        return event
+
+    def subscribe(self, name, types=None, maxsize=1000, since=None):
+        subscription = Subscription(self, name, types, maxsize)
+        with self.lock:
+            if since is not None:
+                for event in self.replay:
+                    if event["seq"] > since and subscription.wants(event):
+                        subscription.push(event)
+            self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+
+    def add_sink(self, name, handler, types=None, batch_size=100, flush_interval=0.5):
+        # handler(events) runs on its own thread with up to batch_size events
+        subscription = self.subscribe(name, types)
+
+        def dispatch():
+            while not subscription.closed:
+                batch = subscription.get_batch(batch_size, flush_interval)
+                if not batch:
+                    continue
+                try:
+                    handler(batch)
+                except Exception as e:
+                    print(f"[WARNING] Event sink {name} failed: {e}")
+
+        thread = threading.Thread(target=dispatch, name=f"event-sink-{name}")
+        thread.daemon = True
+        thread.start()
+        return subscription
+
+    def stats(self):
+        with self.lock:
+            return {"seq": self.seq, "buffered": len(self.replay),
+                    "subscribers": [s.stats() for s in self.subscribers]}
+
+class NdjsonFileSink:
+    # One JSON event per line, appended and flushed per batch so `tail -f`
+    # consumers see events within the dispatcher flush interval
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def __call__(self, events):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(event) + "\n" for event in events))
+
+class EventStreamHandler(socketserver.StreamRequestHandler):
+    # A client may send one JSON line within a second of connecting, e.g.
+    # {"since": 120, "types": ["first_seen"]}, to replay missed events and
+    # filter types; otherwise it receives every new event as NDJSON. A
+    # client that stops reading is disconnected rather than slowing others.
+    bus = None
+
+    def handle(self):
+        options = {}
+        self.request.settimeout(1.0)
+        try:
+            line = self.rfile.readline(4096)
+            if line.strip():
+                options = json.loads(line)
+        except (socket.timeout, ValueError):
+            pass
+        self.request.settimeout(5.0)
+
+        subscription = self.bus.subscribe(f"socket:{self.client_address[1]}", options.get("types"),
+                                          since=options.get("since"))
+        try:
+            while True:
+                batch = subscription.get_batch(100, 15.0)
+                # An empty line doubles as a keep-alive
+                payload = "".join(json.dumps(event) + "\n" for event in batch) or "\n"
+                self.wfile.write(payload.encode("utf-8"))
+        except OSError:
+            pass
+        finally:
+            subscription.close()
+
+class EventStreamServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+_bus = None
+_started = False
+_lock = threading.Lock()
+
+def get_event_bus(config=None):
+    global _bus
+    with _lock:
+        if _bus is None:
+            _bus = EventBus((config or {}).get("event_replay_size", 1000))
+            bus = _bus
+            metrics = get_metrics()
+            metrics.gauge("event_queue_depth", "Events waiting per consumer", ("consumer",)).set_function(
+                lambda: {(s["name"],): s["queued"] for s in bus.stats()["subscribers"]})
+            metrics.counter("events_dropped_total", "Events dropped for slow consumers", ("consumer",)).set_function(
+                lambda: {(s["name"],): s["dropped"] for s in bus.stats()["subscribers"]})
+        return _bus
+
+def start_event_sinks(config):
+    # File and local socket streams, each switched on in config
+    global _started
+    bus = get_event_bus(config)
+    with _lock:
+        if _started:
+            return bus
+        _started = True
+    if config.get("events_file_enabled", True):
+        path = config.get("events_path", "output/events.ndjson")
+        bus.add_sink("file", NdjsonFileSink(path))
+        print(f"[INFO] Attendance events appended to {path}")
+    if config.get("events_socket_enabled", True):
+        host = config.get("events_host", "127.0.0.1")
+        port = config.get("events_port", 9112)
+        handler = type("Handler", (EventStreamHandler,), {"bus": bus})
+        try:
+            server = EventStreamServer((host, port), handler)
+        except OSError as e:
+            print(f"[ERROR] Failed to start event stream on {host}:{port}: {e}")
+            return bus
+        thread = threading.Thread(target=server.serve_forever, name="event-stream")
+        thread.daemon = True
+        thread.start()
+        print(f"[INFO] Attendance events streamed on {host}:{port}")
+    return bus
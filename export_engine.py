@@ -0,0 +1,201 @@
+import csv
+import gzip
+import json
+import os
+from datetime import datetime
+from json_stream import JsonStreamReader, iter_json_array
+from attendance_retention import AttendanceHistory
+
+ENROLLMENT_COLUMNS = ["id", "name", "class", "enrollment_date", "face_count", "dataset_path"]
+ATTENDANCE_COLUMNS = ["date", "name", "class", "first_seen", "last_seen", "count"]
+
+ENROLLMENT_HEADERS = ["ID", "Name", "Class", "Enrollment Date", "Face Count", "Dataset Path"]
+ATTENDANCE_HEADERS = ["Date", "Name", "Class", "First Seen", "Last Seen", "Count"]
+
+COLUMNAR_FORMAT = "sfa-columnar"
+FORMAT_EXTENSIONS = {"csv": ".csv", "columnar": ".colz"}
+
+class ExportCancelled(Exception):
+    pass
+
+class CsvExportWriter:
+    def __init__(self, path, headers):
+        self.f = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.f, quoting=csv.QUOTE_MINIMAL)
+        self.writer.writerow(headers)
+
+    def write_chunk(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+class ColumnarExportWriter:
+    # Gzipped file: one JSON header line, then one line per chunk holding
+    # each column as its own array. Repeated values within a column sit
+    # next to each other, which is what keeps the output compact.
+    def __init__(self, path, kind, columns):
+        self.f = gzip.open(path, 'wt', encoding='utf-8')
+        header = {"format": COLUMNAR_FORMAT, "version": 1, "kind": kind, "columns": columns}
+        self.f.write(json.dumps(header, separators=(',', ':')) + '\n')
+
+    def write_chunk(self, rows):
+        columns = [list(col) for col in zip(*rows)]
+        block = {"n": len(rows), "data": columns}
+        self.f.write(json.dumps(block, separators=(',', ':')) + '\n')
+
+    def close(self):
+        self.f.close()
+
+def read_columnar(path):
+    # Streams rows back out of a columnar export as dicts
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get("format") != COLUMNAR_FORMAT:
+            raise ValueError(f"Not a columnar export: {path}")
+        columns = header["columns"]
+        for line in f:
+            if not line.strip():
+                continue
+            block = json.loads(line)
+            for values in zip(*block["data"]):
+                yield dict(zip(columns, values))
+
+def person_key(name):
+    # Attendance is keyed by the label encode_face derives from the folder name
+    return str(name).split('_')[0]
+
+def load_class_map(db_path):
+    class_map = {}
+    for enroll in iter_json_array(db_path):
+        cls = enroll.get("class", "")
+        class_map[enroll.get("name", "")] = cls
+        folder = enroll.get("folder") or f"{enroll.get('name', '')}_{enroll.get('id', '')}"
+        class_map.setdefault(person_key(folder), cls)
+    return class_map
+
+def iter_enrollments(db_path, class_filter=None, reader=None):
+    for enroll in iter_json_array(db_path, reader=reader):
+        if class_filter and enroll.get("class") != class_filter:
+            continue
+        yield [
+            enroll.get("id", ""),
+            enroll.get("name", ""),
+            enroll.get("class", ""),
+            enroll.get("enrollment_date", ""),
+            enroll.get("face_count", 0),
+            enroll.get("dataset_path", "N/A")
+        ]
+
+def iter_attendance(days, class_map, start_date=None, end_date=None, class_filter=None):
+    # days yields (date, people); ISO dates compare chronologically as strings
+    for date, people in days:
+        if start_date and date < start_date:
+            continue
+        if end_date and date > end_date:
+            continue
+        for name, record in people.items():
+            cls = class_map.get(name, "")
+            if class_filter and cls != class_filter:
+                continue
+            yield [
+                date,
+                name,
+                cls,
+                record.get("first_seen", ""),
+                record.get("last_seen", ""),
+                record.get("count", 0)
+            ]
+
+def validate_date(value):
+    if not value:
+        return None
+    datetime.strptime(value, "%Y-%m-%d")
+    return value
+
+class ExportEngine:
+    def __init__(self, config, chunk_size=500):
+        self.config = config
+        self.chunk_size = chunk_size
+        self.output_dir = os.path.join(os.path.dirname(config["attendance_path"]) or "output", "exports")
+
+    def default_path(self, kind, fmt):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.output_dir, f"{kind}_export_{timestamp}{FORMAT_EXTENSIONS[fmt]}")
+
+    def export(self, kind, fmt="csv", out_path=None, start_date=None, end_date=None,
+               class_filter=None, progress=None, cancel_event=None):
+        if kind not in ("enrollments", "attendance"):
+            raise ValueError(f"Unknown export kind: {kind}")
+        if fmt not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        start_date = validate_date(start_date)
+        end_date = validate_date(end_date)
+        class_filter = class_filter or None
+
+        out_path = out_path or self.default_path(kind, fmt)
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+        if kind == "enrollments":
+            reader = JsonStreamReader(self.config["db_path"])
+            rows = iter_enrollments(self.config["db_path"], class_filter, reader=reader)
+            columns, headers = ENROLLMENT_COLUMNS, ENROLLMENT_HEADERS
+        else:
+            class_map = load_class_map(self.config["db_path"])
+            # Live file plus archived months, read through the same history view as queries
+            reader = AttendanceHistory(self.config, start_date, end_date)
+            rows = iter_attendance(reader, class_map, start_date, end_date, class_filter)
+            columns, headers = ATTENDANCE_COLUMNS, ATTENDANCE_HEADERS
+
+        # Write to a temp file so a cancelled or failed export leaves nothing behind
+        tmp_path = out_path + ".part"
+        if fmt == "csv":
+            writer = CsvExportWriter(tmp_path, headers)
+        else:
+            writer = ColumnarExportWriter(tmp_path, kind, columns)
+
+        total = 0
+        chunk = []
+        try:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    writer.write_chunk(chunk)
+                    total += len(chunk)
+                    chunk = []
+                    if progress:
+                        progress(reader.progress(), total)
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ExportCancelled()
+            if chunk:
+                writer.write_chunk(chunk)
+                total += len(chunk)
+            writer.close()
+            os.replace(tmp_path, out_path)
+        except BaseException:
+            writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if progress:
+            progress(1.0, total)
+        print(f"[EXPORT] Wrote {total} {kind} rows to {out_path}")
+        return out_path, total
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export enrollments or attendance")
+    parser.add_argument("kind", choices=["enrollments", "attendance"])
+    parser.add_argument("--format", default="csv", choices=list(FORMAT_EXTENSIONS))
+    parser.add_argument("--from", dest="start_date")
+    parser.add_argument("--to", dest="end_date")
+    parser.add_argument("--class", dest="class_filter")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    with open('config/config.json', 'r') as f:
+        config = json.load(f)
+
+    engine = ExportEngine(config)
+    engine.export(args.kind, args.format, args.output, args.start_date, args.end_date, args.class_filter)
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import shutil
+import struct
+import time
+from datetime import datetime
+from multiprocessing import Pool
+import cv2
+import numpy as np
+from imutils import paths
+from capture_buffer import encode_jpeg
+
+ARCHIVE_EXTENSION = ".faces"
+MAGIC = b"SFCHIPS1"
+FOOTER = struct.Struct("<Q8s")
+
+# File layout: MAGIC, the JPEG chips back to back, a JSON index, then a
+# footer holding the index offset and MAGIC again. Readers seek to the
+# footer, load the index and stream chips in order with one open file.
+
+def archive_path(dataset_path, folder):
+    return os.path.join(dataset_path, folder + ARCHIVE_EXTENSION)
+
+def write_archive(path, person, chips):
+    # chips: (source file name, JPEG bytes, box in the chip, source mtime)
+    entries = []
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        for source, payload, box, mtime in chips:
+            entries.append({"source": source, "offset": f.tell(), "length": len(payload),
+                            "box": [int(v) for v in box], "mtime": mtime})
+            f.write(payload)
+        index_offset = f.tell()
+        f.write(json.dumps({"person": person, "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            "chips": entries}).encode("utf-8"))
+        f.write(FOOTER.pack(index_offset, MAGIC))
+    os.replace(tmp_path, path)
+    return entries
+
+class FaceArchive:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.file.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a face archive")
+            self.file.seek(index_offset)
+            index = json.loads(self.file.read(os.path.getsize(path) - FOOTER.size - index_offset))
+        except Exception:
+            self.file.close()
+            raise
+        self.person = index["person"]
+        self.created = index["created"]
+        self.entries = index["chips"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        self.file.close()
+
+    def sources(self):
+        return {entry["source"] for entry in self.entries}
+
+    def read(self, entry):
+        self.file.seek(entry["offset"])
+        return self.file.read(entry["length"])
+
+    def __iter__(self):
+        # Yields (entry, BGR chip); chips are stored in file order, so this is a sequential read
+        for entry in self.entries:
+            image = cv2.imdecode(np.frombuffer(self.read(entry), dtype=np.uint8), cv2.IMREAD_COLOR)
+            yield entry, image
+
+def chip_from_frame(image, box, margin=0.4, max_face=200):
+    # Padded crop around the detected face, downscaled so the face is at most
+    # max_face pixels wide (dlib aligns to a 150px chip, so nothing is lost),
+    # with the face box translated into chip coordinates
+    top, right, bottom, left = box
+    pad_y, pad_x = int((bottom - top) * margin), int((right - left) * margin)
+    h, w = image.shape[:2]
+    y0, x0 = max(0, top - pad_y), max(0, left - pad_x)
+    chip = image[y0:min(h, bottom + pad_y), x0:min(w, right + pad_x)]
+    box = (top - y0, right - x0, bottom - y0, left - x0)
+    scale = min(1.0, max_face / max(1, right - left))
+    if scale < 1.0:
+        chip = cv2.resize(chip, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        box = tuple(int(round(v * scale)) for v in box)
+    return chip, box
+
+def list_archives(dataset_path):
+    if not os.path.isdir(dataset_path):
+        return []
+    return sorted(os.path.join(dataset_path, name) for name in os.listdir(dataset_path)
+                  if name.endswith(ARCHIVE_EXTENSION))
+
+def image_key(image_path):
+    # (person folder, file name), the way archive entries record their source
+    return os.path.basename(os.path.dirname(image_path)), os.path.basename(image_path)
+
+def dataset_inventory(dataset_path):
+    # Archives plus the loose images they do not already hold, so people
+    # enrolled or topped up after compaction are still encoded. Re-captures
+    # reuse file names, so a loose image newer than its packed chip counts
+    # as loose and replaces that chip.
+    archives = list_archives(dataset_path)
+    packed = {}
+    for path in archives:
+        with FaceArchive(path) as archive:
+            for entry in archive.entries:
+                key = (archive.person, entry["source"])
+                packed[key] = max(packed.get(key, 0), entry.get("mtime") or 0)
+    loose = [p for p in paths.list_images(dataset_path)
+             if image_key(p) not in packed or os.path.getmtime(p) > packed[image_key(p)]]
+    superseded = {image_key(p) for p in loose}
+    chips = 0
+    for path in archives:
+        with FaceArchive(path) as archive:
+            chips += sum((archive.person, entry["source"]) not in superseded for entry in archive.entries)
+    return archives, loose, chips
+
+def iter_face_inputs(archives, loose):
+    # Yields (name, label, BGR image, boxes). Archive chips come with their
+    # face box, so the caller skips detection; loose images have boxes None.
+    # Chips whose source image is also loose were re-captured and are skipped.
+    superseded = {image_key(p) for p in loose}
+    for path in archives:
+        with FaceArchive(path) as archive:
+            name = archive.person.split('_')[0]
+            for entry in archive.entries:
+                if (archive.person, entry["source"]) in superseded:
+                    continue
+                image = cv2.imdecode(np.frombuffer(archive.read(entry), dtype=np.uint8), cv2.IMREAD_COLOR)
+                yield name, f"{path}:{entry['source']}", image, [tuple(entry["box"])]
+    for image_path in loose:
+        yield image_path.split(os.path.sep)[-2].split('_')[0], image_path, cv2.imread(image_path), None
+
+def folder_bytes(path):
+    return sum(os.path.getsize(p) for p in paths.list_images(path))
+
+def compact_person(args):
+    # Runs in a worker process: detect once, store chips, return a summary
+    import face_recognition
+    folder_path, detection_method, quality, margin, max_face = args
+    folder = os.path.basename(folder_path)
+    chips = []
+    skipped = 0
+    image_paths = sorted(paths.list_images(folder_path))
+    for image_path in image_paths:
+        image = cv2.imread(image_path)
+        if image is None:
+            skipped += 1
+            continue
+        boxes = face_recognition.face_locations(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), model=detection_method)
+        if not boxes:
+            skipped += 1
+            continue
+        for box in boxes:
+            chip, chip_box = chip_from_frame(image, box, margin, max_face)
+            chips.append((os.path.basename(image_path), encode_jpeg(chip, quality),
+                          chip_box, os.path.getmtime(image_path)))
+    # Images packed by an earlier run stay in the archive unless re-captured
+    path = archive_path(os.path.dirname(folder_path), folder)
+    bytes_before = folder_bytes(folder_path)
+    if os.path.exists(path):
+        bytes_before += os.path.getsize(path)
+        current = {chip[0] for chip in chips}
+        with FaceArchive(path) as archive:
+            chips = [(e["source"], archive.read(e), e["box"], e["mtime"])
+                     for e in archive.entries if e["source"] not in current] + chips
+    write_archive(path, folder, chips)
+    return {"folder": folder, "images": len(image_paths), "chips": len(chips), "skipped": skipped,
+            "bytes_before": bytes_before, "bytes_after": os.path.getsize(path)}
+
+def compact_dataset(config, workers=None, quality=95, margin=0.4, max_face=200, keep_originals=False):
+    dataset_path = config["dataset_path"]
+    folders = sorted(entry.path for entry in os.scandir(dataset_path)
+                     if entry.is_dir() and entry.name != "unknown"
+                     and next(paths.list_images(entry.path), None) is not None)
+    tasks = [(path, config["detection_method"], quality, margin, max_face) for path in folders]
+    results = []
+    with Pool(workers) as pool:
+        for i, result in enumerate(pool.imap_unordered(compact_person, tasks)):
+            print(f"[INFO] {i + 1}/{len(tasks)} {result['folder']}: {result['chips']} chips from "
+                  f"{result['images']} images ({result['skipped']} without a face)")
+            results.append(result)
+            if not keep_originals and result["skipped"] == 0:
+                shutil.rmtree(os.path.join(dataset_path, result["folder"]))
+            elif not keep_originals:
+                print(f"[WARNING] Kept {result['folder']} because some images had no detectable face")
+    return results
+
+def time_encoding(dataset_path, detection_method, limit=100):
+    # Seconds per face for the encode_faces input path over the current layout
+    import face_recognition
+    archives, loose, _ = dataset_inventory(dataset_path)
+    count = 0
+    start = time.perf_counter()
+    for name, label, image, boxes in iter_face_inputs(archives, loose):
+        if image is None:
+            continue
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        if boxes is None:
+            boxes = face_recognition.face_locations(rgb, model=detection_method)
+        if boxes:
+            face_recognition.face_encodings(rgb, boxes)
+        count += 1
+        if count >= limit:
+            break
+    return (time.perf_counter() - start) / count if count else None
+
+if __name__ == "__main__":
+    from config_service import get_config_service
+    parser = argparse.ArgumentParser(description="Pack each person's dataset folder into a face chip archive")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--quality", type=int, default=95, help="JPEG quality of the stored chips")
+    parser.add_argument("--max-face", type=int, default=200, help="Largest stored face width in pixels")
+    parser.add_argument("--keep-originals", action="store_true", help="Leave the full-frame images in place")
+    parser.add_argument("--sample", type=int, default=100, help="Images timed before and after (0 to skip)")
+    args = parser.parse_args()
+
+    config = get_config_service()
+    dataset_path = config["dataset_path"]
+    before = time_encoding(dataset_path, config["detection_method"], args.sample) if args.sample else None
+    results = compact_dataset(config, args.workers, args.quality, max_face=args.max_face,
+                              keep_originals=args.keep_originals)
+    after = time_encoding(dataset_path, config["detection_method"], args.sample) if args.sample else None
+
+    bytes_before = sum(r["bytes_before"] for r in results)
+    bytes_after = sum(r["bytes_after"] for r in results)
+    print(f"[SUCCESS] Packed {len(results)} people, {sum(r['images'] for r in results)} images into "
+          f"{sum(r['chips'] for r in results)} chips")
+    print(f"[INFO] Disk: {bytes_before / (1024 * 1024):.1f} MB -> {bytes_after / (1024 * 1024):.1f} MB")
+    if before and after:
+        print(f"[INFO] Encoding: {before * 1000:.1f} ms/image -> {after * 1000:.1f} ms/image "
+              f"({before / after:.1f}x faster)")
@@ -0,0 +1,221 @@
+import json
+import os
+import queue
+import statistics
+import threading
+import time
+from datetime import datetime
+from metrics import get_metrics
+
+QUEUED, WAITING, RUNNING, DONE, FAILED, CANCELLED = "queued", "waiting", "running", "done", "failed", "cancelled"
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, job_id, kind, name, target, resources, on_done):
+        self.id = job_id
+        self.kind = kind
+        self.name = name
+        self.target = target
+        self.resources = sorted(set(resources))
+        self.on_done = on_done
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.runner = None
+
+    def report(self, fraction, message=None):
+        # Called by the job body; doubles as a cancellation point
+        self.progress = max(0.0, min(1.0, fraction))
+        if message is not None:
+            self.message = message
+        self.runner.emit(self)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def duration(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "duration": self.duration()
+        }
+
+class JobRunner:
+    # Runs long batch work off the GUI thread. Jobs that name the same
+    # resource run one after another; everything else runs concurrently.
+    # Progress snapshots are pushed onto self.events for the UI to drain.
+    def __init__(self, history_path="output/job_history.json", max_history=500,
+                 regression_factor=1.5):
+        self.history_path = history_path
+        self.max_history = max_history
+        self.regression_factor = regression_factor
+        self.events = queue.Queue()
+        self.jobs = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.resource_locks = {}
+        self.history = self.load_history()
+
+    def load_history(self):
+        if os.path.exists(self.history_path):
+            try:
+                with open(self.history_path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[WARNING] Ignoring job history: {e}")
+        return []
+
+    def save_history(self):
+        os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+        tmp_path = self.history_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.history[-self.max_history:], f, indent=4)
+        os.replace(tmp_path, self.history_path)
+
+    def emit(self, job):
+        self.events.put(job.snapshot())
+
+    def submit(self, kind, target, resources=(), name=None, on_done=None):
+        # target(job) does the work; on_done(job) runs on the worker thread afterwards
+        with self.lock:
+            job = Job(self.next_id, kind, name or kind, target, resources, on_done)
+            job.runner = self
+            self.jobs[job.id] = job
+            self.next_id += 1
+            for resource in job.resources:
+                self.resource_locks.setdefault(resource, threading.Lock())
+        self.emit(job)
+        thread = threading.Thread(target=self._run, args=(job,))
+        thread.daemon = True
+        thread.start()
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job and job.status in (QUEUED, WAITING, RUNNING):
+            job.cancel_event.set()
+            job.message = "Cancelling..."
+            self.emit(job)
+
+    def active_jobs(self):
+        return [j for j in self.jobs.values() if j.status in (QUEUED, WAITING, RUNNING)]
+
+    def acquire_resources(self, job):
+        # Locks are taken in sorted order so two jobs can never deadlock
+        acquired = []
+        for resource in job.resources:
+            lock = self.resource_locks[resource]
+            while not lock.acquire(timeout=0.2):
+                if job.cancel_event.is_set():
+                    for held in acquired:
+                        held.release()
+                    return None
+            acquired.append(lock)
+        return acquired
+
+    def _run(self, job):
+        job.status = WAITING
+        job.message = "Waiting for " + ", ".join(job.resources) if job.resources else ""
+        self.emit(job)
+        held = self.acquire_resources(job)
+        if held is None:
+            job.status = CANCELLED
+            self.emit(job)
+            return
+
+        job.status = RUNNING
+        job.message = ""
+        job.started = time.time()
+        self.emit(job)
+        try:
+            job.result = job.target(job)
+            job.status = CANCELLED if job.cancel_event.is_set() else DONE
+        except Exception as e:
+            # Any exception after a cancel request is the job unwinding, not a failure
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+            else:
+                job.status = FAILED
+                job.error = e
+                job.message = str(e)
+                print(f"[ERROR] Job {job.id} ({job.name}) failed: {e}")
+        finally:
+            job.finished = time.time()
+            for lock in held:
+                lock.release()
+
+        if job.status == DONE:
+            job.progress = 1.0
+            self.check_regression(job)
+        self.record(job)
+        self.emit(job)
+        if job.on_done:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                print(f"[ERROR] Job {job.id} completion handler failed: {e}")
+
+    def baseline(self, kind, window=10):
+        durations = [h["duration"] for h in self.history if h["kind"] == kind and h["status"] == DONE]
+        if len(durations) < 3:
+            return None
+        return statistics.median(durations[-window:])
+
+    def check_regression(self, job):
+        baseline = self.baseline(job.kind)
+        if baseline and baseline > 0.5 and job.duration() > baseline * self.regression_factor:
+            job.message = f"Slower than usual: {job.duration():.1f}s vs median {baseline:.1f}s"
+            print(f"[JOBS] Possible regression in {job.kind}: {job.message}")
+
+    def record(self, job):
+        with self.lock:
+            self.history.append({
+                "kind": job.kind,
+                "name": job.name,
+                "status": job.status,
+                "duration": round(job.duration(), 3),
+                "finished": datetime.fromtimestamp(job.finished).strftime("%Y-%m-%d %H:%M:%S")
+            })
+            try:
+                self.save_history()
+            except Exception as e:
+                print(f"[WARNING] Could not save job history: {e}")
+
+    def summary(self):
+        # Median duration per job kind, for spotting regressions at a glance
+        kinds = sorted({h["kind"] for h in self.history})
+        return {kind: {"runs": sum(1 for h in self.history if h["kind"] == kind),
+                       "median_seconds": self.baseline(kind)} for kind in kinds}
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_job_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+            runner = _runner
+            get_metrics().gauge("jobs_active", "Background jobs not yet finished", ("status",)).set_function(
+                lambda: {(status,): sum(1 for j in runner.active_jobs() if j.status == status)
+                         for status in (QUEUED, WAITING, RUNNING)})
+        return _runner
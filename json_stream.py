@@ -0,0 +1,111 @@
+import codecs
+import json
+import os
+
+CHUNK_SIZE = 64 * 1024
+
+class JsonStreamReader:
+    # Incremental reader for the top level of a large JSON file. Only one
+    # element (or one key/value pair) is held in memory at a time, so the
+    # cost of walking a file does not grow with its length.
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.total_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+        self.bytes_read = 0
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.path, 'rb')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+    def progress(self):
+        if self.total_bytes == 0:
+            return 1.0
+        return min(1.0, self.bytes_read / self.total_bytes)
+
+    def fill(self):
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self.text_decoder.decode(b"", final=True)
+            self.pos = 0
+            return False
+        self.bytes_read += len(data)
+        # Drop the consumed prefix so the buffer stays bounded
+        self.buf = self.buf[self.pos:] + self.text_decoder.decode(data)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at byte ~{self.bytes_read} of {self.path}, found '{found}'")
+        self.pos += 1
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A value ending exactly at the buffer edge may be a truncated number
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE, reader=None):
+    # Yields the elements of a top-level JSON array one at a time
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with (reader or JsonStreamReader(path, chunk_size)) as r:
+        r.expect('[')
+        if r.peek() == ']':
+            return
+        while True:
+            yield r.decode_value()
+            sep = r.peek()
+            if sep == ']':
+                return
+            r.expect(',')
+
+def iter_json_object(path, chunk_size=CHUNK_SIZE, reader=None):
+    # Yields (key, value) pairs of a top-level JSON object one at a time
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with (reader or JsonStreamReader(path, chunk_size)) as r:
+        r.expect('{')
+        if r.peek() == '}':
+            return
+        while True:
+            key = r.decode_value()
+            r.expect(':')
+            yield key, r.decode_value()
+            sep = r.peek()
+            if sep == '}':
+                return
+            r.expect(',')
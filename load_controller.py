@@ -0,0 +1,83 @@
+from collections import deque
+
+class LatencyController:
+    # Feedback loop around recognize_faces. Per-frame latency is smoothed
+    # and compared with latency_budget_ms; over budget the controller sheds
+    # work one step at a time (fewer faces encoded, then a smaller detection
+    # scale, then more skipped frames) and under budget it restores quality
+    # in the reverse order. The configured scale and skip are the ceilings.
+    def __init__(self, settings, window=5, cooldown=10):
+        self.window = window
+        self.cooldown = cooldown
+        self.decisions = deque(maxlen=50)
+        self.configure(settings)
+
+    def configure(self, settings):
+        self.enabled = settings.get("controller_enabled", True)
+        self.budget = settings.get("latency_budget_ms", 150) / 1000.0
+        self.base_scale = settings["detection_scale"]
+        self.base_skip = settings["detection_skip"]
+        self.min_scale = min(self.base_scale, settings.get("min_detection_scale", 0.5))
+        self.max_skip = max(self.base_skip, settings.get("max_detection_skip", 4))
+        self.min_faces = settings.get("min_faces_per_frame", 2)
+        self.max_faces_limit = settings.get("max_faces_per_frame", 20)
+        self.reset()
+
+    def reset(self):
+        self.scale = self.base_scale
+        self.skip = self.base_skip
+        self.max_faces = self.max_faces_limit
+        self.latency = None
+        self.frames_since_change = 0
+
+    def update(self, latency, n_faces):
+        if not self.enabled:
+            return
+        # Exponential moving average so one slow frame does not trigger a change
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.frames_since_change += 1
+        if self.frames_since_change < max(self.window, self.cooldown):
+            return
+
+        if self.latency > self.budget:
+            self.degrade(n_faces)
+        elif self.latency < 0.6 * self.budget:
+            self.restore()
+
+    def degrade(self, n_faces):
+        if n_faces > self.min_faces and self.max_faces > self.min_faces:
+            self.change("max_faces", self.max_faces, max(self.min_faces, min(self.max_faces, n_faces) - 1))
+        elif self.scale > self.min_scale:
+            self.change("scale", self.scale, max(self.min_scale, round(self.scale - 0.1, 2)))
+        elif self.skip < self.max_skip:
+            self.change("skip", self.skip, self.skip + 1)
+
+    def restore(self):
+        if self.skip > self.base_skip:
+            self.change("skip", self.skip, self.skip - 1)
+        elif self.scale < self.base_scale:
+            self.change("scale", self.scale, min(self.base_scale, round(self.scale + 0.1, 2)))
+        elif self.max_faces < self.max_faces_limit:
+            self.change("max_faces", self.max_faces, min(self.max_faces_limit, self.max_faces + 2))
+
+    def change(self, knob, old, new):
+        if old == new:
+            return
+        setattr(self, knob, new)
+        self.frames_since_change = 0
+        direction = "over" if self.latency > self.budget else "under"
+        message = (f"latency {self.latency * 1000:.0f} ms {direction} budget {self.budget * 1000:.0f} ms: "
+                   f"{knob} {old} -> {new}")
+        self.decisions.append(message)
+        print(f"[CONTROL] {message}")
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "latency_ms": (self.latency or 0.0) * 1000,
+            "budget_ms": self.budget * 1000,
+            "scale": self.scale,
+            "skip": self.skip,
+            "max_faces": self.max_faces,
+            "last_decision": self.decisions[-1] if self.decisions else None
+        }
@@ -1,14 +1,25 @@
+import time
+
+# Startup is measured from here to the first painted window
+STARTED = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import threading
-import cv2
-from PIL import Image, ImageTk
 import json
 import os
-from enroll import FaceEnrollment
-from recognition import FaceRecognizer
-from attendance_enroll_info_check_and_delete_id import EnrollmentManager
-from unknown_face_enroll import UnknownFaceEnroll
+# cv2, PIL, face_recognition and sklearn are imported where they are first
+# used (tabs, recognition, warm-up thread) so the window appears without them
+from export_engine import ExportEngine
+from dataset_stats import DatasetStatsService
+from config_service import get_config_service, LIVE_SETTINGS
+from model_store import ModelStore
+from roi import get_rois
+from jobs import get_job_runner, DONE, FAILED, CANCELLED, RUNNING
+from metrics import start_metrics_server, get_metrics
+from attendance_query import start_attendance_api, get_attendance_index
+from event_bus import start_event_sinks
+from class_sessions import ClassSessionManager, build_class_models
 
 class SmartFaceAttendanceSystem:
     def __init__(self, root):
@@ -17,22 +28,50 @@ class SmartFaceAttendanceSystem:
         self.root.geometry("1000x700")
         self.root.state('zoomed')  # Start maximized
         
-        # Load configuration
-        with open('config/config.json', 'r') as f:
-            self.config = json.load(f)
+        # Load configuration and pick up edits made to the file while running
+        self.config = get_config_service()
+        self.config.start_watching()
+        
+        # Local Prometheus endpoint for monitoring stations remotely
+        start_metrics_server(self.config)
+        
+        # Query service for HR and timetable systems, fed by the recognizer;
+        # started off the UI thread so the window paints straight away
+        api_thread = threading.Thread(target=start_attendance_api, args=(self.config,), name="attendance-api-start")
+        api_thread.daemon = True
+        api_thread.start()
+        
+        # Push attendance events to a file and a local socket as they happen
+        start_event_sinks(self.config)
         
         self.recognizer = None
+        self.live_recognizer = None
+        self.warmup_thread = None
+        self.replaying = False
+        self.dataset_stats = DatasetStatsService(self.config)
+        self.jobs = get_job_runner()
+        self.export_job_id = None
         self.stop_event = threading.Event()
         self.cap = None
+        self.recorder = None
         self.is_recognition_running = False
         
+        # Class sessions swap in a per-roster model, manually or from the timetable
+        self.sessions = ClassSessionManager(self.config)
+        
         self.setup_ui()
         self.load_config_status()
+        self.root.after(1000, self.check_timetable)
+        self.root.after_idle(self.on_first_paint)
         
     def setup_ui(self):
         # Create main menu
         self.create_menu()
         
+        # Shows whether the background warm-up has loaded the recognition models
+        self.ready_var = tk.StringVar(value="⏳ Loading recognition models...")
+        ttk.Label(self.root, textvariable=self.ready_var, anchor='w').pack(side=tk.BOTTOM, fill='x', padx=10)
+        
         # Create notebook for tabs
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=10)
@@ -62,11 +101,75 @@ class SmartFaceAttendanceSystem:
         self.unknown_frame = ttk.Frame(self.notebook, padding="10")
         self.notebook.add(self.unknown_frame, text="❓ Unknown Faces")
         
+        # Jobs tab
+        self.jobs_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(self.jobs_frame, text="🧰 Jobs")
+        
+        # The jobs tab also pumps job events, so it is built now; the other
+        # tabs are built the first time they are shown
+        self.tab_builders = {
+            str(self.enrollment_frame): self.setup_enrollment_tab,
+            str(self.attendance_frame): self.setup_attendance_tab,
+            str(self.management_frame): self.setup_management_tab,
+            str(self.unknown_frame): self.setup_unknown_tab
+        }
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        
         self.setup_recognition_tab()
-        self.setup_enrollment_tab()
-        self.setup_attendance_tab()
-        self.setup_management_tab()
-        self.setup_unknown_tab()
+        self.setup_jobs_tab()
+        
+    def on_tab_changed(self, event):
+        builder = self.tab_builders.pop(self.notebook.select(), None)
+        if builder:
+            started = time.perf_counter()
+            builder()
+            print(f"[INFO] Built {self.notebook.tab('current', 'text')} tab in "
+                  f"{(time.perf_counter() - started) * 1000:.0f} ms")
+            
+    def on_first_paint(self):
+        # Runs once the window has been laid out and drawn
+        self.root.update_idletasks()
+        seconds = time.perf_counter() - STARTED
+        get_metrics().gauge("startup_first_paint_seconds", "Time from launch to the first painted window").set(seconds)
+        print(f"[INFO] Startup: first paint after {seconds * 1000:.0f} ms")
+        self.start_warmup()
+        
+    def start_warmup(self):
+        # Import dlib/sklearn and load the model off the UI thread
+        def warm():
+            started = time.perf_counter()
+            try:
+                from recognition import FaceRecognizer
+                recognizer, error = FaceRecognizer(), None
+            except Exception as e:
+                recognizer, error = None, e
+            self.root.after(0, self.on_warmup_done, recognizer, error, time.perf_counter() - started)
+            
+        self.warmup_thread = threading.Thread(target=warm, name="warmup")
+        self.warmup_thread.daemon = True
+        self.warmup_thread.start()
+        
+    def on_warmup_done(self, recognizer, error, seconds):
+        if error is not None:
+            print(f"[ERROR] Warm-up failed: {error}")
+            self.ready_var.set(f"⚠️ Recognition models failed to load: {error}")
+            return
+        if self.recognizer is None:
+            self.attach_recognizer(recognizer)
+            self.recognizer = recognizer
+        print(f"[INFO] Recognition models warmed up in {seconds:.2f}s")
+        if recognizer.model is None:
+            self.ready_var.set("⚠️ No trained model yet - use File > Train Model")
+        else:
+            self.ready_var.set(f"✅ Ready - recognition models loaded in {seconds:.1f}s")
+            
+    def attach_recognizer(self, recognizer):
+        # Listeners and the class session model for the live recognizer
+        if self.config.get("attendance_api_enabled", True):
+            recognizer.add_attendance_listener(get_attendance_index(self.config).on_attendance)
+        recognizer.add_attendance_listener(self.sessions.on_attendance)
+        if self.sessions.model_data:
+            recognizer.request_model_swap(self.sessions.model_data)
         
     def create_menu(self):
         menubar = tk.Menu(self.root)
@@ -77,6 +180,8 @@ class SmartFaceAttendanceSystem:
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Encode Faces", command=self.encode_faces)
         file_menu.add_command(label="Train Model", command=self.train_model)
+        file_menu.add_command(label="Rollback Model", command=self.rollback_model)
+        file_menu.add_command(label="Build Class Models", command=self.build_class_models)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         
@@ -85,6 +190,10 @@ class SmartFaceAttendanceSystem:
         menubar.add_cascade(label="Tools", menu=tools_menu)
         tools_menu.add_command(label="System Status", command=self.show_system_status)
         tools_menu.add_command(label="Configuration", command=self.show_configuration)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Start Recording", command=self.start_recording)
+        tools_menu.add_command(label="Stop Recording", command=self.stop_recording)
+        tools_menu.add_command(label="Replay Session...", command=self.replay_session)
         
         # Help menu
         help_menu = tk.Menu(menubar, tearoff=0)
@@ -106,7 +215,7 @@ class SmartFaceAttendanceSystem:
         • Automated Attendance Marking
         • HOG-based Face Detection
         • SVM-based Recognition
-        • Attendance Reports & Export
+        • Attendance Reports & Export (CSV / columnar)
         
         🚀 GETTING STARTED:
         1. Enroll faces using the 'Face Enrollment' tab
@@ -134,13 +243,15 @@ class SmartFaceAttendanceSystem:
         
         self.status_labels = {}
         status_items = [
-            ("Enrollments", "database/enroll.json"),
-            ("Encodings", "output/encodings.pickle"),
-            ("Trained Model", "output/recognizer.pickle"),
-            ("Dataset", "dataset/")
+            ("Enrollments", "enrollments"),
+            ("Encodings", "encodings"),
+            ("Trained Model", "model"),
+            ("Dataset", "dataset"),
+            ("Encoded Images", "encoded"),
+            ("Disk Usage", "disk")
         ]
         
-        for i, (label, path) in enumerate(status_items):
+        for i, (label, key) in enumerate(status_items):
             row = i // 2
             col = i % 2
             frame = ttk.Frame(status_frame)
@@ -148,8 +259,8 @@ class SmartFaceAttendanceSystem:
             
             ttk.Label(frame, text=f"{label}:").pack(side=tk.LEFT)
             status_var = tk.StringVar()
-            self.status_labels[path] = status_var
-            ttk.Label(frame, textvariable=status_var, width=20).pack(side=tk.LEFT, padx=5)
+            self.status_labels[key] = status_var
+            ttk.Label(frame, textvariable=status_var, width=30).pack(side=tk.LEFT, padx=5)
             
         # Refresh button
         ttk.Button(self.welcome_frame, text="Refresh Status", 
@@ -180,6 +291,33 @@ class SmartFaceAttendanceSystem:
                                    command=self.reset_attendance, width=20)
         self.reset_btn.pack(side=tk.LEFT, padx=5)
         
+        self.roi_btn = ttk.Button(control_frame, text="✏️ Edit Detection Regions", 
+                                 command=self.edit_rois, width=24)
+        self.roi_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Class session
+        session_frame = ttk.Frame(self.recognition_frame)
+        session_frame.pack(fill='x', pady=5)
+        
+        ttk.Label(session_frame, text="Class:").pack(side=tk.LEFT, padx=5)
+        self.session_class_var = tk.StringVar()
+        self.session_combo = ttk.Combobox(session_frame, textvariable=self.session_class_var,
+                                          values=self.sessions.classes(), state="readonly", width=20,
+                                          postcommand=lambda: self.session_combo.config(values=self.sessions.classes()))
+        self.session_combo.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(session_frame, text="▶️ Start Session", command=self.start_session,
+                   width=16).pack(side=tk.LEFT, padx=5)
+        ttk.Button(session_frame, text="⏏️ End Session", command=self.end_session,
+                   width=16).pack(side=tk.LEFT, padx=5)
+        
+        self.auto_session_var = tk.BooleanVar(value=self.config.get("auto_sessions", False))
+        ttk.Checkbutton(session_frame, text="Follow timetable",
+                        variable=self.auto_session_var).pack(side=tk.LEFT, padx=5)
+        
+        self.session_var = tk.StringVar(value="No class session (all enrolled people)")
+        ttk.Label(session_frame, textvariable=self.session_var).pack(side=tk.LEFT, padx=10)
+        
         # Status
         status_frame = ttk.Frame(self.recognition_frame)
         status_frame.pack(fill='x', pady=5)
@@ -199,6 +337,7 @@ class SmartFaceAttendanceSystem:
         
     def setup_enrollment_tab(self):
         # Embed enrollment system
+        from enroll import FaceEnrollment
         self.enrollment_app = FaceEnrollment(self.enrollment_frame)
         
     def setup_attendance_tab(self):
@@ -208,53 +347,200 @@ class SmartFaceAttendanceSystem:
                                justify=tk.CENTER, foreground="green")
         instructions.pack(pady=10)
         
-        # We'll implement full attendance viewer in next iteration
-        ttk.Label(self.attendance_frame, text="Attendance management features coming soon...",
-                 font=('Arial', 12), foreground="blue").pack(pady=50)
+        # Export attendance over a date range
+        export_frame = ttk.LabelFrame(self.attendance_frame, text="Export Attendance", padding="10")
+        export_frame.pack(fill='x', pady=10)
+        
+        filter_frame = ttk.Frame(export_frame)
+        filter_frame.pack(fill='x', pady=5)
+        
+        ttk.Label(filter_frame, text="From (YYYY-MM-DD):").pack(side=tk.LEFT, padx=5)
+        self.export_from_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.export_from_var, width=12).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(filter_frame, text="To:").pack(side=tk.LEFT, padx=5)
+        self.export_to_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.export_to_var, width=12).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(filter_frame, text="Class:").pack(side=tk.LEFT, padx=5)
+        self.export_class_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.export_class_var, width=12).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(filter_frame, text="Format:").pack(side=tk.LEFT, padx=5)
+        self.export_format_var = tk.StringVar(value="csv")
+        ttk.Combobox(filter_frame, textvariable=self.export_format_var, values=["csv", "columnar"],
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=5)
+        
+        self.export_btn = ttk.Button(export_frame, text="📤 Export Attendance",
+                                     command=self.export_attendance, width=20)
+        self.export_btn.pack(pady=5)
+        
+        self.export_progress = ttk.Progressbar(export_frame, mode='determinate')
+        self.export_progress.pack(fill='x', pady=5)
+        
+        self.export_status = tk.StringVar(value="Ready to export")
+        ttk.Label(export_frame, textvariable=self.export_status, foreground="blue").pack()
+        
+    def export_attendance(self):
+        engine = ExportEngine(self.config)
+        options = dict(fmt=self.export_format_var.get(),
+                       start_date=self.export_from_var.get().strip() or None,
+                       end_date=self.export_to_var.get().strip() or None,
+                       class_filter=self.export_class_var.get().strip() or None)
+        self.export_btn.config(state=tk.DISABLED)
+        self.export_progress['value'] = 0
+        self.export_status.set("Exporting attendance...")
+        
+        def run(job):
+            return engine.export("attendance", cancel_event=job.cancel_event,
+                                 progress=lambda fraction, rows: job.report(fraction, f"{rows} rows"),
+                                 **options)
+            
+        job = self.jobs.submit("export", run, resources=("attendance_export",), name="Export attendance",
+                               on_done=lambda job: self.root.after(0, self.on_attendance_exported, job))
+        self.export_job_id = job.id
+        
+    def on_attendance_exported(self, job):
+        self.export_btn.config(state=tk.NORMAL)
+        if job.status == DONE:
+            path, rows = job.result
+            self.export_progress['value'] = 100
+            self.export_status.set(f"Exported {rows} rows to {os.path.basename(path)}")
+            messagebox.showinfo("Success", f"Attendance exported to:\n{path}")
+        elif job.status == CANCELLED:
+            self.export_status.set("Export cancelled")
+        else:
+            self.export_status.set("Export failed")
+            messagebox.showerror("Error", f"Export failed: {job.error}")
+        
+    def setup_jobs_tab(self):
+        columns = ("ID", "Job", "Status", "Progress", "Duration", "Details")
+        self.jobs_tree = ttk.Treeview(self.jobs_frame, columns=columns, show="headings", height=15)
+        column_widths = {"ID": 50, "Job": 160, "Status": 90, "Progress": 80, "Duration": 90, "Details": 350}
+        for col in columns:
+            self.jobs_tree.heading(col, text=col)
+            self.jobs_tree.column(col, width=column_widths[col])
+        self.jobs_tree.pack(fill='both', expand=True, pady=10)
+        
+        button_frame = ttk.Frame(self.jobs_frame)
+        button_frame.pack(pady=5)
+        ttk.Button(button_frame, text="Cancel Selected", 
+                  command=self.cancel_selected_job, width=18).pack(side=tk.LEFT, padx=8)
+        ttk.Button(button_frame, text="Clear Finished", 
+                  command=self.clear_finished_jobs, width=18).pack(side=tk.LEFT, padx=8)
+        
+        # Median durations from past runs, to spot jobs getting slower
+        self.job_history_var = tk.StringVar()
+        ttk.Label(self.jobs_frame, textvariable=self.job_history_var, foreground="blue").pack(pady=5)
+        self.show_job_history()
+        
+        self.poll_job_events()
+        
+    def poll_job_events(self):
+        while not self.jobs.events.empty():
+            snapshot = self.jobs.events.get_nowait()
+            iid = str(snapshot["id"])
+            values = (snapshot["id"], snapshot["name"], snapshot["status"],
+                      f"{snapshot['progress'] * 100:.0f}%", f"{snapshot['duration']:.1f}s", snapshot["message"])
+            if self.jobs_tree.exists(iid):
+                self.jobs_tree.item(iid, values=values)
+            else:
+                self.jobs_tree.insert("", 0, iid=iid, values=values)
+                
+            if snapshot["id"] == self.export_job_id and snapshot["status"] == RUNNING:
+                self.export_progress['value'] = snapshot["progress"] * 100
+                self.export_status.set(f"Exporting... {snapshot['message']}")
+            if snapshot["status"] in (DONE, FAILED, CANCELLED):
+                self.show_job_history()
+        self.root.after(200, self.poll_job_events)
+        
+    def show_job_history(self):
+        summary = self.jobs.summary()
+        parts = [f"{kind}: {info['median_seconds']:.1f}s median over {info['runs']} runs"
+                 for kind, info in summary.items() if info["median_seconds"] is not None]
+        self.job_history_var.set("  •  ".join(parts) or "No job history yet")
+        
+    def cancel_selected_job(self):
+        for iid in self.jobs_tree.selection():
+            self.jobs.cancel(int(iid))
+            
+    def clear_finished_jobs(self):
+        active = {str(job.id) for job in self.jobs.active_jobs()}
+        for iid in self.jobs_tree.get_children():
+            if iid not in active:
+                self.jobs_tree.delete(iid)
         
     def setup_management_tab(self):
         # Embed enrollment manager
+        from attendance_enroll_info_check_and_delete_id import EnrollmentManager
         self.management_app = EnrollmentManager(self.management_frame)
         
     def setup_unknown_tab(self):
         # Embed unknown face enrollment
+        from unknown_face_enroll import UnknownFaceEnroll
         self.unknown_app = UnknownFaceEnroll(self.unknown_frame)
         
     def load_config_status(self):
-        # Update status for each component
-        for path, var in self.status_labels.items():
-            if os.path.exists(path):
-                if path.endswith('.json'):
-                    try:
-                        with open(path, 'r') as f:
-                            data = json.load(f)
-                        if isinstance(data, list):
-                            var.set(f"✓ {len(data)} records")
-                        else:
-                            var.set("✓ Available")
-                    except:
-                        var.set("✗ Corrupted")
-                elif path.endswith('.pickle'):
-                    var.set("✓ Available")
-                else:  # directory
-                    if os.path.isdir(path):
-                        file_count = len([f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))])
-                        var.set(f"✓ {file_count} files")
-                    else:
-                        var.set("✓ Available")
-            else:
-                var.set("✗ Not found")
+        # Show the cached snapshot instantly and rescan changed folders in the background
+        self.show_dataset_stats(self.dataset_stats.snapshot())
+        self.dataset_stats.refresh_async(
+            lambda snapshot: self.root.after(0, self.show_dataset_stats, snapshot))
+        
+    def show_dataset_stats(self, snapshot):
+        if snapshot is None:
+            for var in self.status_labels.values():
+                var.set("… scanning")
+            return
+            
+        if snapshot["enrollments_error"] == "missing":
+            self.status_labels["enrollments"].set("✗ Not found")
+        elif snapshot["enrollments_error"]:
+            self.status_labels["enrollments"].set("✗ Corrupted")
+        else:
+            self.status_labels["enrollments"].set(f"✓ {snapshot['enrollments']} records")
+            
+        if not snapshot["encodings_available"]:
+            self.status_labels["encodings"].set("✗ Not found")
+        elif snapshot["encodings_stale"]:
+            self.status_labels["encodings"].set("⚠ Out of date (new images)")
+        else:
+            self.status_labels["encodings"].set("✓ Available")
+            
+        if not snapshot["model_available"]:
+            self.status_labels["model"].set("✗ Not found")
+        elif snapshot["model_stale"]:
+            self.status_labels["model"].set("⚠ Stale (retrain needed)")
+        else:
+            self.status_labels["model"].set("✓ Available")
+            
+        if snapshot["dataset_available"]:
+            self.status_labels["dataset"].set(
+                f"✓ {snapshot['people']} people, {snapshot['images']} images")
+        else:
+            self.status_labels["dataset"].set("✗ Not found")
+            
+        self.status_labels["encoded"].set(
+            f"{snapshot['encoded_images']} encoded, {snapshot['unencoded_images']} pending")
+        self.status_labels["disk"].set(f"{snapshot['disk_bytes'] / (1024 * 1024):.1f} MB")
                 
-    def start_recognition(self):
+    def start_recognition(self, source=None):
+        if self.warmup_thread is not None and self.warmup_thread.is_alive():
+            # Start as soon as the background warm-up has the models loaded
+            self.recognition_status.set("Waiting for recognition models to load...")
+            self.root.after(200, self.start_recognition, source)
+            return
         if self.recognizer is None:
             try:
+                from recognition import FaceRecognizer
                 self.recognizer = FaceRecognizer()
-                if self.recognizer.model is None:
-                    messagebox.showerror("Error", "Model not loaded. Please train the model first.")
-                    return
+                self.attach_recognizer(self.recognizer)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load recognizer: {e}")
                 return
+        # A model trained since the recognizer was created is still pending
+        if self.recognizer.model is None and self.recognizer.pending_model is None:
+            messagebox.showerror("Error", "Model not loaded. Please train the model first.")
+            return
                 
         self.stop_event.clear()
         self.is_recognition_running = True
@@ -263,7 +549,7 @@ class SmartFaceAttendanceSystem:
         self.recognition_status.set("Recognition started...")
         
         # Start recognition in separate thread
-        thread = threading.Thread(target=self.recognition_loop)
+        thread = threading.Thread(target=self.recognition_loop, args=(source,))
         thread.daemon = True
         thread.start()
         
@@ -282,26 +568,46 @@ class SmartFaceAttendanceSystem:
         if self.recognizer:
             self.recognizer.reset_recognized_names()
             
+        # Put the live recognizer back after a replay
+        if self.replaying:
+            self.end_replay()
+            
     def reset_attendance(self):
         if self.recognizer:
             self.recognizer.reset_recognized_names()
             self.recognition_status.set("Attendance reset - new session started")
             messagebox.showinfo("Reset", "Attendance session reset. New recognitions will be recorded as new entries.")
         
-    def recognition_loop(self):
+    def recognition_loop(self, source=None):
+        import cv2
+        from PIL import Image, ImageTk
+        from camera_service import get_camera
         try:
-            self.cap = cv2.VideoCapture(self.config["camera_index"])
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config["frame_width"])
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config["frame_height"])
+            # A replayed recording stands in for the camera subscription
+            cap = self.cap = source or get_camera(self.config["camera_index"], self.config["frame_width"],
+                                                  self.config["frame_height"]).subscribe("recognition")
             
+            last_display = 0.0
             while not self.stop_event.is_set() and self.is_recognition_running:
-                ret, frame = self.cap.read()
+                ret, frame = cap.read()
                 if ret:
                     # Recognize faces
                     boxes, names, confidences = self.recognizer.recognize_faces(frame)
                     
-                    # Draw recognitions
-                    frame = self.recognizer.draw_recognitions(frame, boxes, names, confidences)
+                    # Empty scene for a while: poll slowly until something moves
+                    if self.recognizer.motion_gate.is_idle():
+                        self.stop_event.wait(self.recognizer.motion_gate.idle_poll_interval)
+                    
+                    # Limit preview updates to display_fps; recognition still sees every frame
+                    now = time.monotonic()
+                    if now - last_display < 1.0 / self.config["display_fps"]:
+                        continue
+                    last_display = now
+                    
+                    # Draw recognitions on a copy; camera frames are shared and read-only
+                    frame = self.recognizer.draw_recognitions(frame.copy(), boxes, names, confidences)
+                    for (x, y, w, h) in self.recognizer.rois:
+                        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 255), 1)
                     
                     # Convert to RGB for display
                     rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -310,13 +616,23 @@ class SmartFaceAttendanceSystem:
                     
                     # Update display
                     self.video_label.imgtk = imgtk
-                    self.video_label.configure(image=imgt)
+                    self.video_label.configure(image=imgtk)
                     
                     # Update status
                     if len(names) > 0 and names[0] != "Unknown":
                         self.recognition_status.set(f"Recognized: {', '.join(set(names))}")
+                    elif self.recognizer.motion_gate.is_idle():
+                        self.recognition_status.set("Idle - waiting for motion...")
                     else:
                         self.recognition_status.set("Monitoring...")
+                    
+                    gate = self.recognizer.motion_gate.stats()
+                    control = self.recognizer.controller.stats()
+                    self.stats_var.set(f"Recognized today: {len(self.recognizer.recognized_names)}  |  "
+                                       f"Frames gated: {gate['gated_fraction'] * 100:.0f}%  |  "
+                                       f"Latency: {control['latency_ms']:.0f}/{control['budget_ms']:.0f} ms "
+                                       f"(scale {control['scale']}, skip {control['skip']}, "
+                                       f"max faces {control['max_faces']})")
                         
                 else:
                     break
@@ -324,6 +640,9 @@ class SmartFaceAttendanceSystem:
             if self.cap:
                 self.cap.release()
                 self.cap = None
+            if source is not None and not self.stop_event.is_set():
+                self.root.after(0, self.stop_recognition)
+                self.root.after(0, lambda: self.recognition_status.set("Replay finished"))
                 
         except Exception as e:
             self.recognition_status.set(f"Error: {str(e)}")
@@ -331,24 +650,284 @@ class SmartFaceAttendanceSystem:
                 self.cap.release()
                 self.cap = None
                 
-    def encode_faces(self):
+    def start_recording(self):
+        if self.recorder is not None:
+            messagebox.showinfo("Recording", f"Already recording to {self.recorder.path}")
+            return
+        os.makedirs(os.path.join("output", "recordings"), exist_ok=True)
+        path = os.path.join("output", "recordings", f"session_{time.strftime('%Y%m%d_%H%M%S')}.sfrec")
         try:
-            import encode_faces
-            encode_faces.encode_faces()
-            messagebox.showinfo("Success", "Face encoding completed successfully!")
+            from camera_service import get_camera
+            from session_recorder import SessionRecorder
+            self.recorder = SessionRecorder(path)
+            self.recorder.start(get_camera(self.config["camera_index"], self.config["frame_width"],
+                                           self.config["frame_height"]))
         except Exception as e:
-            messagebox.showerror("Error", f"Face encoding failed: {e}")
+            self.recorder = None
+            messagebox.showerror("Error", f"Failed to start recording: {e}")
+            return
+        self.recognition_status.set(f"Recording camera to {path}")
+        
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        recorder, self.recorder = self.recorder, None
+        recorder.stop()
+        messagebox.showinfo("Recording", f"Saved {recorder.frames} frames to {recorder.path}")
+        
+    def replay_session(self):
+        if self.is_recognition_running:
+            messagebox.showwarning("Warning", "Stop recognition before replaying a session")
+            return
+        if self.warmup_thread is not None and self.warmup_thread.is_alive():
+            messagebox.showwarning("Warning", "Recognition models are still loading, try again in a moment")
+            return
+        path = filedialog.askopenfilename(title="Replay Session",
+                                          initialdir=os.path.join("output", "recordings"),
+                                          filetypes=[("Session recordings", "*.sfrec")])
+        if not path:
+            return
+        try:
+            from recognition import FaceRecognizer
+            from session_recorder import ReplaySource
+            source = ReplaySource(path, realtime=True)
+            # Replays get their own recognizer so they never touch real attendance
+            replay_recognizer = FaceRecognizer(persist_attendance=False)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open recording: {e}")
+            return
+        self.live_recognizer, self.recognizer = self.recognizer, replay_recognizer
+        self.replaying = True
+        self.notebook.select(self.recognition_frame)
+        self.start_recognition(source)
+        if not self.is_recognition_running:
+            source.release()
+            self.end_replay()
             
-    def train_model(self):
+    def end_replay(self):
+        replay_recognizer = self.recognizer
+        self.recognizer, self.live_recognizer = self.live_recognizer, None
+        if replay_recognizer is not None:
+            replay_recognizer.close()
+        self.replaying = False
+        
+    def session_recognizer(self):
+        # Sessions always apply to the live recognizer, never to a replay
+        return self.live_recognizer if self.replaying else self.recognizer
+        
+    def start_session(self, class_name=None, source="manual"):
+        class_name = class_name or self.session_class_var.get()
+        if not class_name:
+            messagebox.showwarning("Warning", "Choose a class first")
+            return
         try:
-            import train_model
-            train_model.train_model()
-            messagebox.showinfo("Success", "Model training completed successfully!")
-            # Reload recognizer if it exists
+            model_data = self.sessions.start(class_name, source)
+        except Exception as e:
+            if source == "manual":
+                messagebox.showerror("Error", f"Failed to start session: {e}")
+            else:
+                print(f"[ERROR] Failed to start scheduled session for {class_name}: {e}")
+            return
+        recognizer = self.session_recognizer()
+        if recognizer:
+            # Everyone in the class is marked afresh for this session
+            recognizer.reset_recognized_names()
+            recognizer.request_model_swap(model_data)
+        self.session_class_var.set(class_name)
+        self.session_var.set(f"Session: {class_name} ({len(model_data['classes'])} people, {source})")
+        
+    def end_session(self):
+        try:
+            model_data = self.sessions.end()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to restore the global model: {e}")
+            return
+        if model_data is None:
+            return
+        recognizer = self.session_recognizer()
+        if recognizer:
+            recognizer.reset_recognized_names()
+            recognizer.request_model_swap(model_data)
+        self.session_var.set("No class session (all enrolled people)")
+        
+    def check_timetable(self):
+        # Start and end sessions on the timetable slots while the box is ticked
+        if self.auto_session_var.get():
+            scheduled = self.sessions.scheduled_class()
+            if scheduled != self.sessions.active_class():
+                if scheduled:
+                    self.start_session(scheduled, source="timetable")
+                elif self.sessions.active and self.sessions.active["source"] == "timetable":
+                    self.end_session()
+        self.root.after(30000, self.check_timetable)
+        
+    def edit_rois(self):
+        import cv2
+        from PIL import Image, ImageTk
+        from camera_service import get_camera
+        
+        # Grab the newest frame from the shared camera to draw regions on
+        camera = get_camera(self.config["camera_index"], self.config["frame_width"],
+                            self.config["frame_height"])
+        packet = camera.latest()
+        frame = packet.image if packet else None
+        if frame is None:
+            cap = camera.subscribe("roi_editor")
+            ret, frame = cap.read()
+            cap.release()
+            if not ret:
+                messagebox.showerror("Error", "Could not read a frame from the camera")
+                return
+                
+        editor = tk.Toplevel(self.root)
+        editor.title("Detection Regions")
+        ttk.Label(editor, text="Drag to add a region. Detection only runs inside the regions; "
+                               "with none, the whole frame is scanned.", wraplength=600).pack(pady=5)
+        
+        height, width = frame.shape[:2]
+        canvas = tk.Canvas(editor, width=width, height=height, cursor="crosshair")
+        canvas.pack(padx=10, pady=5)
+        img = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+        canvas.img = img
+        canvas.create_image(0, 0, anchor='nw', image=img)
+        
+        rois = list(get_rois(self.config, self.config["camera_index"]))
+        drag = {}
+        
+        def redraw():
+            canvas.delete("roi")
+            for (x, y, w, h) in rois:
+                canvas.create_rectangle(x, y, x + w, y + h, outline="yellow", width=2, tags="roi")
+                
+        def on_press(event):
+            drag["start"] = (event.x, event.y)
+            drag["rect"] = canvas.create_rectangle(event.x, event.y, event.x, event.y,
+                                                   outline="cyan", dash=(4, 2), width=2)
+            
+        def on_drag(event):
+            if "rect" in drag:
+                canvas.coords(drag["rect"], *drag["start"], event.x, event.y)
+                
+        def on_release(event):
+            if "rect" not in drag:
+                return
+            canvas.delete(drag.pop("rect"))
+            x0, y0 = drag.pop("start")
+            x, y = max(0, min(x0, event.x)), max(0, min(y0, event.y))
+            w, h = min(width, max(x0, event.x)) - x, min(height, max(y0, event.y)) - y
+            # Ignore accidental clicks; HOG needs room for at least one face
+            if w >= 40 and h >= 40:
+                rois.append((x, y, w, h))
+            redraw()
+            
+        def save():
+            all_rois = dict(self.config.get("rois") or {})
+            all_rois[str(self.config["camera_index"])] = [list(r) for r in rois]
+            self.config.update({"rois": all_rois})
+            editor.destroy()
+            
+        def clear():
+            rois.clear()
+            redraw()
+            
+        canvas.bind("<ButtonPress-1>", on_press)
+        canvas.bind("<B1-Motion>", on_drag)
+        canvas.bind("<ButtonRelease-1>", on_release)
+        redraw()
+        
+        button_frame = ttk.Frame(editor)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Save", command=save, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Clear All", command=clear, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=editor.destroy, width=12).pack(side=tk.LEFT, padx=5)
+        
+    def encode_faces(self):
+        import encode_face
+        
+        def run(job):
+            return encode_face.encode_faces(progress=job.report, cancel_event=job.cancel_event)
+            
+        # Encoding and training both touch the encodings file, so they never overlap
+        self.jobs.submit("encode", run, resources=("encodings",), name="Encode faces",
+                         on_done=lambda job: self.root.after(0, self.on_faces_encoded, job))
+        self.notebook.select(self.jobs_frame)
+        
+    def on_faces_encoded(self, job):
+        if job.status == DONE and job.result:
+            messagebox.showinfo("Success", f"Face encoding completed successfully!\n{job.result} faces encoded")
+            self.load_config_status()
+        elif job.status == DONE:
+            messagebox.showerror("Error", "Face encoding failed: no faces were encoded")
+        elif job.status == FAILED:
+            messagebox.showerror("Error", f"Face encoding failed: {job.error}")
+            
+    def train_model(self):
+        # Train in the background; recognition keeps running on the old model
+        import train
+        self.recognition_status.set("Training model in background...")
+        
+        def run(job):
+            model_data = train.train_model(progress=job.report, cancel_event=job.cancel_event)
+            if model_data is None:
+                raise RuntimeError("No model was produced. Check the encodings file.")
+            return model_data
+            
+        self.jobs.submit("train", run, resources=("encodings", "model"), name="Train model",
+                         on_done=lambda job: self.root.after(0, self.on_model_trained, job))
+        self.notebook.select(self.jobs_frame)
+        
+    def on_model_trained(self, job):
+        if job.status != DONE:
+            self.recognition_status.set(f"Model training {job.status}")
+            if job.status == FAILED:
+                messagebox.showerror("Error", f"Model training failed: {job.error}")
+            return
+            
+        # Running recognizer swaps models at its next frame, keeping session state
+        model_data = job.result
+        self.load_config_status()
+        if self.sessions.active:
+            # The class session keeps its roster model until it ends
+            self.recognition_status.set(f"Model version {model_data['version']} will be used after the "
+                                        f"{self.sessions.active_class()} session")
+        else:
             if self.recognizer:
-                self.recognizer = FaceRecognizer()
+                self.recognizer.request_model_swap(model_data)
+            self.recognition_status.set(f"Model version {model_data['version']} is active")
+        messagebox.showinfo("Success", f"Model training completed successfully!\n"
+                                       f"Version {model_data['version']}, accuracy {model_data['accuracy'] * 100:.1f}%")
+        
+    def rollback_model(self):
+        try:
+            model_data = ModelStore(self.config).rollback()
         except Exception as e:
-            messagebox.showerror("Error", f"Model training failed: {e}")
+            messagebox.showerror("Error", f"Rollback failed: {e}")
+            return
+        if self.recognizer and not self.sessions.active:
+            self.recognizer.request_model_swap(model_data)
+        self.recognition_status.set(f"Rolled back to model version {model_data['version']}")
+        messagebox.showinfo("Rollback", f"Model version {model_data['version']} is now active")
+        
+    def build_class_models(self):
+        # Precompute one roster model per class from the current encodings
+        self.recognition_status.set("Building class models in background...")
+        config = self.config.snapshot()
+        
+        def run(job):
+            return build_class_models(config, progress=job.report, cancel_event=job.cancel_event)
+            
+        self.jobs.submit("class_models", run, resources=("encodings", "model"), name="Build class models",
+                         on_done=lambda job: self.root.after(0, self.on_class_models_built, job))
+        self.notebook.select(self.jobs_frame)
+        
+    def on_class_models_built(self, job):
+        if job.status != DONE:
+            self.recognition_status.set(f"Class model build {job.status}")
+            if job.status == FAILED:
+                messagebox.showerror("Error", f"Building class models failed: {job.error}")
+            return
+        self.session_combo.config(values=self.sessions.classes())
+        self.recognition_status.set(f"Built models for {len(job.result['classes'])} classes")
             
     def show_system_status(self):
         status_window = tk.Toplevel(self.root)
@@ -361,24 +940,70 @@ class SmartFaceAttendanceSystem:
         # Add detailed status information here
         ttk.Label(status_window, text="All systems operational", 
                  foreground="green").pack(pady=20)
+        
+        # Capture-to-consumer latency for every camera subscriber
+        from camera_service import get_camera
+        camera = get_camera(self.config["camera_index"], self.config["frame_width"],
+                            self.config["frame_height"])
+        stats = camera.stats()
+        lines = [f"Camera {stats['camera_index']}: {'running' if stats['running'] else 'idle'}, "
+                 f"{stats['frames']} frames, {stats['dropped']} dropped"]
+        for sub in stats["subscribers"]:
+            lines.append(f"  {sub['name']}: {sub['latency_avg_ms']:.1f} ms avg, "
+                         f"{sub['latency_max_ms']:.1f} ms max, {sub['missed']} skipped")
+        ttk.Label(status_window, text="\n".join(lines), justify=tk.LEFT).pack(pady=5)
                  
     def show_configuration(self):
         config_window = tk.Toplevel(self.root)
         config_window.title("Configuration")
-        config_window.geometry("500x400")
+        config_window.geometry("500x600")
         
         ttk.Label(config_window, text="System Configuration", 
                  font=('Arial', 14, 'bold')).pack(pady=10)
         
+        # Performance settings can be changed while recognition is running
+        live_frame = ttk.LabelFrame(config_window, text="Live Settings", padding="10")
+        live_frame.pack(fill='x', padx=10, pady=5)
+        
+        live_vars = {}
+        for i, key in enumerate(LIVE_SETTINGS):
+            ttk.Label(live_frame, text=f"{key}:", width=22).grid(row=i, column=0, sticky='w', pady=2)
+            var = tk.StringVar(value=str(self.config.get(key, "")))
+            live_vars[key] = var
+            spec = LIVE_SETTINGS[key]
+            if len(spec) == 2:
+                ttk.Combobox(live_frame, textvariable=var, values=list(spec[1]),
+                             state="readonly", width=15).grid(row=i, column=1, sticky='w', pady=2)
+            else:
+                ttk.Entry(live_frame, textvariable=var, width=18).grid(row=i, column=1, sticky='w', pady=2)
+                ttk.Label(live_frame, text=f"({spec[1]} - {spec[2]})",
+                          foreground="gray").grid(row=i, column=2, sticky='w', padx=5)
+        
         # Display current configuration
         config_text = tk.Text(config_window, wrap=tk.WORD, width=60, height=20)
         config_text.pack(padx=10, pady=10, fill='both', expand=True)
         
-        with open('config/config.json', 'r') as f:
-            config_data = json.load(f)
+        def show_config():
+            config_text.config(state=tk.NORMAL)
+            config_text.delete('1.0', tk.END)
+            config_text.insert(tk.END, json.dumps(self.config.snapshot(), indent=4))
+            config_text.config(state=tk.DISABLED)
             
-        config_text.insert(tk.END, json.dumps(config_data, indent=4))
-        config_text.config(state=tk.DISABLED)
+        def apply_settings():
+            try:
+                # Only edited values are sent, so untouched ones keep following DEFAULTS
+                self.config.update({key: var.get() for key, var in live_vars.items()
+                                    if var.get() != str(self.config.get(key, ""))})
+                show_config()
+                messagebox.showinfo("Configuration", "Settings applied. Recognition picks them up on the next frame.",
+                                    parent=config_window)
+            except ValueError as e:
+                messagebox.showerror("Invalid Setting", str(e), parent=config_window)
+                
+        ttk.Button(live_frame, text="Apply", command=apply_settings).grid(
+            row=len(LIVE_SETTINGS), column=1, sticky='w', pady=5)
+        
+        show_config()
         
     def show_about(self):
         about_text = """
@@ -0,0 +1,191 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, from a fast classify step to a slow CNN detection
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{escape_label(v)}"' for n, v in zip(names, values)) + "}"
+
+class Metric:
+    # Samples are keyed by label values. Recording does a dict lookup and
+    # an addition under a lock, so the hot path stays in the microseconds;
+    # formatting only happens when the endpoint is scraped.
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.function = None
+        self.lock = threading.Lock()
+
+    def set_function(self, function):
+        # function() returns a number, or {label values tuple: number} for labelled metrics
+        self.function = function
+        return self
+
+    def detached(self):
+        # Same metric outside any registry, for runs that must not show up in scrapes
+        return type(self)(self.name, self.help_text, self.label_names)
+
+    def samples(self):
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                return []
+            if value is None:
+                return []
+            if isinstance(value, dict):
+                return [(self.name, key, v) for key, v in value.items()]
+            return [(self.name, (), value)]
+        with self.lock:
+            return [(self.name, key, value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            labels = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{name}{format_labels(self.label_names, labels)} {float(value):g}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, labels=()):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, labels=()):
+        with self.lock:
+            self.values[labels] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self.values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {total:g}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        # Registering the same name twice returns the existing metric
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class FpsMeter:
+    # Frames per second over a sliding window, read at scrape time
+    def __init__(self, window=5.0):
+        self.window = window
+        self.count = 0
+        self.started = time.monotonic()
+        self.fps = 0.0
+
+    def tick(self):
+        self.count += 1
+        elapsed = time.monotonic() - self.started
+        if elapsed >= self.window:
+            self.fps = self.count / elapsed
+            self.count = 0
+            self.started = time.monotonic()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = get_metrics().render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the console
+        pass
+
+_registry = MetricsRegistry()
+_server = None
+_server_lock = threading.Lock()
+
+def get_metrics():
+    return _registry
+
+def start_metrics_server(config):
+    # Local only by default; one endpoint per process, port from config
+    global _server
+    if not config.get("metrics_enabled", True):
+        return None
+    with _server_lock:
+        if _server is None:
+            host = config.get("metrics_host", "127.0.0.1")
+            port = config.get("metrics_port", 9110)
+            try:
+                _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                print(f"[ERROR] Failed to start metrics endpoint on {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            thread = threading.Thread(target=_server.serve_forever, name="metrics-server")
+            thread.daemon = True
+            thread.start()
+            print(f"[INFO] Metrics available at http://{host}:{port}/metrics")
+        return _server
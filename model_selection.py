@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import StratifiedKFold, KFold
+from sklearn.preprocessing import LabelEncoder
+from train import build_model, save_model
+from config_service import get_config_service
+
+# (method, params) pairs evaluated by default
+DEFAULT_CANDIDATES = [
+    ("svm", {"C": 0.1}),
+    ("svm", {"C": 1.0}),
+    ("svm", {"C": 10.0}),
+    ("logistic", {"C": 1.0}),
+    ("logistic", {"C": 10.0}),
+    ("logistic", {"C": 100.0}),
+    ("ovr_linear", {"estimator__C": 1.0}),
+    ("ovr_linear", {"estimator__C": 10.0}),
+    ("calibrated_linear", {"estimator__C": 0.1}),
+    ("calibrated_linear", {"estimator__C": 1.0}),
+    ("gallery", {"dtype": "int8", "tolerance": 0.5}),
+    ("gallery", {"dtype": "int8", "tolerance": 0.6})
+]
+
+def make_folds(y, n_folds, seed=42):
+    # Each fold holds out test samples of known people plus a disjoint group of
+    # people the model never sees, used to measure open-set false accepts
+    classes = np.unique(y)
+    # Open-set holdout needs at least two known people left, so it starts at three.
+    # With fewer people than folds there are fewer impostor groups; folds reuse them.
+    # Groups are never larger than len(classes) - 2, so with few people there
+    # can be more groups than folds and some people are never held out.
+    class_groups = []
+    if len(classes) >= 3:
+        n_groups = max(min(n_folds, len(classes)), -(-len(classes) // (len(classes) - 2)))
+        class_groups = [classes[idx] for _, idx in KFold(n_groups, shuffle=True, random_state=seed).split(classes)]
+    folds = []
+    sample_folds = StratifiedKFold(n_folds, shuffle=True, random_state=seed)
+    for i, (train_idx, test_idx) in enumerate(sample_folds.split(np.zeros(len(y)), y)):
+        impostors = class_groups[i % len(class_groups)] if class_groups else np.array([])
+        known_train = train_idx[~np.isin(y[train_idx], impostors)]
+        known_test = test_idx[~np.isin(y[test_idx], impostors)]
+        impostor_idx = np.where(np.isin(y, impostors))[0]
+        folds.append((known_train, known_test, impostor_idx))
+    return folds
+
+def evaluate_fold(X, y, method, params, fold, threshold, latency_samples=50):
+    known_train, known_test, impostor_idx = fold
+    # Single-threaded inside the sweep; parallelism comes from running folds side by side
+    model = build_model(method, n_jobs=1, params=params)
+
+    start = time.perf_counter()
+    model.fit(X[known_train], y[known_train])
+    train_seconds = time.perf_counter() - start
+
+    proba = model.predict_proba(X[known_test])
+    predicted = model.classes_[np.argmax(proba, axis=1)]
+    accepted = np.max(proba, axis=1) >= threshold
+    # A known face only counts as correct if it is also above the threshold
+    accuracy = float(np.mean((predicted == y[known_test]) & accepted))
+
+    far = None
+    if len(impostor_idx):
+        far = float(np.mean(np.max(model.predict_proba(X[impostor_idx]), axis=1) >= threshold))
+
+    # Recognition classifies one face at a time, so time it the same way
+    samples = X[known_test[:latency_samples]]
+    start = time.perf_counter()
+    for encoding in samples:
+        model.predict_proba([encoding])
+    latency = (time.perf_counter() - start) / max(1, len(samples))
+
+    return {"accuracy": accuracy, "far": far, "train_seconds": train_seconds, "latency_seconds": latency}
+
+def summarize(method, params, fold_results):
+    fars = [r["far"] for r in fold_results if r["far"] is not None]
+    return {
+        "method": method,
+        "params": params,
+        "accuracy": float(np.mean([r["accuracy"] for r in fold_results])),
+        "accuracy_std": float(np.std([r["accuracy"] for r in fold_results])),
+        "false_accept_rate": float(np.mean(fars)) if fars else None,
+        "train_seconds": float(np.mean([r["train_seconds"] for r in fold_results])),
+        "latency_ms": float(np.mean([r["latency_seconds"] for r in fold_results])) * 1000
+    }
+
+def rank_key(result):
+    # Best accuracy first, then fewest false accepts, then fastest to train
+    far = result["false_accept_rate"] if result["false_accept_rate"] is not None else 0.0
+    return (-round(result["accuracy"], 3), far, result["train_seconds"])
+
+def run_sweep(X, y, candidates, n_folds, threshold, n_jobs=-1):
+    folds = make_folds(y, n_folds)
+    tasks = [(c, f) for c in range(len(candidates)) for f in range(len(folds))]
+    print(f"[INFO] Evaluating {len(candidates)} candidates x {len(folds)} folds in parallel...")
+    # joblib memory-maps X for the workers, so encodings are loaded only once
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(X, y, candidates[c][0], candidates[c][1], folds[f], threshold)
+        for c, f in tasks)
+
+    per_candidate = [[] for _ in candidates]
+    for (c, _), output in zip(tasks, outputs):
+        per_candidate[c].append(output)
+    results = [summarize(method, params, per_candidate[c]) for c, (method, params) in enumerate(candidates)]
+    return sorted(results, key=rank_key)
+
+def print_report(results):
+    print(f"\n{'method':>18} {'params':>22} {'accuracy':>10} {'FAR':>7} {'train (s)':>10} {'latency (ms)':>13}")
+    for r in results:
+        far = f"{r['false_accept_rate'] * 100:.1f}%" if r["false_accept_rate"] is not None else "n/a"
+        params = ",".join(f"{k.split('__')[-1]}={v}" for k, v in r["params"].items())
+        print(f"{r['method']:>18} {params:>22} {r['accuracy'] * 100:>9.1f}% {far:>7} "
+              f"{r['train_seconds']:>10.3f} {r['latency_ms']:>13.3f}")
+
+def persist_winner(config, X, y_names, winner):
+    # Refit the winner on every sample and make it the active model
+    le = LabelEncoder()
+    labels = le.fit_transform(y_names)
+    model = build_model(winner["method"], params=winner["params"])
+    model.fit(X, labels)
+    save_model(config, model, le, winner["accuracy"], winner["method"], winner["params"])
+    config.update({"recognition_method": winner["method"], "recognition_params": winner["params"]})
+    print(f"[SUCCESS] Active model is now {winner['method']} {winner['params']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated sweep over recognizers and hyperparameters")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel workers (-1 uses all cores)")
+    parser.add_argument("--methods", help="Comma-separated methods to include (default: all)")
+    parser.add_argument("--no-save", action="store_true", help="Report only; keep the current model")
+    args = parser.parse_args()
+
+    config = get_config_service()
+    encodings_path = config["encodings_path"]
+    if not os.path.exists(encodings_path):
+        print("[ERROR] Encodings file not found. Run encode_faces.py first.")
+        raise SystemExit(1)
+
+    print("[INFO] Loading encodings...")
+    with open(encodings_path, "rb") as f:
+        data = pickle.loads(f.read())
+    X = np.array(data["encodings"])
+    y_names = np.array(data["names"])
+    y = LabelEncoder().fit_transform(y_names)
+
+    if len(np.unique(y)) < 2:
+        print("[ERROR] At least two people are needed for model selection.")
+        raise SystemExit(1)
+    n_folds = min(args.folds, int(np.min(np.bincount(y))))
+    if n_folds < 2:
+        print("[ERROR] Every person needs at least two encodings for cross-validation.")
+        raise SystemExit(1)
+
+    candidates = DEFAULT_CANDIDATES
+    if args.methods:
+        wanted = args.methods.split(",")
+        candidates = [c for c in candidates if c[0] in wanted]
+
+    results = run_sweep(X, y, candidates, n_folds, config["confidence_threshold"], args.jobs)
+    print_report(results)
+
+    report_path = os.path.join(os.path.dirname(encodings_path) or ".",
+                               f"model_selection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_path, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"\n[INFO] Report saved to: {report_path}")
+
+    if not args.no_save:
+        persist_winner(config, X, y_names, results[0])
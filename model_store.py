@@ -0,0 +1,124 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+from datetime import datetime
+
+# The app, training and class-model jobs each make their own ModelStore,
+# so publish, activate and rollback serialize on one lock per process
+_store_lock = threading.RLock()
+
+class ModelStore:
+    # Versioned recognizer artifacts under output/models with a manifest
+    # recording which version is active. The active version is also copied
+    # to recognizer_path, and its label encoder to le_path, so anything
+    # loading those files keeps working.
+    def __init__(self, config, keep_versions=10):
+        self.config = config
+        self.recognizer_path = config["recognizer_path"]
+        self.le_path = config.get("le_path")
+        self.models_dir = os.path.join(os.path.dirname(self.recognizer_path) or ".", "models")
+        self.manifest_path = os.path.join(self.models_dir, "manifest.json")
+        self.keep_versions = keep_versions
+        self.lock = _store_lock
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        return {"active": None, "versions": []}
+
+    def save_manifest(self, manifest):
+        os.makedirs(self.models_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+
+    def version_path(self, version):
+        return os.path.join(self.models_dir, f"recognizer_v{version:04d}.pickle")
+
+    def write_atomic(self, path, payload):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def set_active(self, manifest, version):
+        # Readers of recognizer_path only ever see a complete file
+        tmp_path = self.recognizer_path + ".tmp"
+        shutil.copyfile(self.version_path(version), tmp_path)
+        os.replace(tmp_path, self.recognizer_path)
+        if self.le_path:
+            with open(self.version_path(version), "rb") as f:
+                le = pickle.loads(f.read())["le"]
+            self.write_atomic(self.le_path, pickle.dumps(le))
+        manifest["active"] = version
+        self.save_manifest(manifest)
+
+    def publish(self, model_data):
+        with self.lock:
+            os.makedirs(self.models_dir, exist_ok=True)
+            manifest = self.load_manifest()
+            version = max([v["version"] for v in manifest["versions"]], default=0) + 1
+            model_data = dict(model_data, version=version)
+            self.write_atomic(self.version_path(version), pickle.dumps(model_data))
+
+            manifest["versions"].append({
+                "version": version,
+                "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "method": model_data.get("method", "svm"),
+                "accuracy": model_data.get("accuracy"),
+                "classes": len(model_data.get("classes", []))
+            })
+            self.set_active(manifest, version)
+            self.prune(manifest)
+            print(f"[INFO] Published model version {version}")
+            return model_data
+
+    def prune(self, manifest):
+        while len(manifest["versions"]) > self.keep_versions:
+            oldest = manifest["versions"].pop(0)
+            if oldest["version"] == manifest["active"]:
+                manifest["versions"].insert(0, oldest)
+                break
+            path = self.version_path(oldest["version"])
+            if os.path.exists(path):
+                os.remove(path)
+        self.save_manifest(manifest)
+
+    def load(self, version=None):
+        manifest = self.load_manifest()
+        version = version or manifest["active"]
+        if version is None:
+            return None
+        with open(self.version_path(version), "rb") as f:
+            return pickle.loads(f.read())
+
+    def list_versions(self):
+        return self.load_manifest()["versions"]
+
+    def active_version(self):
+        return self.load_manifest()["active"]
+
+    def activate(self, version):
+        with self.lock:
+            manifest = self.load_manifest()
+            if not any(v["version"] == version for v in manifest["versions"]):
+                raise ValueError(f"Model version {version} not found")
+            self.set_active(manifest, version)
+            print(f"[INFO] Activated model version {version}")
+        return self.load(version)
+
+    def rollback(self):
+        # Step back to the version published before the active one
+        with self.lock:
+            manifest = self.load_manifest()
+            versions = [v["version"] for v in manifest["versions"]]
+            if manifest["active"] not in versions or versions.index(manifest["active"]) == 0:
+                raise ValueError("No earlier model version to roll back to")
+            previous = versions[versions.index(manifest["active"]) - 1]
+            return self.activate(previous)
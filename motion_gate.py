@@ -0,0 +1,66 @@
+import cv2
+import time
+
+class MotionGate:
+    # Cheap frame differencing on a small grayscale copy. Detection only
+    # runs when enough pixels changed since the last frame; after
+    # idle_timeout seconds without motion the loop should poll slowly.
+    def __init__(self, settings):
+        self.width = 160
+        self.reference = None
+        self.last_motion = time.monotonic()
+        self.frames_total = 0
+        self.frames_gated = 0
+        self.configure(settings)
+
+    def configure(self, settings):
+        self.enabled = settings.get("motion_gate_enabled", True)
+        self.threshold = settings.get("motion_threshold", 25)
+        self.min_area = settings.get("motion_min_area", 0.002)
+        self.idle_timeout = settings.get("idle_timeout", 30.0)
+        self.idle_poll_interval = settings.get("idle_poll_interval", 0.5)
+
+    def check(self, frame):
+        self.frames_total += 1
+        if not self.enabled:
+            return True
+
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        reference, self.reference = self.reference, gray
+        if reference is None or reference.shape != gray.shape:
+            self.last_motion = time.monotonic()
+            return True
+
+        diff = cv2.absdiff(gray, reference)
+        changed = cv2.countNonZero(cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)[1])
+        if changed >= self.min_area * gray.size:
+            self.last_motion = time.monotonic()
+            return True
+
+        self.frames_gated += 1
+        return False
+
+    def is_idle(self):
+        return self.enabled and time.monotonic() - self.last_motion > self.idle_timeout
+
+    def gated_fraction(self):
+        if self.frames_total == 0:
+            return 0.0
+        return self.frames_gated / self.frames_total
+
+    def stats(self):
+        return {
+            "frames_total": self.frames_total,
+            "frames_gated": self.frames_gated,
+            "gated_fraction": self.gated_fraction(),
+            "idle": self.is_idle()
+        }
+
+    def reset(self):
+        self.reference = None
+        self.frames_total = 0
+        self.frames_gated = 0
+        self.last_motion = time.monotonic()
@@ -0,0 +1,105 @@
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+
+# Per-worker cache of attached shared-memory blocks, keyed by name
+_attached = {}
+
+def _init_worker():
+    # Pay the dlib model loading cost once per worker, not per frame
+    import face_recognition
+    face_recognition.face_encodings(np.zeros((8, 8, 3), dtype=np.uint8), [])
+
+def _attach(name):
+    if name not in _attached:
+        for old in list(_attached):
+            _attached.pop(old).close()
+        # Workers share the parent's resource tracker; only the parent unlinks
+        _attached[name] = shared_memory.SharedMemory(name=name)
+    return _attached[name]
+
+def _encode_chunk(name, shape, boxes):
+    import face_recognition
+    shm = _attach(name)
+    rgb = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    return [encoding.tolist() for encoding in face_recognition.face_encodings(rgb, boxes)]
+
+def split_boxes(boxes, parts):
+    # Contiguous, near-equal chunks so results concatenate back in box order
+    size, extra = divmod(len(boxes), parts)
+    chunks, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(boxes[start:end])
+        start = end
+    return [chunk for chunk in chunks if chunk]
+
+class ParallelEncoder:
+    # Crowded-frame encoder. The RGB frame is copied once into a shared
+    # memory block; a persistent process pool encodes subsets of the boxes
+    # straight from it while the calling thread encodes the last subset
+    # itself. Encodings come back in the same order as the boxes.
+    def __init__(self, workers=None):
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.pool = None
+        self.shm = None
+        self.frames = 0
+        self.failed = False
+        atexit.register(self.close)
+
+    def start(self):
+        if self.pool is None:
+            # Started lazily from the recognition thread while Tk, camera and
+            # server threads run; forking that could copy a held lock (or the
+            # attendance lock fd) into the workers, so they are spawned fresh
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return self
+
+    def frame_buffer(self, rgb):
+        # Reuse the block across frames and only grow it for larger frames
+        if self.shm is None or self.shm.size < rgb.nbytes:
+            self.release_buffer()
+            self.shm = shared_memory.SharedMemory(create=True, size=rgb.nbytes)
+        view = np.ndarray(rgb.shape, dtype=np.uint8, buffer=self.shm.buf)
+        view[:] = rgb
+        return view
+
+    def encode(self, rgb, boxes):
+        import face_recognition
+        if self.failed or len(boxes) < 2:
+            return face_recognition.face_encodings(rgb, boxes)
+
+        self.start()
+        view = self.frame_buffer(rgb)
+        chunks = split_boxes(list(boxes), self.workers + 1)
+        try:
+            futures = [self.pool.submit(_encode_chunk, self.shm.name, rgb.shape, chunk) for chunk in chunks[:-1]]
+            local = face_recognition.face_encodings(view, chunks[-1])
+            encodings = []
+            for future in futures:
+                encodings.extend(np.array(e) for e in future.result())
+            encodings.extend(local)
+        except BrokenProcessPool as e:
+            print(f"[ERROR] Parallel encoding failed, falling back to serial encoding: {e}")
+            self.failed = True
+            self.pool = None
+            return face_recognition.face_encodings(rgb, boxes)
+        self.frames += 1
+        return encodings
+
+    def release_buffer(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.release_buffer()
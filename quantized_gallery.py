@@ -0,0 +1,147 @@
+import argparse
+import os
+import pickle
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+GALLERY_DTYPES = ("float64", "float16", "int8")
+
+class QuantizedGallery:
+    # Encodings stored as float64, float16 or int8. int8 uses per-dimension
+    # scaling: each of the 128 dimensions is centred on the middle of its
+    # range and scaled so that range fills -127..127. Distances are computed
+    # from the stored matrix chunk by chunk, so the full-precision gallery
+    # never exists in memory.
+    def __init__(self, encodings, dtype="int8", chunk_size=8192):
+        if dtype not in GALLERY_DTYPES:
+            raise ValueError(f"dtype must be one of {', '.join(GALLERY_DTYPES)}")
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        X = np.asarray(encodings, dtype=np.float64)
+        if dtype == "int8":
+            low, high = X.min(axis=0), X.max(axis=0)
+            self.offset = ((low + high) / 2).astype(np.float32)
+            self.scale = np.maximum((high - low) / 254.0, 1e-8).astype(np.float32)
+            self.data = np.clip(np.rint((X - self.offset) / self.scale), -127, 127).astype(np.int8)
+            # Distances in the scaled space are weighted by scale^2 per dimension
+            self.weights = self.scale ** 2
+        else:
+            self.offset = None
+            self.scale = None
+            self.data = X.astype(np.float16) if dtype == "float16" else X
+            self.weights = None
+        self.norms = np.concatenate([self.weighted_norms(chunk) for chunk in self.chunks()]) \
+            if len(self.data) else np.zeros(0, dtype=np.float32)
+
+    def chunks(self):
+        for start in range(0, len(self.data), self.chunk_size):
+            yield self.data[start:start + self.chunk_size]
+
+    def as_float(self, chunk):
+        return chunk.astype(np.float64 if self.dtype == "float64" else np.float32)
+
+    def weighted_norms(self, chunk):
+        values = self.as_float(chunk)
+        if self.weights is not None:
+            return (values * values) @ self.weights
+        return np.einsum("ij,ij->i", values, values)
+
+    def prepare_queries(self, queries):
+        # Map queries into the stored space: (x - offset) / scale for int8
+        Q = np.atleast_2d(np.asarray(queries, dtype=np.float64))
+        if self.dtype == "int8":
+            Q = ((Q - self.offset) / self.scale).astype(np.float32)
+            return Q * self.weights, np.einsum("ij,ij->i", Q * self.weights, Q)
+        if self.dtype == "float16":
+            Q = Q.astype(np.float32)
+        return Q, np.einsum("ij,ij->i", Q, Q)
+
+    def nearest(self, queries, k=1):
+        # Squared distance |q|^2 - 2 q.g + |g|^2, keeping the running best k per query
+        Qw, query_norms = self.prepare_queries(queries)
+        k = min(k, len(self.data))
+        best_d = np.full((len(Qw), 0), np.inf)
+        best_i = np.zeros((len(Qw), 0), dtype=np.int64)
+        start = 0
+        for chunk in self.chunks():
+            d2 = query_norms[:, None] - 2.0 * (Qw @ self.as_float(chunk).T) + self.norms[None, start:start + len(chunk)]
+            d = np.concatenate([best_d, d2], axis=1)
+            i = np.concatenate([best_i, np.broadcast_to(np.arange(start, start + len(chunk)), d2.shape)], axis=1)
+            keep = np.argpartition(d, k - 1, axis=1)[:, :k] if d.shape[1] > k else np.argsort(d, axis=1)
+            best_d = np.take_along_axis(d, keep, axis=1)
+            best_i = np.take_along_axis(i, keep, axis=1)
+            start += len(chunk)
+        order = np.argsort(best_d, axis=1)
+        distances = np.sqrt(np.maximum(np.take_along_axis(best_d, order, axis=1), 0.0))
+        return distances, np.take_along_axis(best_i, order, axis=1)
+
+    def nbytes(self):
+        extra = sum(a.nbytes for a in (self.offset, self.scale, self.weights) if a is not None)
+        return self.data.nbytes + self.norms.nbytes + extra
+
+    def save(self, path, names):
+        arrays = {"data": self.data, "names": np.asarray(names), "dtype": np.array(self.dtype)}
+        if self.dtype == "int8":
+            arrays.update(offset=self.offset, scale=self.scale)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        stored = np.load(path, allow_pickle=False)
+        gallery = cls.__new__(cls)
+        gallery.dtype = str(stored["dtype"])
+        gallery.chunk_size = 8192
+        gallery.data = stored["data"]
+        gallery.offset = stored["offset"] if gallery.dtype == "int8" else None
+        gallery.scale = stored["scale"] if gallery.dtype == "int8" else None
+        gallery.weights = gallery.scale ** 2 if gallery.scale is not None else None
+        gallery.norms = np.concatenate([gallery.weighted_norms(c) for c in gallery.chunks()])
+        return gallery, stored["names"].tolist()
+
+class GalleryClassifier(BaseEstimator, ClassifierMixin):
+    # Nearest-neighbour matching against the stored gallery. The probability
+    # for a person is the share of the k nearest samples that belong to them
+    # and lie within tolerance, so a face far from everyone scores 0 for all
+    # classes and falls below confidence_threshold as Unknown.
+    def __init__(self, dtype="int8", k=3, tolerance=0.6, chunk_size=8192):
+        self.dtype = dtype
+        self.k = k
+        self.tolerance = tolerance
+        self.chunk_size = chunk_size
+
+    def fit(self, X, y):
+        self.classes_, self.labels_ = np.unique(y, return_inverse=True)
+        self.gallery_ = QuantizedGallery(X, self.dtype, self.chunk_size)
+        return self
+
+    def predict_proba(self, X):
+        distances, indices = self.gallery_.nearest(X, self.k)
+        proba = np.zeros((len(distances), len(self.classes_)))
+        k = distances.shape[1]
+        for row, (d, i) in enumerate(zip(distances, indices)):
+            for label in self.labels_[i[d <= self.tolerance]]:
+                proba[row, label] += 1.0 / k
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def load_encodings(encodings_path):
+    with open(encodings_path, "rb") as f:
+        data = pickle.loads(f.read())
+    return np.array(data["encodings"]), data["names"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a quantized copy of the encodings gallery")
+    parser.add_argument("--encodings", default=os.path.join("output", "encodings.pickle"))
+    parser.add_argument("--dtype", choices=GALLERY_DTYPES, default="int8")
+    parser.add_argument("--output", help="Gallery path (default: next to the encodings)")
+    args = parser.parse_args()
+
+    X, names = load_encodings(args.encodings)
+    gallery = QuantizedGallery(X, args.dtype)
+    output = args.output or os.path.join(os.path.dirname(args.encodings), f"gallery_{args.dtype}.npz")
+    gallery.save(output, names)
+    print(f"[SUCCESS] {len(X)} encodings: pickle {os.path.getsize(args.encodings) / 1024:.1f} KB, "
+          f"{args.dtype} gallery {os.path.getsize(output) / 1024:.1f} KB on disk, "
+          f"{gallery.nbytes() / 1024:.1f} KB in memory -> {output}")
@@ -3,17 +3,51 @@ import pickle
 import cv2
 import json
 import os
+import time
 from datetime import datetime
 import numpy as np
+from config_service import get_config_service, LIVE_SETTINGS, LIVE_STRUCTURED
+from unknown_clusters import get_unknown_clusters
+from motion_gate import MotionGate
+from roi import get_rois, frame_regions, translate_boxes, dedupe_boxes
+from load_controller import LatencyController
+from parallel_encoder import ParallelEncoder
+from encoding_scheduler import EncodingScheduler
+from metrics import get_metrics, FpsMeter
+from event_bus import get_event_bus, FIRST_SEEN, LAST_SEEN_UPDATE, UNKNOWN_FACE
+from attendance_retention import AttendanceArchive, hold_attendance_lock
+
+metrics = get_metrics()
+STAGE_SECONDS = metrics.histogram("recognition_stage_seconds", "Time spent in each recognize_faces stage", ("stage",))
+FRAMES = metrics.counter("recognition_frames_total", "Frames passed to the recognizer by outcome", ("outcome",))
+FACES = metrics.counter("recognition_faces_total", "Detected faces by outcome", ("outcome",))
+ATTENDANCE_WRITE_SECONDS = metrics.histogram("attendance_write_seconds", "Time to persist the attendance file")
+ATTENDANCE_MARKED = metrics.counter("attendance_marked_total", "People marked present")
 
 class FaceRecognizer:
-    def __init__(self):
+    def __init__(self, persist_attendance=True):
         # Load configuration
-        with open('config/config.json', 'r') as f:
-            self.config = json.load(f)
+        self.config = get_config_service()
+        
+        # Replays and batch runs keep attendance in memory only
+        self.persist_attendance = persist_attendance
+        
+        # Live settings are staged here and applied at the next frame boundary
+        self.pending_settings = None
+        self.motion_gate = MotionGate(self.config)
+        self.controller = LatencyController(self.config)
         
-        self.detection_method = self.config["detection_method"]
-        self.confidence_threshold = self.config["confidence_threshold"]
+        # Picks which faces are encoded when the controller's budget is below the face count
+        self.scheduler = EncodingScheduler()
+        
+        # Crowded frames are encoded across processes; 1 worker turns this off
+        workers = self.config.get("parallel_encoding_workers", 0)
+        self.parallel_encoder = ParallelEncoder(workers or None) if workers != 1 else None
+        self.apply_settings(self.config.snapshot())
+        self.config.subscribe(self.on_config_changed)
+        
+        self.frame_index = 0
+        self.last_result = ([], [], [])
         
         # Load the trained model
         try:
@@ -22,16 +56,114 @@ class FaceRecognizer:
             
             self.model = self.model_data["model"]
             self.le = self.model_data["le"]
+            self.model_version = self.model_data.get("version")
             print("[INFO] Model loaded successfully")
         except Exception as e:
             print(f"[ERROR] Failed to load model: {e}")
             self.model = None
             self.le = None
+            self.model_version = None
+        
+        # A newly trained model waits here until the next frame boundary
+        self.pending_model = None
         
-        # Initialize attendance records
-        self.attendance_records = self.load_attendance()
+        # Initialize attendance records; only the hot window stays in memory,
+        # older days are rolled into the monthly archives. The writer lock
+        # keeps offline tools from editing the file underneath this copy.
+        if persist_attendance:
+            hold_attendance_lock(self.config)
+        self.attendance_records = self.load_attendance() if persist_attendance else {}
+        self.retention = AttendanceArchive(self.config) if persist_attendance else None
+        self.roll_attendance()
         self.recognized_names = set()
         
+        # When each recognized person last had their last_seen written
+        self.last_seen_marked = {}
+        
+        # Called with (date, name, record, is_new) after every attendance write
+        self.attendance_listeners = []
+        
+        # Live events for downstream consumers; replays and batch runs stay silent
+        self.event_bus = get_event_bus(self.config) if persist_attendance else None
+        self.unknown_announced = {}
+        
+        # Unknown faces are grouped here for later batch enrollment; replays
+        # and batch runs must not feed the live cluster engine
+        self.unknown_clusters = None
+        if persist_attendance:
+            self.unknown_clusters = get_unknown_clusters()
+            self.unknown_clusters.configure(self.config)
+        
+        self.fps = FpsMeter()
+        self.bind_metrics()
+        
+    def bind_metrics(self):
+        # Only the live recognizer reports to the process metrics; others
+        # record into detached copies so scrapes never mix in replayed frames
+        if not self.persist_attendance:
+            self.stage_seconds = STAGE_SECONDS.detached()
+            self.frames_total = FRAMES.detached()
+            self.faces_total = FACES.detached()
+            self.attendance_write_seconds = ATTENDANCE_WRITE_SECONDS.detached()
+            self.attendance_marked = ATTENDANCE_MARKED.detached()
+            return
+        self.stage_seconds = STAGE_SECONDS
+        self.frames_total = FRAMES
+        self.faces_total = FACES
+        self.attendance_write_seconds = ATTENDANCE_WRITE_SECONDS
+        self.attendance_marked = ATTENDANCE_MARKED
+        
+        # Read at scrape time, so they cost nothing per frame
+        metrics.gauge("recognition_fps", "Frames per second through recognize_faces").set_function(lambda: self.fps.fps)
+        metrics.gauge("model_version", "Active recognizer model version").set_function(lambda: self.model_version)
+        metrics.gauge("gallery_size", "People the active model can recognize").set_function(
+            lambda: len(self.le.classes_) if self.le is not None else 0)
+        metrics.gauge("recognized_people", "People recognized in the current session").set_function(
+            lambda: len(self.recognized_names))
+        metrics.gauge("unknown_clusters", "Unknown face clusters waiting for enrollment").set_function(
+            lambda: len(self.unknown_clusters.clusters))
+        metrics.gauge("encoding_queue_depth", "Tracked faces waiting for their first encoding").set_function(
+            lambda: self.scheduler.stats()["pending"])
+        metrics.gauge("controller_state", "Current latency controller settings", ("knob",)).set_function(
+            lambda: {("scale",): self.controller.scale, ("skip",): self.controller.skip,
+                     ("max_faces",): self.controller.max_faces})
+        
+    def apply_settings(self, settings):
+        self.detection_method = settings["detection_method"]
+        self.confidence_threshold = settings["confidence_threshold"]
+        self.detection_scale = settings["detection_scale"]
+        self.detection_skip = settings["detection_skip"]
+        self.crowd_threshold = settings.get("crowd_threshold", 6)
+        self.motion_gate.configure(settings)
+        self.controller.configure(settings)
+        self.rois = get_rois(settings, settings["camera_index"])
+        
+    def on_config_changed(self, changed, config):
+        if any(key in LIVE_SETTINGS or key in LIVE_STRUCTURED for key in changed):
+            self.pending_settings = config
+            
+    def apply_pending_settings(self):
+        settings, self.pending_settings = self.pending_settings, None
+        if settings is not None:
+            self.apply_settings(settings)
+            print(f"[INFO] Applied live settings: method={self.detection_method}, "
+                  f"scale={self.detection_scale}, skip={self.detection_skip}, "
+                  f"threshold={self.confidence_threshold}, rois={len(self.rois)}")
+    
+    def request_model_swap(self, model_data):
+        # Safe to call from any thread; recognition keeps using the current
+        # model until the next frame starts
+        self.pending_model = model_data
+        
+    def apply_pending_model(self):
+        model_data, self.pending_model = self.pending_model, None
+        if model_data is None:
+            return
+        self.model_data = model_data
+        self.model, self.le = model_data["model"], model_data["le"]
+        self.model_version = model_data.get("version")
+        print(f"[INFO] Swapped to model version {self.model_version}")
+    
     def load_attendance(self):
         attendance_path = self.config["attendance_path"]
         if os.path.exists(attendance_path):
@@ -40,10 +172,27 @@ class FaceRecognizer:
         return {}
     
     def save_attendance(self):
+        if not self.persist_attendance:
+            return
         attendance_path = self.config["attendance_path"]
+        started = time.perf_counter()
         os.makedirs(os.path.dirname(attendance_path), exist_ok=True)
-        with open(attendance_path, 'w') as f:
+        # Write to a temp file and swap it in so readers never see a partial file
+        tmp_path = attendance_path + ".tmp"
+        with open(tmp_path, 'w') as f:
             json.dump(self.attendance_records, f, indent=4)
+        os.replace(tmp_path, attendance_path)
+        self.attendance_write_seconds.observe(time.perf_counter() - started)
+    
+    def roll_attendance(self):
+        if self.retention is None:
+            return
+        try:
+            if self.retention.roll(self.attendance_records):
+                self.save_attendance()
+        except Exception as e:
+            # Keeping the days live is safe; the next day's roll retries
+            print(f"[WARNING] Attendance archiving failed: {e}")
     
     def mark_attendance(self, name):
         if name == "Unknown":
@@ -53,6 +202,8 @@ class FaceRecognizer:
         current_time = datetime.now().strftime("%H:%M:%S")
         
         if today not in self.attendance_records:
+            # First mark of a new day: archive days that left the hot window
+            self.roll_attendance()
             self.attendance_records[today] = {}
         
         if name not in self.attendance_records[today]:
@@ -62,51 +213,197 @@ class FaceRecognizer:
                 "count": 1
             }
             self.save_attendance()
+            self.notify_attendance(today, name, True)
+            self.attendance_marked.inc()
             print(f"[ATTENDANCE] Marked attendance for {name} at {current_time}")
             return True
         else:
             self.attendance_records[today][name]["last_seen"] = current_time
             self.attendance_records[today][name]["count"] += 1
             self.save_attendance()
+            self.notify_attendance(today, name, False)
             return False
     
+    def record_sighting(self, name):
+        # The first recognition in a session marks attendance; repeats only
+        # refresh last_seen, at most once per interval per person
+        now = time.time()
+        if (name in self.recognized_names
+                and now - self.last_seen_marked.get(name, 0) < self.config.get("last_seen_update_interval", 60)):
+            return
+        self.mark_attendance(name)
+        self.recognized_names.add(name)
+        self.last_seen_marked[name] = now
+    
+    def add_attendance_listener(self, listener):
+        self.attendance_listeners.append(listener)
+    
+    def notify_attendance(self, date, name, is_new):
+        record = self.attendance_records[date][name]
+        if self.event_bus:
+            self.event_bus.publish(FIRST_SEEN if is_new else LAST_SEEN_UPDATE,
+                                   dict(record, name=name, date=date, model_version=self.model_version))
+        for listener in self.attendance_listeners:
+            try:
+                listener(date, name, record, is_new)
+            except Exception as e:
+                print(f"[WARNING] Attendance listener failed: {e}")
+    
+    def announce_unknown(self, cluster_id, box, proba):
+        # One event when a cluster has enough sightings, then at most one per interval
+        cluster = self.unknown_clusters.clusters.get(cluster_id)
+        if cluster is None or cluster.count < self.config.get("unknown_min_sightings", 3):
+            return
+        now = time.time()
+        if now - self.unknown_announced.get(cluster_id, 0) < self.config.get("unknown_event_interval", 60):
+            return
+        self.unknown_announced[cluster_id] = now
+        self.event_bus.publish(UNKNOWN_FACE, {"cluster_id": cluster_id, "sightings": cluster.count,
+                                              "box": [int(v) for v in box], "confidence": float(proba)})
+    
     def recognize_faces(self, frame):
+        self.apply_pending_model()
         if self.model is None:
             return [], [], []
             
-        # Convert the image from BGR to RGB
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.apply_pending_settings()
+        self.fps.tick()
+        
+        # Nothing moved since the last frame, so the last result still holds
+        t0 = time.perf_counter()
+        moved = self.motion_gate.check(frame)
+        self.stage_seconds.observe(time.perf_counter() - t0, ("motion",))
+        if not moved:
+            self.frames_total.inc(labels=("gated",))
+            return self.last_result
+            
+        # Only run the full pipeline on every Nth frame; reuse the last result in between
+        self.frame_index += 1
+        skip = self.controller.skip
+        if skip > 1 and self.frame_index % skip != 1:
+            self.frames_total.inc(labels=("skipped",))
+            return self.last_result
+            
+        started = time.perf_counter()
+        regions = self.detect_regions(frame)
+        candidates = self.region_candidates(regions)
+        boxes = [box for box, _, _ in candidates]
+        detected = len(candidates)
+        t1 = time.perf_counter()
         
-        # Detect faces using HOG method
-        boxes = face_recognition.face_locations(rgb, model=self.detection_method)
-        encodings = face_recognition.face_encodings(rgb, boxes)
+        # Under load only the highest-priority faces are encoded this frame
+        tracks = self.scheduler.match(boxes)
+        chosen = self.scheduler.select(tracks, self.controller.max_faces, self.recognized_names)
+        t2 = time.perf_counter()
+        encodings = dict(zip(chosen, self.encode_candidates(frame, regions, [candidates[i] for i in chosen])))
+        t3 = time.perf_counter()
         
         names = []
         confidences = []
         
-        # Loop over the face encodings
-        for encoding in encodings:
-            # Predict the face using SVM probabilities
-            preds = self.model.predict_proba([encoding])[0]
-            j = np.argmax(preds)
-            proba = preds[j]
-            name = self.le.classes_[j]
+        # Loop over the detected faces
+        for i, (box, track) in enumerate(zip(boxes, tracks)):
+            if i not in encodings:
+                # Deferred this frame: keep the label from the last encoding
+                names.append(track.name or "Unknown")
+                confidences.append(track.confidence)
+                continue
+                
+            encoding = encodings[i]
+            name, proba = self.identify(encoding)
             
             # Filter weak detections
             if proba >= self.confidence_threshold:
                 names.append(name)
                 confidences.append(proba)
                 
-                # Mark attendance (only for new recognitions in this session)
-                if name not in self.recognized_names:
-                    self.mark_attendance(name)
-                    self.recognized_names.add(name)
+                self.record_sighting(name)
             else:
                 names.append("Unknown")
                 confidences.append(proba)
+                if self.unknown_clusters is not None:
+                    cluster_id = self.unknown_clusters.add(encoding, frame, box)
+                    if self.event_bus:
+                        self.announce_unknown(cluster_id, box, proba)
+            self.scheduler.update(track, names[-1], proba)
         
+        self.last_result = (boxes, names, confidences)
+        finished = time.perf_counter()
+        self.controller.update(finished - started, detected)
+        
+        self.frames_total.inc(labels=("processed",))
+        self.faces_total.inc(detected, ("detected",))
+        self.faces_total.inc(len(chosen), ("encoded",))
+        self.faces_total.inc(detected - len(chosen), ("deferred",))
+        self.stage_seconds.observe(t1 - started, ("detect",))
+        self.stage_seconds.observe(t2 - t1, ("schedule",))
+        self.stage_seconds.observe(t3 - t2, ("encode",))
+        self.stage_seconds.observe(finished - t3, ("classify",))
+        self.stage_seconds.observe(finished - started, ("total",))
         return boxes, names, confidences
     
+    def identify(self, encoding):
+        # Predict the face using SVM probabilities
+        preds = self.model.predict_proba([encoding])[0]
+        j = np.argmax(preds)
+        return self.le.classes_[j], preds[j]
+    
+    def detect_and_encode(self, frame):
+        # Every detected face, encoded; used where no per-frame budget applies
+        regions = self.detect_regions(frame)
+        candidates = self.region_candidates(regions)
+        encodings = self.encode_candidates(frame, regions, candidates)
+        return [box for box, _, _ in candidates], encodings, len(candidates)
+    
+    def detect_regions(self, frame):
+        # Work only inside the configured regions so cost scales with ROI area
+        height, width = frame.shape[:2]
+        regions = []
+        for (x, y, w, h) in frame_regions(self.rois, width, height):
+            # Convert the image from BGR to RGB
+            rgb = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2RGB)
+            
+            # Detect faces using HOG method
+            regions.append((rgb, x, y, self.detect_faces(rgb)))
+        return regions
+    
+    def region_candidates(self, regions):
+        # (frame box, region index, region box) for every detected face
+        boxes, candidates = [], []
+        for index, (rgb, x, y, region_boxes) in enumerate(regions):
+            for region_box, box in zip(region_boxes, translate_boxes(region_boxes, x, y)):
+                boxes.append(box)
+                candidates.append((box, index, region_box))
+        if len(self.rois) > 1:
+            boxes, candidates = dedupe_boxes(boxes, candidates)
+        return candidates
+    
+    def encode_candidates(self, frame, regions, candidates):
+        if self.parallel_encoder and len(candidates) >= self.crowd_threshold:
+            # Crowded frame: encode every box from one full-frame copy in parallel
+            height, width = frame.shape[:2]
+            if len(regions) == 1 and regions[0][0].shape[:2] == (height, width):
+                rgb = regions[0][0]
+            else:
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            return self.parallel_encoder.encode(rgb, [box for box, _, _ in candidates])
+            
+        encodings = []
+        for box, index, region_box in candidates:
+            encodings.extend(face_recognition.face_encodings(regions[index][0], [region_box]))
+        return encodings
+    
+    def detect_faces(self, rgb):
+        scale = self.controller.scale
+        if scale >= 1.0:
+            return face_recognition.face_locations(rgb, model=self.detection_method)
+            
+        # Detect on a downscaled copy and map the boxes back to full resolution
+        small = cv2.resize(rgb, (0, 0), fx=scale, fy=scale)
+        boxes = face_recognition.face_locations(small, model=self.detection_method)
+        return [(int(top / scale), int(right / scale), int(bottom / scale), int(left / scale))
+                for (top, right, bottom, left) in boxes]
+    
     def draw_recognitions(self, frame, boxes, names, confidences):
         # Loop over the recognized faces
         for ((top, right, bottom, left), name, confidence) in zip(boxes, names, confidences):
@@ -140,8 +437,16 @@ class FaceRecognizer:
         
         return frame
 
+    def close(self):
+        # Detach a recognizer that is being thrown away, e.g. after a replay
+        self.config.unsubscribe(self.on_config_changed)
+        if self.parallel_encoder:
+            self.parallel_encoder.close()
+    
     def reset_recognized_names(self):
+        self.scheduler.reset()
         self.recognized_names.clear()
+        self.last_seen_marked.clear()
 
 if __name__ == "__main__":
     recognizer = FaceRecognizer()
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from session_recorder import ReplaySource
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+def run_replay(path, realtime=False, adaptive=False, recognizer=None):
+    from recognition import FaceRecognizer
+    # A recognizer made here is closed afterwards; a caller's stays open
+    owned = recognizer is None
+    recognizer = recognizer or FaceRecognizer(persist_attendance=False)
+    try:
+        return replay_report(path, recognizer, realtime, adaptive)
+    finally:
+        if owned:
+            recognizer.close()
+
+def replay_report(path, recognizer, realtime, adaptive):
+    if not adaptive:
+        # Fixed settings so two runs over the same recording do identical work
+        recognizer.controller.enabled = False
+        recognizer.controller.reset()
+        recognizer.motion_gate.reset()
+
+    source = ReplaySource(path, realtime=realtime)
+    latencies = []
+    results = []
+    started = time.perf_counter()
+    try:
+        for seq, timestamp, frame in source.frames():
+            t0 = time.perf_counter()
+            boxes, names, confidences = recognizer.recognize_faces(frame)
+            latencies.append(time.perf_counter() - t0)
+            results.append({"seq": seq, "t": round(timestamp, 3), "names": list(names),
+                            "boxes": [list(map(int, b)) for b in boxes]})
+    finally:
+        source.release()
+    wall = time.perf_counter() - started
+
+    latencies_ms = [l * 1000 for l in latencies]
+    recognized = sorted({n for r in results for n in r["names"] if n != "Unknown"})
+    return {
+        "recording": os.path.abspath(path),
+        "metadata": source.metadata,
+        "mode": "realtime" if realtime else "fast",
+        "adaptive": adaptive,
+        "model_version": recognizer.model_version,
+        "frames": len(results),
+        "wall_seconds": wall,
+        "fps": len(results) / wall if wall > 0 else 0.0,
+        "latency_ms": {
+            "mean": float(np.mean(latencies_ms)) if latencies_ms else 0.0,
+            "p50": percentile(latencies_ms, 50),
+            "p90": percentile(latencies_ms, 90),
+            "p99": percentile(latencies_ms, 99),
+            "max": max(latencies_ms, default=0.0)
+        },
+        "recognized": recognized,
+        "frames_gated": recognizer.motion_gate.frames_gated,
+        "results": results
+    }
+
+def compare_reports(a, b):
+    # Latency deltas plus every frame whose recognized names differ
+    print(f"{'metric':>12} {'A':>10} {'B':>10} {'change':>9}")
+    for key in ("mean", "p50", "p90", "p99", "max"):
+        va, vb = a["latency_ms"][key], b["latency_ms"][key]
+        change = (vb - va) / va * 100 if va else 0.0
+        print(f"{key + ' (ms)':>12} {va:>10.2f} {vb:>10.2f} {change:>8.1f}%")
+    change = (b["fps"] - a["fps"]) / a["fps"] * 100 if a["fps"] else 0.0
+    print(f"{'fps':>12} {a['fps']:>10.2f} {b['fps']:>10.2f} {change:>8.1f}%")
+
+    by_seq = {r["seq"]: r for r in b["results"]}
+    differences = [(r["seq"], r["names"], by_seq[r["seq"]]["names"]) for r in a["results"]
+                   if r["seq"] in by_seq and sorted(r["names"]) != sorted(by_seq[r["seq"]]["names"])]
+    print(f"\n[INFO] {len(differences)} of {len(a['results'])} frames differ in recognition results")
+    for seq, names_a, names_b in differences[:20]:
+        print(f"  frame {seq}: {names_a} -> {names_b}")
+    return differences
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the recognizer")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Replay a recording and write a report")
+    run_parser.add_argument("recording")
+    run_parser.add_argument("--realtime", action="store_true", help="Keep the original frame timing")
+    run_parser.add_argument("--adaptive", action="store_true",
+                            help="Leave the latency controller on (results may vary between runs)")
+    run_parser.add_argument("--output", help="Report path (default: next to the recording)")
+
+    compare_parser = sub.add_parser("compare", help="Compare two replay reports")
+    compare_parser.add_argument("report_a")
+    compare_parser.add_argument("report_b")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_replay(args.recording, args.realtime, args.adaptive)
+        output = args.output or os.path.splitext(args.recording)[0] + f"_report_{int(time.time())}.json"
+        with open(output, "w") as f:
+            json.dump(report, f, indent=4)
+        lat = report["latency_ms"]
+        print(f"[SUCCESS] {report['frames']} frames at {report['fps']:.1f} FPS, "
+              f"latency p50 {lat['p50']:.1f} ms, p99 {lat['p99']:.1f} ms")
+        print(f"[INFO] Recognized: {', '.join(report['recognized']) or 'nobody'}")
+        print(f"[INFO] Report saved to: {output}")
+    else:
+        with open(args.report_a) as f:
+            report_a = json.load(f)
+        with open(args.report_b) as f:
+            report_b = json.load(f)
+        compare_reports(report_a, report_b)
@@ -0,0 +1,41 @@
+def get_rois(config, camera_index):
+    # ROIs live in config as {"<camera_index>": [[x, y, w, h], ...]}
+    rois = (config.get("rois") or {}).get(str(camera_index), [])
+    return [tuple(int(v) for v in roi) for roi in rois if len(roi) == 4]
+
+def clip_roi(roi, width, height):
+    x, y, w, h = roi
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def frame_regions(rois, width, height):
+    # The whole frame is one region when no ROI is configured
+    if not rois:
+        return [(0, 0, width, height)]
+    regions = [clip_roi(roi, width, height) for roi in rois]
+    return [r for r in regions if r is not None]
+
+def translate_boxes(boxes, x, y):
+    return [(top + y, right + x, bottom + y, left + x) for (top, right, bottom, left) in boxes]
+
+def box_iou(a, b):
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+def dedupe_boxes(boxes, items, iou_threshold=0.5):
+    # Overlapping ROIs can see the same face twice; keep the first sighting
+    kept_boxes, kept_items = [], []
+    for box, item in zip(boxes, items):
+        if all(box_iou(box, other) < iou_threshold for other in kept_boxes):
+            kept_boxes.append(box)
+            kept_items.append(item)
+    return kept_boxes, kept_items
@@ -0,0 +1,134 @@
+import json
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from datetime import datetime
+
+MAGIC = b"SFAREC01"
+# seq, seconds since recording start, height, width, channels, payload length
+FRAME_HEADER = struct.Struct("<IdHHBI")
+
+class SessionRecorder:
+    # Writes raw BGR frames from the capture path to a single .sfrec file:
+    # magic, a length-prefixed JSON header, then one zlib-compressed frame
+    # per record. Compression is lossless, so replays see exactly the
+    # pixels the camera produced.
+    def __init__(self, path, compression_level=1):
+        self.path = path
+        self.compression_level = compression_level
+        self.f = None
+        self.frames = 0
+        self.bytes_written = 0
+        self.start_time = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.subscription = None
+
+    def open(self, metadata=None):
+        self.f = open(self.path, "wb")
+        header = dict(metadata or {}, format="raw-zlib",
+                      created=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        payload = json.dumps(header).encode("utf-8")
+        self.f.write(MAGIC)
+        self.f.write(struct.pack("<I", len(payload)))
+        self.f.write(payload)
+        self.bytes_written = len(MAGIC) + 4 + len(payload)
+
+    def write_frame(self, frame, timestamp):
+        if self.start_time is None:
+            self.start_time = timestamp
+        frame = np.ascontiguousarray(frame)
+        h, w = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        payload = zlib.compress(frame.tobytes(), self.compression_level)
+        self.f.write(FRAME_HEADER.pack(self.frames, timestamp - self.start_time, h, w, channels, len(payload)))
+        self.f.write(payload)
+        self.frames += 1
+        self.bytes_written += FRAME_HEADER.size + len(payload)
+
+    def start(self, camera):
+        # Records on its own thread as just another camera subscriber
+        self.open({"camera_index": camera.camera_index, "width": camera.width, "height": camera.height})
+        self.subscription = camera.subscribe("recorder")
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._record_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        print(f"[RECORD] Recording camera {camera.camera_index} to {self.path}")
+
+    def _record_loop(self):
+        while not self.stop_event.is_set():
+            ret, frame = self.subscription.read(timeout=1.0)
+            if ret:
+                # Stamped with the capture time, so frames that waited in the
+                # queue keep their original spacing on replay
+                self.write_frame(frame, self.subscription.timestamp)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        if self.subscription:
+            self.subscription.release()
+            self.subscription = None
+        self.close()
+        print(f"[RECORD] Saved {self.frames} frames ({self.bytes_written / (1024 * 1024):.1f} MB) to {self.path}")
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+class ReplaySource:
+    # Plays a recording back through the same read()/release() interface as
+    # a camera subscription. realtime=True sleeps to reproduce the original
+    # frame timing; realtime=False returns frames as fast as they are read.
+    def __init__(self, path, realtime=True):
+        self.path = path
+        self.realtime = realtime
+        self.f = open(path, "rb")
+        if self.f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a session recording: {path}")
+        (length,) = struct.unpack("<I", self.f.read(4))
+        self.metadata = json.loads(self.f.read(length).decode("utf-8"))
+        self.start_wall = None
+        self.seq = None
+        self.timestamp = None
+
+    def read(self, timeout=None):
+        if self.f is None:
+            return False, None
+        header = self.f.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return False, None
+        seq, timestamp, h, w, channels, length = FRAME_HEADER.unpack(header)
+        data = zlib.decompress(self.f.read(length))
+        shape = (h, w, channels) if channels > 1 else (h, w)
+        frame = np.frombuffer(data, dtype=np.uint8).reshape(shape)
+
+        if self.realtime:
+            now = time.monotonic()
+            if self.start_wall is None:
+                self.start_wall = now - timestamp
+            delay = self.start_wall + timestamp - now
+            if delay > 0:
+                time.sleep(delay)
+        self.seq = seq
+        self.timestamp = timestamp
+        return True, frame
+
+    def frames(self):
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield self.seq, self.timestamp, frame
+
+    def release(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+    close = release
@@ -0,0 +1,62 @@
+import threading
+import time
+import numpy as np
+import camera_service
+from camera_service import CameraService
+
+class FakeCapture:
+    # Delivers blank frames; release() can be held to keep a thread shutting down
+    release_gate = None
+
+    def __init__(self, index):
+        self.opened = True
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        time.sleep(0.005)
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        if FakeCapture.release_gate is not None:
+            FakeCapture.release_gate.wait(2.0)
+        self.opened = False
+
+def test_subscriber_arriving_while_capture_thread_shuts_down(monkeypatch):
+    monkeypatch.setattr(camera_service.cv2, "VideoCapture", FakeCapture)
+    FakeCapture.release_gate = threading.Event()
+    service = CameraService(0, 4, 4, read_timeout=2.0)
+    try:
+        first = service.subscribe("first")
+        assert first.read()[0]
+        old_thread = service.thread
+        first.release()
+
+        # Wait until the old thread has left its loop and is stuck releasing the device
+        deadline = time.monotonic() + 2.0
+        while service.capturing and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert not service.capturing and old_thread.is_alive()
+
+        second = service.subscribe("second")
+        FakeCapture.release_gate.set()
+        ok, frame = second.read()
+        assert ok and frame is not None
+        assert not service.failed
+        second.release()
+    finally:
+        FakeCapture.release_gate = None
+        service.stop_event.set()
+
+def test_subscriber_keeps_running_loop_alive(monkeypatch):
+    monkeypatch.setattr(camera_service.cv2, "VideoCapture", FakeCapture)
+    service = CameraService(0, 4, 4, read_timeout=2.0)
+    first = service.subscribe("first")
+    assert first.read()[0]
+    thread = service.thread
+    first.release()
+    second = service.subscribe("second")
+    assert second.read()[0]
+    assert service.thread is thread or not thread.is_alive()
+    second.release()
@@ -0,0 +1,12 @@
+import os
+from capture_buffer import ImageWriterPool
+
+def test_take_errors_only_matches_its_own_folder():
+    writer = ImageWriterPool(workers=1)
+    bob_1 = os.path.join("dataset", "Bob_1")
+    bob_10 = os.path.join("dataset", "Bob_10")
+    writer._record_error(os.path.join(bob_1, "Bob_01.jpg"), OSError("disk full"))
+    writer._record_error(os.path.join(bob_10, "Bob_01.jpg"), OSError("disk full"))
+
+    assert [path for path, _ in writer.take_errors(bob_1)] == [os.path.join(bob_1, "Bob_01.jpg")]
+    assert [path for path, _ in writer.take_errors(bob_10)] == [os.path.join(bob_10, "Bob_01.jpg")]
@@ -0,0 +1,28 @@
+import json
+from config_service import ConfigService, DEFAULTS
+
+def test_update_persists_only_file_keys_and_changes(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"camera_index": 0, "confidence_threshold": 0.5}))
+    service = ConfigService(str(path))
+    assert service["unknown_event_interval"] == DEFAULTS["unknown_event_interval"]
+
+    service.update({"confidence_threshold": 0.7})
+
+    assert json.loads(path.read_text()) == {"camera_index": 0, "confidence_threshold": 0.7}
+    assert service["confidence_threshold"] == 0.7
+    assert service["unknown_event_interval"] == DEFAULTS["unknown_event_interval"]
+
+def test_enable_toggles_are_live_settings(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"camera_index": 0}))
+    service = ConfigService(str(path))
+    changes = []
+    service.subscribe(lambda changed, config: changes.append(changed))
+
+    # The settings window sends combobox text
+    service.update({"motion_gate_enabled": "False"})
+
+    assert service["motion_gate_enabled"] is False
+    assert changes == [{"motion_gate_enabled": False}]
+    assert json.loads(path.read_text()) == {"camera_index": 0, "motion_gate_enabled": False}
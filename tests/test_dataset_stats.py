@@ -0,0 +1,25 @@
+import threading
+from dataset_stats import DatasetStatsService
+
+def test_request_during_scan_gets_a_later_scan(tmp_path):
+    service = DatasetStatsService({"encodings_path": str(tmp_path / "encodings.pickle")})
+    scans = []
+    started, release = threading.Event(), threading.Event()
+
+    def refresh():
+        scans.append(len(scans) + 1)
+        started.set()
+        release.wait(5)
+        return {"scan": scans[-1]}
+    service.refresh = refresh
+
+    results = {}
+    done = threading.Event()
+    service.refresh_async(lambda snapshot: results.setdefault("first", snapshot))
+    assert started.wait(5)
+    # Arrives while the first scan runs, so it must wait for a second scan
+    service.refresh_async(lambda snapshot: (results.setdefault("second", snapshot), done.set()))
+    release.set()
+
+    assert done.wait(5)
+    assert results == {"first": {"scan": 1}, "second": {"scan": 2}}
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from model_selection import make_folds, evaluate_fold
+
+def encodings(n_classes, per_class=6, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_classes, 128))
+    X = np.concatenate([c + rng.normal(scale=0.05, size=(per_class, 128)) for c in centres])
+    y = np.repeat(np.arange(n_classes), per_class)
+    return X, y
+
+@pytest.mark.parametrize("n_classes", [2, 3, 4])
+def test_make_folds_with_fewer_people_than_folds(n_classes):
+    X, y = encodings(n_classes)
+    folds = make_folds(y, 5)
+    assert len(folds) == 5
+    for known_train, known_test, impostor_idx in folds:
+        impostors = set(y[impostor_idx])
+        # Impostors never leak into training, and at least two known people remain
+        assert not impostors & set(y[known_train])
+        assert len(set(y[known_train])) >= 2
+        if n_classes < 3:
+            assert len(impostor_idx) == 0
+        else:
+            assert impostors
+
+def test_every_fold_keeps_two_known_people_with_few_folds():
+    # Three people, one with only two encodings, so the sweep runs two folds
+    X, y = encodings(3)
+    keep = np.concatenate([np.where(y != 2)[0], np.where(y == 2)[0][:2]])
+    X, y = X[keep], y[keep]
+    for fold in make_folds(y, 2):
+        known_train, _, impostor_idx = fold
+        assert len(set(y[known_train])) >= 2
+        assert len(impostor_idx)
+        result = evaluate_fold(X, y, "logistic", {}, fold, 0.5)
+        assert result["far"] is not None
+
+@pytest.mark.parametrize("n_classes", [2, 3, 4])
+def test_evaluate_fold_runs_on_small_enrollments(n_classes):
+    X, y = encodings(n_classes)
+    result = evaluate_fold(X, y, "logistic", {}, make_folds(y, 5)[0], 0.5)
+    assert 0.0 <= result["accuracy"] <= 1.0
@@ -0,0 +1,24 @@
+import pickle
+from sklearn.preprocessing import LabelEncoder
+from model_store import ModelStore
+
+def model_data(names):
+    le = LabelEncoder().fit(names)
+    return {"model": None, "le": le, "classes": le.classes_.tolist()}
+
+def test_rollback_restores_recognizer_and_label_encoder(tmp_path):
+    config = {"recognizer_path": str(tmp_path / "recognizer.pickle"), "le_path": str(tmp_path / "le.pickle")}
+    ModelStore(config).publish(model_data(["alice", "bob"]))
+    ModelStore(config).publish(model_data(["alice", "bob", "carol"]))
+
+    restored = ModelStore(config).rollback()
+
+    assert restored["version"] == 1
+    with open(config["recognizer_path"], "rb") as f:
+        assert pickle.loads(f.read())["classes"] == ["alice", "bob"]
+    with open(config["le_path"], "rb") as f:
+        assert pickle.loads(f.read()).classes_.tolist() == ["alice", "bob"]
+
+def test_stores_share_one_lock(tmp_path):
+    config = {"recognizer_path": str(tmp_path / "recognizer.pickle")}
+    assert ModelStore(config).lock is ModelStore(config).lock
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("face_recognition")
+import recognition
+from event_bus import EventBus, FIRST_SEEN, LAST_SEEN_UPDATE
+from metrics import Counter
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+def make_recognizer(bus):
+    # Just the state record_sighting and mark_attendance touch; no model, camera or files
+    recognizer = recognition.FaceRecognizer.__new__(recognition.FaceRecognizer)
+    recognizer.config = {"last_seen_update_interval": 60}
+    recognizer.attendance_records = {}
+    recognizer.recognized_names = set()
+    recognizer.last_seen_marked = {}
+    recognizer.attendance_listeners = []
+    recognizer.attendance_marked = Counter("attendance_marked_total", "")
+    recognizer.event_bus = bus
+    recognizer.model_version = 1
+    recognizer.save_attendance = lambda: None
+    recognizer.roll_attendance = lambda: None
+    return recognizer
+
+def test_repeat_sightings_publish_throttled_last_seen_updates(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(recognition.time, "time", clock.time)
+    bus = EventBus()
+    events = bus.subscribe("test")
+    recognizer = make_recognizer(bus)
+
+    # Sightings every 10 seconds for 3 minutes
+    for _ in range(19):
+        recognizer.record_sighting("alice")
+        clock.now += 10
+
+    batch = events.get_batch(100, timeout=0)
+    assert [e["type"] for e in batch] == [FIRST_SEEN] + [LAST_SEEN_UPDATE] * 3
+    assert all(e["data"]["name"] == "alice" for e in batch)
+    assert [e["data"]["count"] for e in batch] == [1, 2, 3, 4]
+
+def test_reset_starts_a_new_session(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(recognition.time, "time", clock.time)
+    bus = EventBus()
+    events = bus.subscribe("test")
+    recognizer = make_recognizer(bus)
+    recognizer.scheduler = recognition.EncodingScheduler()
+
+    recognizer.record_sighting("alice")
+    recognizer.reset_recognized_names()
+    recognizer.record_sighting("alice")
+    recognizer.record_sighting("alice")
+
+    assert [e["type"] for e in events.get_batch(100, timeout=0)] == [FIRST_SEEN, LAST_SEEN_UPDATE]
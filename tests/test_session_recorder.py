@@ -0,0 +1,29 @@
+import numpy as np
+from session_recorder import SessionRecorder, ReplaySource
+
+class QueuedSubscription:
+    # Hands out frames captured 0.1 s apart, faster than that, as if they had queued up
+    def __init__(self, recorder, count):
+        self.recorder = recorder
+        self.captured = [100.0 + 0.1 * i for i in range(count)]
+        self.timestamp = None
+
+    def read(self, timeout=None):
+        if not self.captured:
+            self.recorder.stop_event.set()
+            return False, None
+        self.timestamp = self.captured.pop(0)
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+def test_frames_keep_their_capture_time(tmp_path):
+    path = str(tmp_path / "session.rec")
+    recorder = SessionRecorder(path)
+    recorder.open()
+    recorder.subscription = QueuedSubscription(recorder, 5)
+    recorder._record_loop()
+    recorder.close()
+
+    source = ReplaySource(path, realtime=False)
+    times = [round(t, 3) for _, t, _ in source.frames()]
+    source.release()
+    assert times == [0.0, 0.1, 0.2, 0.3, 0.4]
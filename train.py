@@ -1,28 +1,90 @@
-from sklearn.svm import SVC
+from sklearn.svm import SVC, LinearSVC
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.calibration import CalibratedClassifierCV
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.preprocessing import LabelEncoder
 import pickle
-import json
 import os
+import time
+from model_store import ModelStore
+from quantized_gallery import GalleryClassifier
+from config_service import get_config_service
 
-def train_model():
+# Every backend exposes predict_proba, which is all FaceRecognizer needs
+TRAINING_BACKENDS = ("svm", "logistic", "ovr_linear", "calibrated_linear", "gallery")
+
+def build_model(method, n_jobs=-1, params=None):
+    if method == "svm":
+        # libsvm one-vs-one plus internal 5-fold Platt scaling; slowest as classes grow
+        model = SVC(kernel='linear', probability=True, random_state=42)
+    elif method == "logistic":
+        # Single multinomial model, probabilities come for free
+        model = LogisticRegression(C=10.0, max_iter=1000)
+    elif method == "ovr_linear":
+        # One binary model per person, fitted in parallel across cores
+        model = OneVsRestClassifier(LogisticRegression(C=10.0, solver='liblinear'), n_jobs=n_jobs)
+    elif method == "calibrated_linear":
+        # Linear SVM margins calibrated to probabilities, CV folds fitted in parallel
+        model = CalibratedClassifierCV(LinearSVC(C=1.0), cv=3, n_jobs=n_jobs)
+    elif method == "gallery":
+        # No training: nearest neighbours over an int8 (or float16) copy of the encodings
+        model = GalleryClassifier()
+    else:
+        raise ValueError(f"Unknown recognition_method '{method}'. Choose one of: {', '.join(TRAINING_BACKENDS)}")
+    if params:
+        model.set_params(**params)
+    return model
+
+def save_model(config, model, le, accuracy, method, params=None):
+    le_path = config["le_path"]
+    model_data = {
+        "model": model,
+        "le": le,
+        "classes": le.classes_.tolist(),
+        "accuracy": accuracy,
+        "method": method,
+        "params": params or {}
+    }
+    
+    # Written as a new version; the active copies at recognizer_path and
+    # le_path are swapped atomically
+    model_data = ModelStore(config).publish(model_data)
+    
+    print(f"[INFO] Model saved to: {config['recognizer_path']} (version {model_data['version']})")
+    print(f"[INFO] Label encoder saved to: {le_path}")
+    return model_data
+
+def train_model(progress=None, cancel_event=None):
     # Load configuration
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = get_config_service()
     
     encodings_path = config["encodings_path"]
-    recognizer_path = config["recognizer_path"]
-    le_path = config["le_path"]
     training_size = config["training_size"]
+    method = config.get("recognition_method", "svm")
+    params = config.get("recognition_params", {})
+    
+    try:
+        model = build_model(method, params=params)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return
     
     # Check if encodings exist
     if not os.path.exists(encodings_path):
         print("[ERROR] Encodings file not found. Run encode_faces.py first.")
         return
     
+    def step(fraction, message):
+        print(f"[INFO] {message}")
+        if cancel_event is not None and cancel_event.is_set():
+            raise RuntimeError("Training cancelled")
+        if progress:
+            progress(fraction, message)
+    
     # Load the face encodings
-    print("[INFO] Loading encodings...")
+    step(0.0, "Loading encodings...")
     with open(encodings_path, "rb") as f:
         data = pickle.loads(f.read())
     
@@ -31,23 +93,24 @@ def train_model():
         return
     
     # Encode the labels
-    print("[INFO] Encoding labels...")
+    step(0.1, "Encoding labels...")
     le = LabelEncoder()
     labels = le.fit_transform(data["names"])
     
     # Split the data into training and testing sets
-    print("[INFO] Splitting dataset...")
+    step(0.15, "Splitting dataset...")
     X_train, X_test, y_train, y_test = train_test_split(
         data["encodings"], labels, test_size=(1-training_size), random_state=42, stratify=labels
     )
     
-    # Train the SVM model
-    print("[INFO] Training SVM classifier...")
-    model = SVC(kernel='linear', probability=True, random_state=42)
+    # Train the classifier
+    step(0.2, f"Training {method} classifier...")
+    start = time.perf_counter()
     model.fit(X_train, y_train)
+    print(f"[INFO] Training took {time.perf_counter() - start:.2f}s")
     
     # Evaluate the model
-    print("[INFO] Evaluating model...")
+    step(0.8, "Evaluating model...")
     y_pred = model.predict(X_test)
     accuracy = accuracy_score(y_test, y_pred)
     
@@ -56,24 +119,11 @@ def train_model():
     print(classification_report(y_test, y_pred, target_names=le.classes_))
     
     # Save the trained model and label encoder
-    print("[INFO] Saving model...")
-    model_data = {
-        "model": model,
-        "le": le,
-        "classes": le.classes_.tolist(),
-        "accuracy": accuracy
-    }
-    
-    with open(recognizer_path, "wb") as f:
-        f.write(pickle.dumps(model_data))
-    
-    # Save label encoder separately
-    with open(le_path, "wb") as f:
-        f.write(pickle.dumps(le))
+    step(0.9, "Saving model...")
+    model_data = save_model(config, model, le, accuracy, method, params)
     
     print(f"[SUCCESS] Model training completed!")
-    print(f"[INFO] Model saved to: {recognizer_path}")
-    print(f"[INFO] Label encoder saved to: {le_path}")
+    return model_data
 
 if __name__ == "__main__":
     train_model()
\ No newline at end of file
@@ -0,0 +1,163 @@
+import cv2
+import os
+import pickle
+import random
+import threading
+import time
+import numpy as np
+
+class UnknownCluster:
+    def __init__(self, cluster_id, encoding, now):
+        self.id = cluster_id
+        self.centroid = np.array(encoding, dtype=np.float64)
+        self.count = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.encodings = []
+        # (quality, jpeg bytes) sorted best first
+        self.crops = []
+
+    def add_encoding(self, encoding, max_samples):
+        self.count += 1
+        self.centroid += (encoding - self.centroid) / self.count
+        # Reservoir sampling keeps a spread of samples over the cluster's lifetime
+        if len(self.encodings) < max_samples:
+            self.encodings.append(encoding)
+        else:
+            j = random.randrange(self.count)
+            if j < max_samples:
+                self.encodings[j] = encoding
+
+    def wants_crop(self, quality, max_crops):
+        return len(self.crops) < max_crops or quality > self.crops[-1][0]
+
+    def add_crop(self, quality, jpeg, max_crops):
+        self.crops.append((quality, jpeg))
+        self.crops.sort(key=lambda c: c[0], reverse=True)
+        del self.crops[max_crops:]
+
+def crop_face(frame, box, margin=0.4):
+    # Pad the box so the saved chip can still be detected when re-encoding
+    top, right, bottom, left = box
+    pad_y = int((bottom - top) * margin)
+    pad_x = int((right - left) * margin)
+    h, w = frame.shape[:2]
+    return frame[max(0, top - pad_y):min(h, bottom + pad_y), max(0, left - pad_x):min(w, right + pad_x)]
+
+def crop_quality(crop):
+    # Larger and sharper faces make better enrollment images
+    if crop.size == 0:
+        return 0.0
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    return float(gray.shape[0] * gray.shape[1]) * min(sharpness, 500.0)
+
+class UnknownClusterEngine:
+    # Incremental leader clustering of unknown encodings: each new encoding
+    # joins the nearest cluster centroid within distance_threshold or starts
+    # a new cluster. Memory is bounded by max_clusters * (max_samples + max_crops).
+    def __init__(self, distance_threshold=0.5, max_clusters=50, max_samples=30,
+                 max_crops=5, ttl_seconds=3600):
+        self.distance_threshold = distance_threshold
+        self.max_clusters = max_clusters
+        self.max_samples = max_samples
+        self.max_crops = max_crops
+        self.ttl_seconds = ttl_seconds
+        self.clusters = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def configure(self, config):
+        self.distance_threshold = config.get("unknown_cluster_threshold", self.distance_threshold)
+        self.max_clusters = config.get("unknown_max_clusters", self.max_clusters)
+        self.ttl_seconds = config.get("unknown_cluster_ttl", self.ttl_seconds)
+
+    def evict_stale(self, now, make_room=False):
+        stale = [cid for cid, c in self.clusters.items() if now - c.last_seen > self.ttl_seconds]
+        for cid in stale:
+            del self.clusters[cid]
+        # Over capacity: drop the least recently seen clusters
+        while make_room and self.clusters and len(self.clusters) >= self.max_clusters:
+            oldest = min(self.clusters.values(), key=lambda c: c.last_seen)
+            del self.clusters[oldest.id]
+
+    def nearest(self, encoding):
+        if not self.clusters:
+            return None, None
+        clusters = list(self.clusters.values())
+        centroids = np.stack([c.centroid for c in clusters])
+        distances = np.linalg.norm(centroids - encoding, axis=1)
+        j = int(np.argmin(distances))
+        return clusters[j], float(distances[j])
+
+    def add(self, encoding, frame=None, box=None):
+        encoding = np.asarray(encoding, dtype=np.float64)
+        now = time.time()
+        with self.lock:
+            cluster, distance = self.nearest(encoding)
+            if cluster is None or distance > self.distance_threshold:
+                self.evict_stale(now, make_room=True)
+                cluster = UnknownCluster(self.next_id, encoding, now)
+                self.clusters[cluster.id] = cluster
+                self.next_id += 1
+            cluster.add_encoding(encoding, self.max_samples)
+            cluster.last_seen = now
+
+            if frame is not None and box is not None:
+                crop = crop_face(frame, box)
+                quality = crop_quality(crop)
+                # Only pay for JPEG encoding when the crop would be kept
+                if quality > 0 and cluster.wants_crop(quality, self.max_crops):
+                    ok, buf = cv2.imencode(".jpg", crop)
+                    if ok:
+                        cluster.add_crop(quality, buf.tobytes(), self.max_crops)
+            return cluster.id
+
+    def list_clusters(self, min_count=1):
+        with self.lock:
+            self.evict_stale(time.time())
+            clusters = [c for c in self.clusters.values() if c.count >= min_count]
+        return sorted(clusters, key=lambda c: c.count, reverse=True)
+
+    def pop(self, cluster_id):
+        with self.lock:
+            return self.clusters.pop(cluster_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.clusters.clear()
+
+def append_encodings(encodings_path, encodings, name):
+    # Add already-computed encodings so the cluster does not need re-encoding
+    data = {"encodings": [], "names": []}
+    if os.path.exists(encodings_path):
+        with open(encodings_path, "rb") as f:
+            data = pickle.loads(f.read())
+    data["encodings"].extend(np.asarray(e) for e in encodings)
+    data["names"].extend([name] * len(encodings))
+
+    os.makedirs(os.path.dirname(encodings_path) or ".", exist_ok=True)
+    tmp_path = encodings_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pickle.dumps(data))
+    os.replace(tmp_path, encodings_path)
+
+def save_cluster_crops(cluster, user_dir, person_name):
+    os.makedirs(user_dir, exist_ok=True)
+    saved = 0
+    for i, (_, jpeg) in enumerate(cluster.crops):
+        with open(os.path.join(user_dir, f"{person_name}_{i:02d}.jpg"), "wb") as f:
+            f.write(jpeg)
+        saved += 1
+    return saved
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_unknown_clusters():
+    # Shared between the recognizer (producer) and the Unknown Faces tab
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = UnknownClusterEngine()
+        return _engine
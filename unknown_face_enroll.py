@@ -6,18 +6,29 @@ import time
 import threading
 import json
 import face_recognition
+import numpy as np
 from datetime import datetime
 from PIL import Image, ImageTk
+from config_service import get_config_service
+from camera_service import get_camera
+from unknown_clusters import get_unknown_clusters, save_cluster_crops, append_encodings
+from capture_buffer import CaptureBuffer, get_image_writer
+from jobs import get_job_runner, DONE
 
 class UnknownFaceEnroll:
     def __init__(self, root):
         self.root = root
-        self.root.title("Unknown Face Enrollment")
-        self.root.geometry("500x400")
+        # Window settings only apply when run standalone; main.py embeds this in a tab frame
+        if isinstance(root, (tk.Tk, tk.Toplevel)):
+            self.root.title("Unknown Face Enrollment")
+            self.root.geometry("500x400")
         
         # Load configuration
-        with open('config/config.json', 'r') as f:
-            self.config = json.load(f)
+        self.config = get_config_service()
+        
+        # Captured faces are kept as compressed crops within a memory budget
+        self.capture_buffer = CaptureBuffer(max_bytes=int(self.config.get("capture_buffer_mb", 8) * 1024 * 1024))
+        self.writer = get_image_writer(self.config)
         
         self.stop_event = threading.Event()
         self.cap = None
@@ -99,7 +110,39 @@ class UnknownFaceEnroll:
         counter_label = ttk.Label(main_frame, textvariable=self.counter_var)
         counter_label.pack(pady=5)
         
-        self.captured_faces = []
+        # Unknown faces grouped during live recognition
+        cluster_frame = ttk.LabelFrame(main_frame, text="Unknown Faces Seen During Recognition", padding="10")
+        cluster_frame.pack(fill='both', expand=True, pady=10)
+        
+        list_frame = ttk.Frame(cluster_frame)
+        list_frame.pack(side=tk.LEFT, fill='both', expand=True)
+        
+        self.cluster_list = tk.Listbox(list_frame, height=8, width=45)
+        self.cluster_list.pack(side=tk.LEFT, fill='both', expand=True)
+        self.cluster_list.bind('<<ListboxSelect>>', self.on_cluster_select)
+        
+        cluster_scroll = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.cluster_list.yview)
+        cluster_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.cluster_list.configure(yscrollcommand=cluster_scroll.set)
+        
+        side_frame = ttk.Frame(cluster_frame)
+        side_frame.pack(side=tk.LEFT, padx=10)
+        
+        self.crop_labels = []
+        crops_frame = ttk.Frame(side_frame)
+        crops_frame.pack()
+        for i in range(5):
+            label = ttk.Label(crops_frame)
+            label.grid(row=0, column=i, padx=2)
+            self.crop_labels.append(label)
+        
+        ttk.Button(side_frame, text="Refresh Clusters", 
+                  command=self.refresh_clusters, width=18).pack(pady=5)
+        self.enroll_cluster_btn = ttk.Button(side_frame, text="Enroll Cluster", 
+                                            command=self.enroll_cluster, state=tk.DISABLED, width=18)
+        self.enroll_cluster_btn.pack(pady=5)
+        
+        self.cluster_ids = []
         
     def start_capture(self):
         person_name = self.name_entry.get().strip()
@@ -108,7 +151,7 @@ class UnknownFaceEnroll:
             return
             
         self.stop_event.clear()
-        self.captured_faces = []
+        self.capture_buffer.clear()
         self.face_count = 0
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
@@ -120,24 +163,23 @@ class UnknownFaceEnroll:
         
     def stop_capture(self):
         self.stop_event.set()
-        self.status_var.set(f"Capture stopped. Captured {len(self.captured_faces)} faces")
+        self.status_var.set(f"Capture stopped. Captured {len(self.capture_buffer)} faces")
         self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
-        if len(self.captured_faces) > 0:
+        if len(self.capture_buffer) > 0:
             self.enroll_btn.config(state=tk.NORMAL)
         
     def capture_unknown_faces(self):
         try:
-            self.cap = cv2.VideoCapture(self.config["camera_index"])
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config["frame_width"])
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config["frame_height"])
+            self.cap = get_camera(self.config["camera_index"], self.config["frame_width"],
+                                  self.config["frame_height"]).subscribe("unknown_enrollment")
             
             detection_model = self.config["detection_method"]
             max_faces = 20  # Maximum unknown faces to capture
             
             self.status_var.set("Capturing unknown faces...")
             
-            while len(self.captured_faces) < max_faces and not self.stop_event.is_set():
+            while len(self.capture_buffer) < max_faces and not self.stop_event.is_set():
                 ret, frame = self.cap.read()
                 if ret:
                     rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -146,10 +188,12 @@ class UnknownFaceEnroll:
                     face_locations = face_recognition.face_locations(rgb_frame, model=detection_model)
                     
                     if len(face_locations) > 0:
-                        # Save the first face found
+                        # Keep a padded crop of the first face found
                         face_location = face_locations[0]
-                        self.captured_faces.append(frame.copy())
-                        self.face_count = len(self.captured_faces)
+                        if not self.capture_buffer.add(frame, face_location):
+                            self.status_var.set("Capture buffer full")
+                            break
+                        self.face_count = len(self.capture_buffer)
                         
                         # Update progress
                         progress = (self.face_count / max_faces) * 100
@@ -166,8 +210,8 @@ class UnknownFaceEnroll:
             self.cap.release()
             
             if not self.stop_event.is_set():
-                self.status_var.set(f"Capture completed: {len(self.captured_faces)} faces")
-                if len(self.captured_faces) > 0:
+                self.status_var.set(f"Capture completed: {len(self.capture_buffer)} faces")
+                if len(self.capture_buffer) > 0:
                     self.enroll_btn.config(state=tk.NORMAL)
                     
             self.start_btn.config(state=tk.NORMAL)
@@ -179,7 +223,7 @@ class UnknownFaceEnroll:
                 self.cap.release()
                 
     def enroll_unknown(self):
-        if len(self.captured_faces) == 0:
+        if len(self.capture_buffer) == 0:
             messagebox.showwarning("Warning", "No faces captured to enroll")
             return
             
@@ -195,15 +239,15 @@ class UnknownFaceEnroll:
         if not os.path.exists(user_dir):
             os.makedirs(user_dir)
             
-        # Save captured faces
-        saved_count = 0
-        for i, face_img in enumerate(self.captured_faces):
-            try:
-                img_path = os.path.join(user_dir, f"{person_name}_{i:02d}.jpg")
-                cv2.imwrite(img_path, face_img)
-                saved_count += 1
-            except Exception as e:
-                print(f"Error saving image {i}: {e}")
+        # Save captured faces through the background writer
+        crops = self.capture_buffer.snapshot()
+        for i, jpeg in enumerate(crops):
+            self.writer.submit(os.path.join(user_dir, f"{person_name}_{i:02d}.jpg"), jpeg)
+        self.writer.flush()
+        errors = self.writer.take_errors(user_dir)
+        for path, error in errors:
+            print(f"Error saving image {path}: {error}")
+        saved_count = len(crops) - len(errors)
                 
         # Update enrollment database
         self.update_enrollment_db(person_id, person_name, user_dir, saved_count)
@@ -215,6 +259,89 @@ class UnknownFaceEnroll:
         
         self.reset_ui()
         
+    def refresh_clusters(self):
+        clusters = get_unknown_clusters().list_clusters(min_count=self.config.get("unknown_min_sightings", 3))
+        self.cluster_ids = [c.id for c in clusters]
+        self.cluster_list.delete(0, tk.END)
+        for c in clusters:
+            last_seen = datetime.fromtimestamp(c.last_seen).strftime('%H:%M:%S')
+            self.cluster_list.insert(tk.END, f"Cluster #{c.id}: {c.count} sightings, "
+                                             f"{len(c.crops)} crops, last seen {last_seen}")
+        self.show_cluster_crops(None)
+        self.enroll_cluster_btn.config(state=tk.DISABLED)
+        self.status_var.set(f"{len(clusters)} unknown face clusters available")
+        
+    def selected_cluster(self):
+        selection = self.cluster_list.curselection()
+        if not selection:
+            return None
+        cluster_id = self.cluster_ids[selection[0]]
+        for c in get_unknown_clusters().list_clusters():
+            if c.id == cluster_id:
+                return c
+        return None
+        
+    def on_cluster_select(self, event=None):
+        cluster = self.selected_cluster()
+        self.show_cluster_crops(cluster)
+        self.enroll_cluster_btn.config(state=tk.NORMAL if cluster and cluster.crops else tk.DISABLED)
+        
+    def show_cluster_crops(self, cluster):
+        crops = cluster.crops if cluster else []
+        for i, label in enumerate(self.crop_labels):
+            if i < len(crops):
+                image = cv2.imdecode(np.frombuffer(crops[i][1], dtype=np.uint8), cv2.IMREAD_COLOR)
+                img = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                img.thumbnail((80, 80))
+                imgtk = ImageTk.PhotoImage(image=img)
+                label.imgtk = imgtk
+                label.configure(image=imgtk)
+            else:
+                label.imgtk = None
+                label.configure(image='')
+                
+    def enroll_cluster(self):
+        cluster = self.selected_cluster()
+        if cluster is None:
+            messagebox.showwarning("Warning", "Please select a cluster to enroll")
+            return
+            
+        person_name = self.name_entry.get().strip()
+        person_id = self.id_var.get()
+        if not person_name:
+            messagebox.showerror("Error", "Please enter a valid name")
+            return
+            
+        def run(job):
+            # Crops become the dataset images and the buffered encodings go
+            # straight into the encodings file, so nothing is captured twice
+            user_dir = os.path.join(self.config["dataset_path"], f"{person_name}_{person_id}")
+            saved_count = save_cluster_crops(cluster, user_dir, person_name)
+            label = os.path.basename(user_dir).split('_')[0]
+            append_encodings(self.config["encodings_path"], cluster.encodings, label)
+            self.update_enrollment_db(person_id, person_name, user_dir, saved_count)
+            get_unknown_clusters().pop(cluster.id)
+            return saved_count
+            
+        def finish(job):
+            if job.status != DONE:
+                messagebox.showerror("Error", f"Cluster enrollment failed: {str(job.error)}")
+                self.refresh_clusters()
+                return
+            messagebox.showinfo("Success", 
+                              f"Successfully enrolled {person_name}!\n"
+                              f"ID: {person_id}\n"
+                              f"Faces saved: {job.result}\n"
+                              f"Encodings added: {len(cluster.encodings)}\n\n"
+                              f"Retrain the model to recognize this person.")
+            self.reset_ui()
+            self.refresh_clusters()
+            
+        # Encode, Train and class-model jobs rewrite the encodings file too, so wait for them
+        self.enroll_cluster_btn.config(state=tk.DISABLED)
+        get_job_runner().submit("enroll_cluster", run, resources=("encodings",), name=f"Enroll {person_name}",
+                                on_done=lambda job: self.root.after(0, finish, job))
+        
     def update_enrollment_db(self, person_id, person_name, user_dir, face_count):
         db_dir = os.path.dirname(self.config["db_path"])
         if not os.path.exists(db_dir):
@@ -250,7 +377,7 @@ class UnknownFaceEnroll:
         self.id_var.set(f"UNK_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
         self.name_entry.delete(0, tk.END)
         self.name_entry.insert(0, "Unknown_Person")
-        self.captured_faces = []
+        self.capture_buffer.clear()
         self.enroll_btn.config(state=tk.DISABLED)
 
 if __name__ == "__main__":